@@ -3,7 +3,7 @@ from setuptools import setup, find_packages
 setup(
     name="traffic_sim",
     version="0.1",
-    packages=find_packages(),
+    packages=find_packages(exclude=["tests", "tests.*"]),
     install_requires=[
         'traci',
         'pyyaml'
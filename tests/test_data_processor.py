@@ -0,0 +1,106 @@
+import math
+
+import numpy as np
+import pytest
+
+from traffic_sim.ml.data_processor import FeaturePipeline, aggregate_windows, feature_columns, load_shards
+from traffic_sim.ml.inference import FeatureBuilder
+from traffic_sim.simulation.camera import Camera
+from traffic_sim.simulation.detection import DetectionEngine
+from traffic_sim.simulation.trajectory import TrajectoryReader, TrajectoryRecorder
+from traffic_sim.simulation.vehicle_store import VehicleStore
+
+CAMERAS = [
+    {'id': 'near', 'location': [0, 0], 'detection_radius': 10},
+    {'id': 'far', 'location': [500, 500], 'detection_radius': 10},
+]
+
+
+@pytest.fixture
+def recording(tmp_path):
+    """Record steps every 0.5 s up to 3.0 s; step n has n vehicles at 'near', each at speed n."""
+    store = VehicleStore(capacity=8)
+    recorder = TrajectoryRecorder(str(tmp_path / 'run'), steps_per_chunk=3)
+    for step in range(1, 7):
+        ids = [f'v{i}' for i in range(step)]
+        store.update(ids, [(float(i), 0.0) for i in range(step)], [float(step)] * step, ['lane'] * step,
+                     ['edge'] * step, ['route'] * step, ['car'] * step)
+        recorder.record(step, step * 0.5, store.view())
+    recorder.close()
+    return recorder.directory
+
+
+@pytest.mark.parametrize('block_rows', [1, 4, 1000])
+def test_steps_on_a_boundary_start_the_next_window(recording, block_rows):
+    steps, hits, speed_sums = aggregate_windows(recording, CAMERAS, np.array([0.0, 1.0, 2.0, 3.0]), block_rows)
+    # Windows are [0, 1), [1, 2) and [2, 3): the step at 3.0 is past the last edge
+    assert steps.tolist() == [1, 2, 2]
+    assert hits.tolist() == [[1, 0], [2 + 3, 0], [4 + 5, 0]]
+    assert speed_sums.tolist() == [[1.0, 0.0], [4.0 + 9.0, 0.0], [16.0 + 25.0, 0.0]]
+
+
+def test_windows_without_steps_are_empty(recording):
+    steps, hits, speed_sums = aggregate_windows(recording, CAMERAS, np.array([-2.0, 0.0, 0.6, 0.7, 10.0]), 2)
+    assert steps.tolist() == [0, 1, 0, 5]
+    assert hits[:, 0].tolist() == [0, 1, 0, 2 + 3 + 4 + 5 + 6]
+    assert speed_sums[2].tolist() == [0.0, 0.0]
+
+
+@pytest.fixture
+def busy_recording(tmp_path):
+    """Record 10 s in quarter-second steps with a varying number of vehicles at 'near'."""
+    store = VehicleStore(capacity=8)
+    recorder = TrajectoryRecorder(str(tmp_path / 'busy'), steps_per_chunk=16)
+    for step in range(40):
+        count = (step * 7) % 5 + 1
+        ids = [f'v{i}' for i in range(count)] + ['far']
+        positions = [(float(i), 1.0) for i in range(count)] + [(300.0, 300.0)]
+        speeds = [float(step % 9 + i) for i in range(count)] + [5.0]
+        store.update(ids, positions, speeds, ['lane'] * len(ids), ['edge'] * len(ids),
+                     ['route'] * len(ids), ['car'] * len(ids))
+        recorder.record(step, step * 0.25, store.view())
+    recorder.close()
+    return recorder.directory
+
+
+def serve_features(recording, builder):
+    """Feed a recording's steps through camera detection and a FeatureBuilder, as the controller does."""
+    cameras = {position['id']: Camera(position['id'], position['location'], position['detection_radius'])
+               for position in CAMERAS}
+    engine = DetectionEngine(cameras)
+    reader = TrajectoryReader(recording)
+    store = VehicleStore(capacity=8)
+    served = {}
+    window_start = None
+    for position in range(len(reader)):
+        rows = reader.entry(position)
+        ids = [reader.vehicle_id(code) for code in rows['vehicle'].tolist()]
+        store.update(ids, np.column_stack((rows['x'], rows['y'])).astype(float), rows['speed'].astype(float),
+                     ['lane'] * len(ids), ['edge'] * len(ids), ['route'] * len(ids), ['car'] * len(ids))
+        vehicles = store.view()
+        sim_time = float(reader.index['time'][position])
+        for camera_id, (slots, distances) in engine.detect(vehicles.xy).items():
+            cameras[camera_id].update_detections(vehicles, slots, distances, sim_time)
+        camera_ids, features = builder.build(cameras, sim_time)
+        if camera_ids:
+            served[window_start] = features
+        window_start = math.floor(sim_time / builder.window) * builder.window
+    return served
+
+
+@pytest.mark.parametrize('lags', [0, 2])
+def test_served_features_match_the_training_features(busy_recording, tmp_path, lags):
+    manifest = FeaturePipeline(busy_recording, str(tmp_path / 'features'), CAMERAS, window=1.0, lags=lags,
+                               validation_split=0.0, max_workers=1).run()
+    rows = np.concatenate(load_shards(str(tmp_path / 'features')))
+    columns = feature_columns(lags)
+    assert manifest['splits']['validation'] == []
+    assert not np.isnan(rows).any()
+
+    served = serve_features(busy_recording, FeatureBuilder(window=1.0, lags=lags))
+    starts = sorted(set(rows[:, columns.index('window_start')].tolist()))
+    assert len(starts) == 9 - lags
+    features = slice(columns.index('vehicle_count'), columns.index('historical_patterns') + 1)
+    for start in starts:
+        trained = rows[rows[:, 0] == start][:, features]
+        np.testing.assert_allclose(served[start], trained, rtol=1e-6)
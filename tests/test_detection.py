@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from traffic_sim.simulation.camera import Camera
+from traffic_sim.simulation.detection import DetectionEngine
+
+
+def make_cameras():
+    return {
+        'cam_a': Camera('cam_a', (100.0, 100.0), 50.0),
+        'cam_b': Camera('cam_b', (130.0, 100.0), 40.0),  # overlaps cam_a
+        'cam_c': Camera('cam_c', (800.0, 300.0), 75.0)
+    }
+
+
+def loop_detections(cameras, positions):
+    """Detections of the original per-camera, per-vehicle loop."""
+    vehicles = [{'id': i, 'position': tuple(position), 'speed': 0.0, 'edge': '', 'route': '', 'type': ''}
+                for i, position in enumerate(positions.tolist())]
+    result = {}
+    for camera_id, camera in cameras.items():
+        camera.detect_vehicles(vehicles)
+        result[camera_id] = ([vehicle['id'] for vehicle in camera.detected_vehicles],
+                             [vehicle['distance_to_camera'] for vehicle in camera.detected_vehicles])
+    return result
+
+
+def test_batched_detection_matches_the_per_camera_loop():
+    rng = np.random.default_rng(1)
+    positions = rng.uniform(0, 1000, size=(5000, 2))
+    positions[:20] = rng.uniform(60, 160, size=(20, 2))  # make sure the overlap is populated
+    cameras = make_cameras()
+    expected = loop_detections(cameras, positions)
+
+    detections = DetectionEngine(cameras).detect(positions)
+    assert set(detections) == set(cameras)
+    for camera_id, (ids, distances) in expected.items():
+        slots, hit_distances = detections[camera_id]
+        assert slots.tolist() == ids
+        np.testing.assert_allclose(hit_distances, distances)
+    assert len(detections['cam_a'][0]) and len(detections['cam_b'][0])
+
+
+def test_detection_is_the_same_in_small_blocks(monkeypatch):
+    rng = np.random.default_rng(2)
+    positions = rng.uniform(0, 1000, size=(3000, 2))
+    cameras = make_cameras()
+    expected = DetectionEngine(cameras).detect(positions)
+    monkeypatch.setattr(DetectionEngine, 'MAX_BLOCK_PAIRS', 7)
+    blocked = DetectionEngine(cameras).detect(positions)
+    for camera_id in cameras:
+        assert blocked[camera_id][0].tolist() == expected[camera_id][0].tolist()
+
+
+def test_radius_is_inclusive_and_nan_rows_are_never_detected():
+    cameras = {'cam': Camera('cam', (0.0, 0.0), 10.0)}
+    positions = np.array([[10.0, 0.0], [np.nan, np.nan], [10.0001, 0.0], [0.0, -3.0]])
+    slots, distances = DetectionEngine(cameras).detect(positions)['cam']
+    assert slots.tolist() == [0, 3]
+    assert distances.tolist() == pytest.approx([10.0, 3.0])
+
+
+def test_no_vehicles_gives_empty_detections():
+    detections = DetectionEngine(make_cameras()).detect(np.empty((0, 2)))
+    assert all(len(slots) == 0 for slots, _ in detections.values())
@@ -0,0 +1,105 @@
+import threading
+import time
+
+from traffic_sim.simulation.frame_broadcaster import FrameBroadcaster
+
+
+class CountingStream:
+    camera_id = 'cam'
+
+    def __init__(self):
+        self.frames = 0
+
+    def encode_frame(self):
+        self.frames += 1
+        return b'frame %d' % self.frames
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def test_subscribers_share_each_encoded_frame():
+    stream = CountingStream()
+    encode = stream.encode_frame
+    both_subscribed = threading.Event()
+
+    def encode_once_both_subscribed():
+        both_subscribed.wait(5)
+        return encode()
+
+    stream.encode_frame = encode_once_both_subscribed
+    broadcaster = FrameBroadcaster(stream, fps=1000)
+    first = broadcaster.subscribe()
+    second = broadcaster.subscribe()
+    both_subscribed.set()
+    try:
+        assert first.get(timeout=5) == second.get(timeout=5) == b'frame 1'
+        assert broadcaster.frames_encoded >= 1
+        assert stream.frames <= broadcaster.frames_encoded + 1  # one encode per tick, not per viewer
+    finally:
+        broadcaster.unsubscribe(first)
+        broadcaster.unsubscribe(second)
+
+
+def test_a_stalled_subscriber_only_holds_the_newest_frame():
+    stream = CountingStream()
+    broadcaster = FrameBroadcaster(stream, fps=1000)
+    stalled = broadcaster.subscribe()
+    try:
+        # The render thread keeps going although nobody reads the queue
+        wait_until(lambda: broadcaster.frames_encoded >= 20)
+        assert broadcaster.frames_dropped > 0
+        assert stalled.qsize() == 1
+        frames_before = broadcaster.frames_encoded
+        newest = stalled.get_nowait()
+        assert int(newest.split()[1]) >= frames_before
+    finally:
+        broadcaster.unsubscribe(stalled)
+
+
+def test_the_render_thread_stops_once_every_viewer_left():
+    stream = CountingStream()
+    broadcaster = FrameBroadcaster(stream, fps=1000)
+    frames = broadcaster.generate_frames()
+    assert next(frames).startswith(b'--frame\r\nContent-Type: image/jpeg\r\n\r\nframe ')
+    assert broadcaster.subscriber_count() == 1
+    thread = broadcaster._thread
+
+    frames.close()  # the viewer disconnected
+    assert broadcaster.subscriber_count() == 0
+    thread.join(5)
+    assert not thread.is_alive()
+    encoded = stream.frames
+    time.sleep(0.02)
+    assert stream.frames == encoded
+
+    # A new viewer starts rendering again
+    restarted = broadcaster.subscribe()
+    try:
+        assert restarted.get(timeout=5)
+    finally:
+        broadcaster.unsubscribe(restarted)
+
+
+def test_render_errors_do_not_stop_the_stream():
+    stream = CountingStream()
+    encode = stream.encode_frame
+    failures = []
+
+    def flaky_encode():
+        if not failures:
+            failures.append(1)
+            raise RuntimeError("encoder failed")
+        return encode()
+
+    stream.encode_frame = flaky_encode
+    broadcaster = FrameBroadcaster(stream, fps=1000)
+    subscriber = broadcaster.subscribe()
+    try:
+        assert subscriber.get(timeout=5) == b'frame 1'
+    finally:
+        broadcaster.unsubscribe(subscriber)
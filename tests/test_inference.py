@@ -0,0 +1,88 @@
+import time
+
+import numpy as np
+import pytest
+
+from traffic_sim.benchmarks.suite import make_controller
+from traffic_sim.ml.inference import FeatureBuilder, PredictionService
+from traffic_sim.simulation.camera import Camera
+from traffic_sim.simulation.detection import DetectionEngine
+from traffic_sim.simulation.vehicle_store import VehicleStore
+
+
+def observed_cameras(speeds):
+    """Return a camera that detects vehicles with the given speeds and one that detects none."""
+    store = VehicleStore(capacity=8)
+    ids = [f'v{i}' for i in range(len(speeds))]
+    store.update(ids, [(float(i), 0.0) for i in range(len(ids))], speeds, ['lane'] * len(ids),
+                 ['edge'] * len(ids), ['route'] * len(ids), ['car'] * len(ids))
+    cameras = {'busy': Camera('busy', (0.0, 0.0), 50.0), 'empty': Camera('empty', (900.0, 900.0), 10.0)}
+    vehicles = store.view()
+    for camera_id, (slots, distances) in DetectionEngine(cameras).detect(vehicles.xy).items():
+        cameras[camera_id].update_detections(vehicles, slots, distances, 1.0)
+    return cameras
+
+
+def test_features_are_built_per_window():
+    builder = FeatureBuilder(window=10.0, lags=2)
+    assert builder.build(observed_cameras([4.0, 8.0]), 43200.0) == ((), None)
+    assert builder.build(observed_cameras([6.0, 6.0, 6.0, 6.0]), 43205.0) == ((), None)
+
+    # The first tick of the next window completes this one
+    camera_ids, features = builder.build(observed_cameras([]), 43210.0)
+    assert camera_ids == ('busy', 'empty')
+    assert features.dtype == np.float32
+    # Per-tick mean count, mean speed of every detection, window start, and no history yet
+    np.testing.assert_allclose(features, [[3, 36 / 6, 0.5, 3], [0, 0.0, 0.5, 0]])
+
+    _, features = builder.build(observed_cameras([1.0]), 43220.0)
+    assert features[0, 0] == 0.0
+    assert features[0, 3] == pytest.approx(3.0)  # the mean count of the lagged windows
+
+
+def test_without_lags_a_window_is_its_own_history():
+    builder = FeatureBuilder(window=1.0, lags=0)
+    builder.build(observed_cameras([4.0, 8.0]), 0.0)
+    _, features = builder.build(observed_cameras([]), 1.0)
+    assert not np.isnan(features).any()
+    assert features[0, 3] == features[0, 0] == 2.0
+
+
+class StubPredictions:
+    def latest(self):
+        return {'cameras': {'busy': {'congestion_probability': 0.9, 'congested': True}}, 'stats': {}}
+
+    def close(self):
+        pass
+
+
+def test_traffic_metrics_and_snapshots_include_the_latest_predictions():
+    controller = make_controller(20)
+    try:
+        assert 'predictions' not in controller.get_traffic_metrics()
+        controller.predictions = StubPredictions()
+        controller._publish_snapshot(controller.connection.time)
+        metrics = controller.get_traffic_metrics()
+        assert metrics['predictions'] == StubPredictions().latest()
+        assert controller.snapshots.latest().metrics == metrics
+    finally:
+        controller.close()
+
+
+def test_spawned_worker_answers_submitted_ticks():
+    service = PredictionService({'inference': {'max_latency_ms': 1}, 'features': {'window': 1.0, 'lags': 1}})
+    try:
+        assert service._process.is_alive()  # started with the service, not on the first tick
+        cameras = observed_cameras([4.0, 8.0])
+        for step in range(4):
+            service.submit(step, float(step), cameras)  # each tick completes the previous window
+        deadline = time.monotonic() + 30
+        while service.answered < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        latest = service.latest()
+        assert latest['step'] == 3
+        assert set(latest['cameras']) == {'busy', 'empty'}
+        assert service.stats()['queue_depth'] == 0
+    finally:
+        service.close()
+    assert service._process is None
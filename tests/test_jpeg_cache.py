@@ -0,0 +1,71 @@
+import random
+
+from traffic_sim.simulation.jpeg_cache import RUN_TOKEN, JpegSnapshotCache
+from traffic_sim.simulation.video_stream import VideoStream
+
+
+class FakeStream:
+    def __init__(self):
+        self.frames = []
+
+    def encode_frame(self, metrics=None, rng=random):
+        self.frames.append(metrics)
+        return b'frame %d' % len(self.frames)
+
+
+class FakeSnapshot:
+    def __init__(self, version, step, metrics=None):
+        self.version = version
+        self.step = step
+        self.metrics = metrics or {}
+
+
+METRICS = {'total_vehicles': 8, 'average_speed': 10.0, 'density': 1.0,
+           'vehicles_per_camera': {'cam_north': 5, 'cam_east': 3}}
+
+
+def test_one_encode_per_camera_and_snapshot_version():
+    stream = FakeStream()
+    cache = JpegSnapshotCache({'cam': stream}, max_workers=1)
+    try:
+        assert cache.get('cam', FakeSnapshot(1, 10)).result() == b'frame 1'
+        assert cache.get('cam', FakeSnapshot(1, 10)).result() == b'frame 1'
+        # A replay seeking back repeats step 10 in a newer snapshot
+        assert cache.get('cam', FakeSnapshot(2, 10, {'count': 2})).result() == b'frame 2'
+        assert cache.encodes == 2
+        assert stream.frames == [{}, {'count': 2}]  # rendered from the snapshot, not live state
+    finally:
+        cache.shutdown()
+
+
+def test_a_snapshot_encodes_to_the_same_bytes_in_every_process():
+    # Each HTTP worker has its own cache and stream, as forked serving workers do
+    caches = [JpegSnapshotCache({'cam_north': VideoStream('cam_north')}, max_workers=1) for _ in range(2)]
+    try:
+        snapshot = FakeSnapshot(7, 3, METRICS)
+        first, second = (cache.get('cam_north', snapshot).result() for cache in caches)
+        assert first == second
+        assert caches[0].get('cam_north', FakeSnapshot(8, 3, METRICS)).result() != first
+    finally:
+        for cache in caches:
+            cache.shutdown()
+
+
+def test_entity_tags_differ_between_runs():
+    first = JpegSnapshotCache({}, run_token='aaaa')
+    restarted = JpegSnapshotCache({}, run_token='bbbb')
+    try:
+        assert first.etag('cam', 5) == first.etag('cam', 5)
+        assert first.etag('cam', 5) != first.etag('cam', 6)
+        assert first.etag('cam', 5) != restarted.etag('cam', 5)
+    finally:
+        first.shutdown()
+        restarted.shutdown()
+
+
+def test_caches_of_one_process_share_the_run_token():
+    cache = JpegSnapshotCache({})
+    try:
+        assert cache.etag('cam', 5) == f'{RUN_TOKEN}-cam-5'
+    finally:
+        cache.shutdown()
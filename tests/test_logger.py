@@ -0,0 +1,88 @@
+import json
+import logging
+import queue
+
+import pytest
+
+from traffic_sim.simulation import logger as sim_logger
+from traffic_sim.simulation.logger import BoundedQueueHandler, CategorySampler, JsonFormatter
+from traffic_sim.simulation.perf import logging_stats_text
+
+
+@pytest.fixture
+def pipeline():
+    """Install a pipeline whose writer thread is stopped, so records stay queued."""
+    sim_logger.configure_logging({'level': 'INFO', 'queue_size': 2,
+                                  'categories': {'vehicle': {'sample_rate': 0.0}}})
+    sim_logger._pipeline.listener.stop()
+    yield sim_logger._pipeline
+    # Shutting down with a full queue waits for the writer to make room
+    sim_logger._pipeline.listener.start()
+    sim_logger.shutdown_logging()
+
+
+def test_full_queue_drops_records_instead_of_blocking():
+    handler = BoundedQueueHandler(queue.Queue(maxsize=1))
+    record = logging.LogRecord('test', logging.INFO, __file__, 1, 'message', (), None)
+    handler.emit(record)
+    handler.emit(record)
+    assert handler.dropped == 1
+
+
+def test_sampler_counts_every_outcome():
+    sampler = CategorySampler(rate_limit=3)
+    assert len(sampler.select(5)) == 3
+    assert not sampler.admit()
+    assert sampler.stats() == {'sample_rate': 1.0, 'rate_limit': 3, 'emitted': 3,
+                               'sampled_out': 0, 'rate_limited': 3}
+
+    sampler = CategorySampler(sample_rate=0.0)
+    assert not sampler.enabled
+    assert not sampler.admit()
+    assert sampler.stats()['sampled_out'] == 1
+
+
+def test_logging_stats_report_drops_and_categories(pipeline):
+    for second in range(4):
+        sim_logger.log_camera_detection('cam', ['a'], float(second))
+    stats = sim_logger.logging_stats()
+    assert stats['queued'] == 2
+    assert stats['dropped'] == 2
+    assert stats['categories']['camera']['emitted'] == 4
+    assert not sim_logger.category_enabled('vehicle')
+
+
+def test_logging_stats_prometheus_text(pipeline):
+    sim_logger.log_camera_detection('cam', ['a'], 1.0)
+    text = logging_stats_text(sim_logger.logging_stats())
+    assert 'traffic_sim_log_queued_records 1\n' in text
+    assert 'traffic_sim_log_dropped_records_total 0\n' in text
+    assert 'traffic_sim_log_records_total{category="camera",outcome="emitted"} 1\n' in text
+    assert 'traffic_sim_log_records_total{category="vehicle",outcome="sampled_out"} 0\n' in text
+    assert logging_stats_text({}) == ''
+
+
+def format_record(fields, category='camera'):
+    record = logging.LogRecord('test', logging.INFO, __file__, 1, 'message %s', ('text',), None)
+    record.category = category
+    record.fields = fields
+    return json.loads(JsonFormatter().format(record))
+
+
+def test_json_fields_never_replace_the_record_keys():
+    entry = format_record({'time': 12.5, 'level': 'x', 'category': 'y', 'message': 'z', 'speed': 3.0})
+    assert entry['time'] != 12.5
+    assert (entry['level'], entry['category'], entry['message']) == ('INFO', 'camera', 'message text')
+    assert entry['speed'] == 3.0
+
+
+def test_zone_events_log_simulation_time_separately(pipeline, monkeypatch):
+    records = []
+    monkeypatch.setattr(sim_logger._pipeline.handler, 'enqueue', records.append)
+    sim_logger.log_camera_zone_events('cam', [
+        {'event': 'exit', 'vehicle_id': 'a', 'time': 12.5, 'dwell': 2.0, 'entry_speed': 1.0, 'exit_speed': 3.0}
+    ])
+    entry = json.loads(JsonFormatter().format(records[0]))
+    assert entry['sim_time'] == 12.5
+    assert entry['time'] == records[0].created
+    assert (entry['camera_id'], entry['vehicle_id'], entry['event'], entry['dwell']) == ('cam', 'a', 'exit', 2.0)
@@ -0,0 +1,60 @@
+import pytest
+
+from traffic_sim.simulation.camera import Camera
+from traffic_sim.simulation.detection import DetectionEngine
+from traffic_sim.simulation.metrics import MetricsAggregator
+from traffic_sim.simulation.vehicle_store import VehicleStore
+
+
+def update(store, vehicles):
+    """Replace the store's population with {id: (x, y, speed, lane)}."""
+    ids = list(vehicles)
+    store.update(
+        ids,
+        [vehicles[vehicle_id][:2] for vehicle_id in ids],
+        [vehicles[vehicle_id][2] for vehicle_id in ids],
+        [vehicles[vehicle_id][3] for vehicle_id in ids],
+        ['edge'] * len(ids), ['route'] * len(ids), ['car'] * len(ids)
+    )
+
+
+def test_aggregates_match_a_plain_python_computation():
+    store = VehicleStore(capacity=4)
+    cameras = {'cam': Camera('cam', (0.0, 0.0), 10.0)}
+    metrics = MetricsAggregator(cameras)
+    metrics.set_lane_lengths({'l1': 500.0, 'l2': 1500.0})
+    update(store, {'a': (0, 0, 10, 'l1'), 'b': (5, 0, 20, 'l1'), 'c': (50, 0, 6, 'l2')})
+    vehicles = store.view()
+    slots, distances = DetectionEngine(cameras).detect(vehicles.xy)['cam']
+    cameras['cam'].update_detections(vehicles, slots, distances, 1.0)
+
+    metrics.update(7, 1.0, vehicles, cameras)
+    current = metrics.current()
+    assert current['step'] == 7
+    assert current['total_vehicles'] == 3
+    assert current['average_speed'] == pytest.approx(12.0)
+    assert current['density'] == pytest.approx(1.5)
+    assert current['vehicles_per_camera'] == {'cam': 2}
+    assert current['average_speed_per_lane'] == pytest.approx({'l1': 15.0, 'l2': 6.0})
+
+
+def test_each_update_replaces_the_previous_step():
+    store = VehicleStore(capacity=4)
+    metrics = MetricsAggregator()
+    update(store, {'a': (0, 0, 10, 'l1'), 'b': (0, 0, 30, 'l2')})
+    metrics.update(1, 1.0, store.view(), {})
+    previous = metrics.current()
+
+    update(store, {'b': (0, 0, 40, 'l2')})
+    metrics.update(2, 2.0, store.view(), {})
+    assert metrics.current()['average_speed_per_lane'] == {'l2': 40.0}
+    assert metrics.current()['average_speed'] == 40.0
+    assert previous['average_speed_per_lane'] == {'l1': 10.0, 'l2': 30.0}
+
+
+def test_empty_network():
+    metrics = MetricsAggregator(['cam'])
+    assert metrics.current()['vehicles_per_camera'] == {'cam': 0}
+    metrics.update(1, 1.0, VehicleStore(capacity=2).view(), {})
+    assert metrics.current()['average_speed'] == 0.0
+    assert metrics.current()['density'] == 0.0
@@ -0,0 +1,119 @@
+import threading
+
+import pytest
+
+from traffic_sim.simulation.metrics_history import MetricsHistory, RingBuffer, Rollup
+
+
+def sample(time, vehicles=0, speed=0.0):
+    return {'simulation_time': time, 'total_vehicles': vehicles, 'average_speed': speed, 'density': 0.0}
+
+
+def test_ring_buffer_keeps_the_newest_samples_across_wraparound():
+    buffer = RingBuffer(4)
+    for time in range(10):
+        buffer.append(float(time), sample(time, vehicles=time))
+    assert buffer.count == 4
+    assert (buffer.oldest_time(), buffer.latest_time()) == (6.0, 9.0)
+
+    times, values = buffer.range(0, 100)
+    assert times.tolist() == [6.0, 7.0, 8.0, 9.0]
+    assert values['total_vehicles'].tolist() == [6, 7, 8, 9]
+
+
+@pytest.mark.parametrize('start, end, expected', [
+    (7, 8, [7.0, 8.0]),          # spans the physical wrap point
+    (6.5, 7.5, [7.0]),
+    (8, 9, [8.0, 9.0]),
+    (9, 9, [9.0]),               # bounds are inclusive
+    (0, 5.9, []),                # overwritten samples are gone
+    (9.1, 20, [])
+])
+def test_ring_buffer_range_bounds(start, end, expected):
+    buffer = RingBuffer(4)
+    for time in range(10):
+        buffer.append(float(time), sample(time))
+    times, _ = buffer.range(start, end)
+    assert times.tolist() == expected
+
+
+def test_ring_buffer_before_it_fills_and_after_clear():
+    buffer = RingBuffer(4)
+    assert buffer.latest_time() is None
+    buffer.append(1.0, sample(1))
+    buffer.append(2.0, sample(2))
+    assert buffer.range(0, 10)[0].tolist() == [1.0, 2.0]
+    buffer.clear()
+    assert buffer.oldest_time() is None
+    assert buffer.range(0, 10)[0].tolist() == []
+
+
+def test_rollup_averages_each_bucket_and_wraps():
+    rollup = Rollup(10.0, capacity=3)
+    for step in range(60):
+        time = step * 0.9
+        rollup.add(time, sample(time, vehicles=int(time // 10)))
+    # Buckets close when time moves past them; the one holding 53.1 is still open
+    times, values = rollup.buffer.range(0, 100)
+    assert times.tolist() == [20.0, 30.0, 40.0]
+    assert values['total_vehicles'].tolist() == [2.0, 3.0, 4.0]
+
+
+def test_rollup_keeps_accumulated_step_times_in_the_right_bucket():
+    rollup = Rollup(1.0, capacity=10)
+    time = 0.0
+    for _ in range(40):
+        rollup.add(time, sample(time, speed=1.0))
+        time += 0.1
+    times, _ = rollup.buffer.range(0, 10)
+    assert times.tolist() == [0.0, 1.0, 2.0]
+
+
+def test_history_clears_when_simulation_time_goes_backwards():
+    history = MetricsHistory(step_time=1.0, step_capacity=100, duration=600)
+    for time in range(20):
+        history.record(sample(float(time), vehicles=1))
+    history.record(sample(0.0, vehicles=5))
+    result = history.query(0, 100, resolution='step')
+    assert result['time'] == [0.0]
+    assert result['total_vehicles'] == [5]
+
+
+def test_history_query_resolutions():
+    history = MetricsHistory(step_time=1.0, step_capacity=100, duration=600)
+    for time in range(300):
+        history.record(sample(float(time), vehicles=time))
+    assert history.query(250, 299)['resolution'] == 'step'
+    # The raw buffer no longer reaches back to 100, so auto falls back to a rollup
+    assert history.query(100, 299)['resolution'] == '1s'
+    assert history.query(0, 299, resolution='1m')['time'] == [0.0, 60.0, 120.0, 180.0]
+    with pytest.raises(ValueError):
+        history.query(10, 5)
+    with pytest.raises(ValueError):
+        history.query(0, 10, resolution='5s')
+
+
+def test_a_query_is_not_interleaved_with_a_new_run_clearing_the_history():
+    history = MetricsHistory(step_time=1.0, step_capacity=4)
+    for second in range(6):
+        history.record(sample(float(second), vehicles=second))
+    raw_range = history.raw.range
+    writers = []
+
+    def range_while_the_simulation_restarts(start, end):
+        # A new run records time 0 while the query is between its reads
+        writer = threading.Thread(target=history.record, args=(sample(0.0, vehicles=100),))
+        writer.start()
+        writer.join(0.05)
+        writers.append(writer)
+        assert writer.is_alive()  # the record waits for the query
+        return raw_range(start, end)
+
+    history.raw.range = range_while_the_simulation_restarts
+    result = history.query(0.0, 10.0, 'step')
+    history.raw.range = raw_range
+    assert result['time'] == [2.0, 3.0, 4.0, 5.0]
+    assert result['total_vehicles'] == [2, 3, 4, 5]
+
+    writers[0].join(5)
+    assert history.query(0.0, 10.0, 'step')['total_vehicles'] == [100]
@@ -0,0 +1,62 @@
+import json
+
+from traffic_sim.simulation.metrics_stream import MetricsStream
+
+
+class FakeSnapshot:
+    def __init__(self, version, metrics, detections):
+        self.version = version
+        self.metrics = metrics
+        self._detections = detections
+
+    def detections(self):
+        return self._detections
+
+    def is_valid(self):
+        return True
+
+
+class FakeSource:
+    def __init__(self, snapshots):
+        self.snapshots = snapshots
+
+    def wait_for_snapshot(self, version, timeout=None):
+        """Return the next scripted snapshot, or the same one again to time out."""
+        if self.snapshots:
+            return self.snapshots.pop(0)
+        return FakeSnapshot(version, {}, {})
+
+
+def take(iterator, count):
+    return [next(iterator) for _ in range(count)]
+
+
+def test_only_changed_metrics_and_detections_are_sent():
+    source = FakeSource([
+        FakeSnapshot(1, {'step': 1, 'total_vehicles': 4}, {'cam': ['a']}),
+        FakeSnapshot(2, {'step': 2, 'total_vehicles': 4}, {'cam': ['a']}),
+        FakeSnapshot(3, {'step': 3, 'total_vehicles': 5}, {'cam': ['a', 'b']}),
+    ])
+    updates = take(MetricsStream(source, min_interval=0).updates(), 6)
+    assert updates == [
+        ('metrics', {'step': 1, 'total_vehicles': 4, 'version': 1}),
+        ('detections', {'version': 1, 'cameras': {'cam': ['a']}}),
+        ('metrics', {'step': 2, 'version': 2}),
+        ('metrics', {'step': 3, 'total_vehicles': 5, 'version': 3}),
+        ('detections', {'version': 3, 'cameras': {'cam': ['a', 'b']}}),
+        (None, None),  # no newer snapshot before the keep-alive timeout
+    ]
+
+
+def test_server_sent_events_format():
+    source = FakeSource([FakeSnapshot(1, {'step': 1}, {})])
+    events = take(MetricsStream(source, min_interval=0).server_sent_events(), 2)
+    assert events[0] == 'event: metrics\ndata: {"step":1,"version":1}\n\n'
+    assert events[1] == ': keep-alive\n\n'
+
+
+def test_websocket_messages_skip_keep_alives():
+    source = FakeSource([FakeSnapshot(1, {'step': 1}, {}), FakeSnapshot(1, {}, {}),
+                         FakeSnapshot(2, {'step': 2}, {})])
+    messages = take(MetricsStream(source, min_interval=0).websocket_messages(), 2)
+    assert [json.loads(message)['data']['version'] for message in messages] == [1, 2]
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from traffic_sim.simulation.microsim import MicroSimulation
+from traffic_sim.simulation.road_network import RoadNetwork
+from traffic_sim.simulation.vehicle_store import VehicleStore
+
+VEHICLE_TYPES = [{'type': 'car', 'length': 5.0, 'max_speed': 15.0, 'probability': 1.0}]
+
+
+def make_network():
+    """Two 200 m straight edges in a row along the x axis."""
+    lanes = [
+        ('a_0', 'a', 200.0, 13.9, [(0.0, 0.0), (200.0, 0.0)]),
+        ('b_0', 'b', 200.0, 13.9, [(200.0, 0.0), (400.0, 0.0)]),
+    ]
+    return RoadNetwork(lanes, {'a': ['a_0'], 'b': ['b_0']}, connections=[('a_0', 'b_0')])
+
+
+def make_simulation(flow_rates, vehicles=None, seed=1):
+    return MicroSimulation(make_network(), {'ab': ['a', 'b']}, VEHICLE_TYPES, flow_rates,
+                           VehicleStore(capacity=8) if vehicles is None else vehicles,
+                           step_time=0.5, seed=seed)
+
+
+def test_vehicles_follow_without_overlapping():
+    simulation = make_simulation({'additional_vehicles': 10})
+    for _ in range(120):
+        simulation.step()
+        simulation._sort()
+        same_lane = simulation.lane[1:] == simulation.lane[:-1]
+        gaps = simulation.offset[1:] - simulation.offset[:-1] - 5.0
+        assert np.all(gaps[same_lane] >= -1e-6)
+        assert np.all(simulation.speed >= 0)
+        assert np.all(simulation.speed <= 13.9 * 1.2 + 1e-6)
+    assert simulation.spawned == 10
+    assert simulation.arrived > 0
+
+
+def test_store_holds_the_positions_of_the_vehicles_in_the_network():
+    store = VehicleStore(capacity=2)
+    simulation = make_simulation({'additional_vehicles': 6}, store)
+    for _ in range(80):
+        simulation.step()
+    vehicles = store.view()
+    assert len(vehicles) == len(simulation)
+    expected = simulation.network.positions(simulation.lane, simulation.offset)
+    np.testing.assert_allclose(vehicles.xy[simulation.slot], expected)
+    np.testing.assert_allclose(vehicles.speed[simulation.slot], simulation.speed)
+    assert {vehicles.lanes.lookup(code) for code in vehicles.lane[simulation.slot].tolist()} <= {'a_0', 'b_0'}
+
+
+def test_arrived_vehicles_release_their_slots():
+    store = VehicleStore(capacity=8)
+    simulation = make_simulation({'additional_vehicles': 3}, store)
+    for _ in range(400):
+        simulation.step()
+    assert simulation.arrived == 3
+    assert len(simulation) == 0
+    assert len(store) == 0
+
+
+def test_skipped_writes_leave_the_store_unchanged():
+    store = VehicleStore(capacity=8)
+    simulation = make_simulation({'additional_vehicles': 2}, store)
+    simulation.step()
+    version = store.version
+    simulation.step(write=False)
+    assert store.version == version
+
+
+@pytest.mark.parametrize('sim_time, rate', [(0.0, 100.0), (7 * 3600.0, 900.0), (9 * 3600.0, 100.0),
+                                            (86400 + 7.5 * 3600, 900.0)])
+def test_flow_rate_follows_the_configured_peaks(sim_time, rate):
+    simulation = make_simulation({
+        'base_flow': {'vehicles_per_hour': 100},
+        'morning_peak': {'start_time': '07:00', 'end_time': '09:00', 'vehicles_per_hour': 900}
+    })
+    assert simulation.flow_rate(sim_time) == rate
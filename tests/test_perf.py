@@ -0,0 +1,63 @@
+import pytest
+
+from traffic_sim.simulation.perf import PerfStats, configure_perf
+
+
+def test_observations_land_in_cumulative_buckets():
+    stats = PerfStats(buckets=(0.01, 0.1, 1.0))
+    histogram = stats.histogram('traffic_sim_phase_seconds', phase='step')
+    for value in (0.005, 0.01, 0.05, 0.5, 3.0):
+        histogram.observe(value)
+    cumulative, total, count = histogram.snapshot()
+    assert cumulative == [2, 3, 4, 5]
+    assert count == 5
+    assert total == pytest.approx(3.565)
+    assert stats.histogram('traffic_sim_phase_seconds', phase='step') is histogram
+
+
+def test_prometheus_text():
+    stats = PerfStats(buckets=(0.5,))
+    stats.histogram('traffic_sim_http_request_seconds', route='/camera/<camera_id>/data').observe(0.25)
+    stats.histogram('traffic_sim_phase_seconds', phase='step').observe(1.0)
+    assert stats.prometheus_text().splitlines() == [
+        '# HELP traffic_sim_http_request_seconds Latency of HTTP requests by route.',
+        '# TYPE traffic_sim_http_request_seconds histogram',
+        'traffic_sim_http_request_seconds_bucket{route="/camera/<camera_id>/data",le="0.5"} 1',
+        'traffic_sim_http_request_seconds_bucket{route="/camera/<camera_id>/data",le="+Inf"} 1',
+        'traffic_sim_http_request_seconds_sum{route="/camera/<camera_id>/data"} 0.25',
+        'traffic_sim_http_request_seconds_count{route="/camera/<camera_id>/data"} 1',
+        '# HELP traffic_sim_phase_seconds Duration of each phase of a simulation step.',
+        '# TYPE traffic_sim_phase_seconds histogram',
+        'traffic_sim_phase_seconds_bucket{phase="step",le="0.5"} 0',
+        'traffic_sim_phase_seconds_bucket{phase="step",le="+Inf"} 1',
+        'traffic_sim_phase_seconds_sum{phase="step"} 1.0',
+        'traffic_sim_phase_seconds_count{phase="step"} 1',
+    ]
+
+
+def test_exporting_while_a_new_histogram_is_created():
+    stats = PerfStats(buckets=(0.1,))
+    histogram = stats.histogram('traffic_sim_phase_seconds', phase='step')
+    snapshot = histogram.snapshot
+
+    def snapshot_during_request():
+        # A request thread records a new route while the export is running
+        stats.histogram('traffic_sim_http_request_seconds', route=f'/r{len(stats.histograms)}')
+        return snapshot()
+
+    histogram.snapshot = snapshot_during_request
+    assert list(stats.as_dict()) == ['traffic_sim_phase_seconds']
+    assert 'traffic_sim_phase_seconds_count{phase="step"} 0' in stats.prometheus_text()
+    assert len(stats.histograms) == 3
+
+
+def test_timed_wrapper_observes_every_call():
+    stats = PerfStats()
+    timed = stats.timed(lambda value: value * 2, 'traffic_sim_phase_seconds', phase='metrics')
+    assert timed(2) == 4
+    assert stats.as_dict()['traffic_sim_phase_seconds'][0]['count'] == 1
+
+
+def test_disabled_by_default():
+    assert configure_perf(None) is None
+    assert configure_perf({'enabled': True, 'buckets': [1, 0.1]}).buckets == (0.1, 1)
@@ -0,0 +1,65 @@
+import threading
+
+import pytest
+
+from traffic_sim.simulation.replay import ReplaySource
+from traffic_sim.simulation.trajectory import TrajectoryRecorder
+from traffic_sim.simulation.vehicle_store import VehicleStore
+
+
+def record(directory, times):
+    """Record one vehicle per step at the given simulation times."""
+    store = VehicleStore(capacity=4)
+    recorder = TrajectoryRecorder(directory, steps_per_chunk=3)
+    for step, sim_time in enumerate(times, start=1):
+        store.update([f'v{step}'], [(sim_time, 0.0)], [float(step)], ['edge_a_0'], ['edge_a'], ['r'], ['car'])
+        recorder.record(step, sim_time, store.view())
+    recorder.close()
+    return directory
+
+
+def test_replay_yields_the_recorded_columns(tmp_path):
+    source = ReplaySource(record(str(tmp_path), [0.5, 1.0, 1.5, 2.0]), speed=0)
+    steps = []
+    while (entry := source.next_step()) is not None:
+        steps.append(entry)
+    assert [(step, sim_time) for step, sim_time, _ in steps] == [(1, 0.5), (2, 1.0), (3, 1.5), (4, 2.0)]
+    ids, positions, speeds, lanes, edges, routes, types = steps[3][2]
+    assert ids == ['v4']
+    assert positions.tolist() == [[2.0, 0.0]]
+    assert speeds.tolist() == [4.0]
+    assert (lanes, edges) == (['edge_a_0'], ['edge_a'])
+
+
+@pytest.mark.parametrize('sim_time, position', [(0.0, 0), (1.0, 1), (1.2, 2), (9.0, 3)])
+def test_position_of_on_a_regular_recording(tmp_path, sim_time, position):
+    source = ReplaySource(record(str(tmp_path), [0.5, 1.0, 1.5, 2.0]), speed=0)
+    assert source.position_of(sim_time) == position
+
+
+def test_position_of_falls_back_to_search_across_gaps(tmp_path):
+    source = ReplaySource(record(str(tmp_path), [0.5, 1.0, 5.0, 5.5]), speed=0)
+    assert source.position_of(3.0) == 2
+    assert source.position_of(5.5) == 3
+
+
+def test_seek_and_loop(tmp_path):
+    source = ReplaySource(record(str(tmp_path), [0.5, 1.0, 1.5]), speed=0, loop=True)
+    source.seek(1.5)
+    assert source.next_step()[0] == 3
+    assert source.next_step()[0] == 1
+    assert source.status()['time'] == 1.0
+
+
+def test_paced_replay_stops_when_asked(tmp_path):
+    source = ReplaySource(record(str(tmp_path), [0.0, 1000.0]), speed=1.0)
+    stop = threading.Event()
+    assert source.next_step(stop)[0] == 1
+    stop.set()
+    assert source.next_step(stop) is None
+
+
+def test_an_empty_recording_cannot_be_replayed(tmp_path):
+    TrajectoryRecorder(str(tmp_path)).close()
+    with pytest.raises(ValueError):
+        ReplaySource(str(tmp_path))
@@ -0,0 +1,95 @@
+import gzip
+import threading
+
+import numpy as np
+import pytest
+from flask import Flask, request
+
+from traffic_sim.simulation.response_cache import ResponseCache, dumps, loads, parse_fields, project
+
+
+@pytest.fixture
+def app():
+    return Flask(__name__)
+
+
+def respond(app, cache, version, build, headers=None, query=''):
+    with app.test_request_context('/metrics' + query, headers=headers or {}):
+        return cache.respond(request, 'metrics', version, build)
+
+
+def test_dumps_handles_numpy_values():
+    assert loads(dumps({'count': np.int64(3), 'speeds': np.array([1.5, 2.0])})) == {'count': 3, 'speeds': [1.5, 2.0]}
+
+
+def test_fields_project_dicts_and_lists():
+    fields = parse_fields(' speed, id,,speed')
+    assert fields == ('id', 'speed')
+    assert project([{'id': 'a', 'speed': 1, 'lane': 'x'}], fields) == [{'id': 'a', 'speed': 1}]
+    assert project({'id': 'a'}, ()) == {'id': 'a'}
+
+
+def test_entries_are_rebuilt_only_for_newer_versions():
+    cache = ResponseCache()
+    calls = []
+
+    def build():
+        calls.append(1)
+        return 3, {'step': len(calls)}
+
+    first = cache.get('metrics', 2, build)
+    assert cache.get('metrics', 3, build) is first  # built from a newer snapshot than requested
+    assert cache.get('metrics', 4, build) is not first
+    assert (cache.builds, cache.hits) == (2, 1)
+
+
+def test_concurrent_misses_build_once():
+    cache = ResponseCache()
+    release = threading.Event()
+
+    def build():
+        release.wait(5)
+        return 1, {}
+
+    threads = [threading.Thread(target=cache.get, args=('metrics', 1, build)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert cache.builds == 1
+
+
+def test_gzip_and_identity_bodies_have_distinct_etags(app):
+    cache = ResponseCache(gzip_min_bytes=10)
+    payload = {'vehicles': list(range(100))}
+    build = lambda: (1, payload)
+
+    plain = respond(app, cache, 1, build)
+    zipped = respond(app, cache, 1, build, {'Accept-Encoding': 'gzip'})
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert loads(gzip.decompress(zipped.get_data())) == loads(plain.get_data()) == payload
+    plain_tag, zipped_tag = plain.get_etag()[0], zipped.get_etag()[0]
+    assert zipped_tag == plain_tag + '-gz'
+
+    # Either tag revalidates either representation of the same payload
+    for tag in (plain_tag, zipped_tag):
+        assert respond(app, cache, 1, build, {'If-None-Match': f'"{tag}"'}).status_code == 304
+        not_modified = respond(app, cache, 1, build, {'If-None-Match': f'"{tag}"', 'Accept-Encoding': 'gzip'})
+        assert not_modified.status_code == 304
+        assert not_modified.get_etag()[0] == zipped_tag
+
+
+def test_small_payloads_are_not_gzipped(app):
+    cache = ResponseCache(gzip_min_bytes=1024)
+    response = respond(app, cache, 1, lambda: (1, {'count': 1}), {'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+    assert not response.get_etag()[0].endswith('-gz')
+
+
+def test_changed_payload_does_not_match_the_old_etag(app):
+    cache = ResponseCache()
+    old = respond(app, cache, 1, lambda: (1, {'count': 1})).get_etag()[0]
+    response = respond(app, cache, 2, lambda: (2, {'count': 2}), {'If-None-Match': f'"{old}"'})
+    assert response.status_code == 200
+    assert loads(response.get_data()) == {'count': 2}
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from traffic_sim.benchmarks.suite import make_controller
+from traffic_sim.simulation.camera import Camera
+from traffic_sim.simulation.detection import DetectionEngine
+from traffic_sim.simulation.road_network import load_network
+from traffic_sim.simulation.sim_controller import NET_FILE
+
+
+@pytest.fixture(scope='module')
+def network():
+    return load_network(NET_FILE)
+
+
+def place_vehicles(network, count, seed=0):
+    """Return lanes, offsets and positions of vehicles spread over the network's lanes."""
+    rng = np.random.default_rng(seed)
+    lanes = rng.integers(len(network), size=count)
+    offsets = rng.uniform(0, network.lane_length[lanes])
+    return lanes, offsets, network.positions(lanes, offsets)
+
+
+def test_lane_coverage_matches_distance_detection(network):
+    cameras = {
+        'cam_a': Camera('cam_a', (498.0, 400.0), 50.0),
+        'cam_b': Camera('cam_b', (250.0, 0.0), 120.0),
+        'cam_c': Camera('cam_c', (500.0, 500.0), 30.0),  # covers the corner junction
+    }
+    lanes, offsets, positions = place_vehicles(network, 5000)
+    slots = np.arange(len(lanes))
+    by_lane = network.camera_coverage(cameras).detect(lanes, offsets, slots, positions)
+    by_distance = DetectionEngine(cameras).detect(positions)
+    for camera_id in cameras:
+        assert len(by_lane[camera_id][0]) > 0
+        np.testing.assert_array_equal(by_lane[camera_id][0], by_distance[camera_id][0])
+        np.testing.assert_allclose(by_lane[camera_id][1], by_distance[camera_id][1])
+
+
+def test_subscription_collects_lane_positions():
+    controller = make_controller(50)
+    try:
+        fake = controller.connection
+        vehicle_ids, lane_ids, offsets = controller._lane_state
+        assert set(vehicle_ids) == set(fake.ids)
+        assert offsets == [fake.lane_position(fake.row(vehicle_id)) for vehicle_id in vehicle_ids]
+        assert lane_ids == [fake.lane_of(fake.row(vehicle_id)) for vehicle_id in vehicle_ids]
+    finally:
+        controller.close()
+
+
+def test_sumo_lanes_map_to_network_lanes_and_internal_lanes_fall_back_to_distance():
+    controller = make_controller(0)
+    try:
+        network = controller.network
+        lanes, offsets, positions = place_vehicles(network, 400, seed=1)
+        lane_ids = [network.lane_ids[lane] for lane in lanes.tolist()]
+        # Vehicles crossing the junctions are on internal lanes the network model leaves out
+        lane_ids[:20] = [':B1_0_0'] * 20
+        positions[:20] = np.random.default_rng(2).uniform((490, 410), (510, 440), size=(20, 2))  # cam_south
+        offsets[:20] = 1.0
+        vehicle_ids = [f'veh{i}' for i in range(len(lane_ids))]
+        controller.vehicles.update(vehicle_ids, positions, np.zeros(len(lane_ids)), lane_ids,
+                                   ['edge'] * len(lane_ids), ['route'] * len(lane_ids), ['car'] * len(lane_ids))
+        controller._lane_state = (vehicle_ids, lane_ids, offsets.tolist())
+
+        mapped_lanes, mapped_offsets, slots = controller._sumo_lane_positions()
+        assert (mapped_lanes[:20] == -1).all()
+        np.testing.assert_array_equal(mapped_lanes[20:], lanes[20:])
+        assert slots.tolist() == [controller.vehicles.slots[vehicle_id] for vehicle_id in vehicle_ids]
+
+        xy = controller.vehicles.view().xy
+        by_lane = controller._detect_on_lanes(controller.camera_coverage, mapped_lanes, mapped_offsets, slots, xy)
+        by_distance = controller.detection_engine.detect(xy)
+        internal_slots = slots[:20]
+        assert np.isin(internal_slots, by_lane['cam_south'][0]).all()
+        for camera_id in controller.cameras:
+            np.testing.assert_array_equal(by_lane[camera_id][0], by_distance[camera_id][0])
+            np.testing.assert_allclose(by_lane[camera_id][1], by_distance[camera_id][1])
+    finally:
+        controller.close()
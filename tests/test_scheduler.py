@@ -0,0 +1,35 @@
+import pytest
+
+from traffic_sim.simulation.scheduler import ObservationScheduler
+
+
+def make_scheduler():
+    return ObservationScheduler(0.1, {'vehicle_state': 0.1, 'camera_detection': 0.5, 'metrics': 1.0})
+
+
+def test_periods_are_rounded_to_whole_steps():
+    scheduler = ObservationScheduler(0.1, {'fast': 0.01, 'odd': 0.26, 'slow': 1.0})
+    assert scheduler.periods == {'fast': 1, 'odd': 3, 'slow': 10}
+
+
+def test_due_follows_absolute_step_numbers():
+    scheduler = make_scheduler()
+    assert scheduler.due(0) == {'vehicle_state', 'camera_detection', 'metrics'}
+    assert scheduler.due(3) == {'vehicle_state'}
+    assert scheduler.due(5) == {'vehicle_state', 'camera_detection'}
+    assert scheduler.due(20) == {'vehicle_state', 'camera_detection', 'metrics'}
+
+
+@pytest.mark.parametrize('step, expected', [(0, 5), (4, 5), (5, 10), (9, 10), (11, 15)])
+def test_next_step_skips_to_the_next_slow_observer(step, expected):
+    scheduler = ObservationScheduler(0.1, {'camera_detection': 0.5, 'metrics': 1.0})
+    assert scheduler.next_step(step) == expected
+
+
+def test_step_at_tolerates_accumulated_float_error():
+    scheduler = make_scheduler()
+    time = 0.0
+    for _ in range(35):
+        time += 0.1
+    assert scheduler.step_at(time) == 35
+    assert scheduler.due(scheduler.step_at(time)) == {'vehicle_state', 'camera_detection'}
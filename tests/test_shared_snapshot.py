@@ -0,0 +1,92 @@
+import threading
+
+import pytest
+
+from traffic_sim.simulation import shared_snapshot
+from traffic_sim.simulation.response_cache import dumps
+from traffic_sim.simulation.shared_snapshot import (SEQUENCE, SharedSimulation, SharedSnapshotReader,
+                                                    SharedSnapshotWriter)
+
+
+@pytest.fixture
+def writer():
+    writer = SharedSnapshotWriter(4096)
+    yield writer
+    writer.close()
+
+
+def sections(count):
+    return {'metrics': dumps({'count': count}), 'camera/cam': dumps([{'id': f'v{count}'}])}
+
+
+def test_reader_sees_each_written_snapshot(writer):
+    reader = SharedSnapshotReader(writer.memory.buf)
+    empty = reader.latest()
+    assert (empty.version, empty.metrics, empty.camera_data('cam')) == (0, {}, [])
+
+    assert writer.write(1, 10, 1.0, sections(1))
+    snapshot = reader.latest()
+    assert (snapshot.version, snapshot.step, snapshot.time) == (1, 10, 1.0)
+    assert snapshot.metrics == {'count': 1}
+    assert snapshot.camera_data('cam') == [{'id': 'v1'}]
+    assert snapshot.camera_data('missing') == []
+    assert reader.latest() is snapshot  # unchanged sequence, nothing copied
+
+    writer.write(2, 20, 2.0, sections(2))
+    assert reader.latest().metrics == {'count': 2}
+    assert snapshot.metrics == {'count': 1}  # earlier copies are private
+
+
+def test_snapshot_too_large_for_the_region_keeps_the_previous_one(writer):
+    reader = SharedSnapshotReader(writer.memory.buf)
+    writer.write(1, 1, 0.1, sections(1))
+    assert not writer.write(2, 2, 0.2, {'metrics': b'0' * writer.capacity})
+    assert writer.skipped == 1
+    assert reader.latest().version == 1
+
+
+def test_reader_waits_while_a_write_is_in_progress(writer):
+    reader = SharedSnapshotReader(writer.memory.buf)
+    writer.write(1, 1, 0.1, sections(1))
+    # Leave the sequence odd, as a writer does mid-copy, then finish the write later
+    SEQUENCE.pack_into(writer.memory.buf, 0, writer.sequence + 1)
+    timer = threading.Timer(0.05, writer.write, (2, 2, 0.2, sections(2)))
+    timer.start()
+    try:
+        assert reader.latest().version == 2
+    finally:
+        timer.join()
+    assert reader.retries > 0
+
+
+def test_reader_retries_a_copy_the_writer_overwrote(writer, monkeypatch):
+    reader = SharedSnapshotReader(writer.memory.buf)
+    writer.write(1, 1, 0.1, sections(1))
+    reads = []
+
+    class WriteDuringCopy:
+        @staticmethod
+        def unpack_from(buffer, offset=0):
+            reads.append(1)
+            if len(reads) == 2:
+                writer.write(2, 2, 0.2, sections(2))  # lands between the reader's two sequence checks
+            return SEQUENCE.unpack_from(buffer, offset)
+
+        pack_into = SEQUENCE.pack_into
+
+    monkeypatch.setattr(shared_snapshot, 'SEQUENCE', WriteDuringCopy)
+    snapshot = reader.latest()
+    assert (snapshot.version, snapshot.metrics) == (2, {'count': 2})
+    assert reader.retries == 1
+
+
+def test_shared_simulation_waits_for_a_newer_snapshot(writer):
+    source = SharedSimulation(SharedSnapshotReader(writer.memory.buf), poll_interval=0.005)
+    assert source.wait_for_snapshot(0, timeout=0.01).version == 0
+    timer = threading.Timer(0.05, writer.write, (1, 5, 0.5, sections(3)))
+    timer.start()
+    try:
+        assert source.wait_for_snapshot(0, timeout=5).version == 1
+    finally:
+        timer.join()
+    assert source.get_traffic_metrics() == {'count': 3}
@@ -0,0 +1,116 @@
+import threading
+
+from traffic_sim.simulation.camera import Camera
+from traffic_sim.simulation.detection import DetectionEngine
+from traffic_sim.simulation.snapshot import SnapshotPublisher
+from traffic_sim.simulation.vehicle_store import VehicleStore
+
+
+def update(store, vehicles):
+    """Replace the store's population with {id: (x, y, speed)}."""
+    ids = list(vehicles)
+    store.update(
+        ids,
+        [vehicles[vehicle_id][:2] for vehicle_id in ids],
+        [vehicles[vehicle_id][2] for vehicle_id in ids],
+        ['lane_0'] * len(ids), ['edge'] * len(ids), ['route'] * len(ids), ['car'] * len(ids)
+    )
+
+
+def test_snapshot_copies_the_occupied_slots():
+    store = VehicleStore(capacity=8)
+    update(store, {'a': (1, 2, 3), 'b': (4, 5, 6)})
+    update(store, {'b': (4, 5, 7)})  # frees slot 0
+    publisher = SnapshotPublisher(capacity=2)
+
+    snapshot = publisher.publish(3, 1.5, store.view(), {}, {'count': 1})
+    assert (snapshot.step, snapshot.time, snapshot.metrics) == (3, 1.5, {'count': 1})
+    assert snapshot.ids == ['b']
+    assert snapshot.vehicle(0) == {'id': 'b', 'position': (4.0, 5.0), 'speed': 7.0, 'lane': 'lane_0',
+                                   'edge': 'edge', 'route': 'route', 'type': 'car'}
+    assert not snapshot.xy.flags.writeable
+    assert publisher.latest() is snapshot
+
+
+def test_publishing_twice_reuses_the_buffer_of_the_older_snapshot():
+    store = VehicleStore(capacity=8)
+    publisher = SnapshotPublisher(capacity=4)
+    update(store, {'a': (1, 1, 1)})
+    first = publisher.publish(1, 1.0, store.view(), {}, {})
+    update(store, {'a': (2, 2, 2)})
+    second = publisher.publish(2, 2.0, store.view(), {}, {})
+    assert first.is_valid() and second.is_valid()
+
+    update(store, {'a': (3, 3, 3)})
+    third = publisher.publish(3, 3.0, store.view(), {}, {})
+    assert not first.is_valid()
+    assert second.is_valid() and third.is_valid()
+    assert second.speed.tolist() == [2.0]
+    assert third.speed.tolist() == [3.0]
+
+
+def test_growing_past_the_buffer_capacity_leaves_old_snapshots_intact():
+    store = VehicleStore(capacity=4)
+    publisher = SnapshotPublisher(capacity=2)
+    update(store, {'a': (1, 1, 1)})
+    publisher.publish(1, 1.0, store.view(), {}, {})
+    update(store, {f'v{i}': (i, i, i) for i in range(6)})
+    snapshot = publisher.publish(2, 2.0, store.view(), {}, {})
+    assert len(snapshot) == 6
+    assert snapshot.speed.tolist() == [0, 1, 2, 3, 4, 5]
+
+
+def test_read_retries_when_the_buffer_is_reused_during_the_read():
+    store = VehicleStore(capacity=4)
+    publisher = SnapshotPublisher(capacity=4)
+    update(store, {'a': (1, 1, 1)})
+    publisher.publish(1, 1.0, store.view(), {}, {})
+    seen = []
+
+    def reader(snapshot):
+        seen.append(snapshot.step)
+        if len(seen) == 1:
+            # Two publishes while reading reuse the buffer this snapshot lives in
+            for step in (2, 3):
+                update(store, {'a': (step, step, step)})
+                publisher.publish(step, float(step), store.view(), {}, {})
+        return snapshot.speed.tolist()
+
+    assert publisher.read(reader) == [3.0]
+    assert seen == [1, 3]
+
+
+def test_wait_for_update_wakes_on_publish():
+    store = VehicleStore(capacity=4)
+    publisher = SnapshotPublisher(capacity=4)
+    first = publisher.publish(1, 1.0, store.view(), {}, {})
+    assert publisher.wait_for_update(first.version, timeout=0.01) is first
+
+    timer = threading.Timer(0.05, publisher.publish, (2, 2.0, store.view(), {}, {}))
+    timer.start()
+    try:
+        assert publisher.wait_for_update(first.version, timeout=5).step == 2
+    finally:
+        timer.join()
+
+
+def test_stale_camera_hits_only_keep_vehicles_still_in_their_slot():
+    store = VehicleStore(capacity=4)
+    publisher = SnapshotPublisher(capacity=4)
+    camera = Camera('cam', (0.0, 0.0), 50.0)
+    update(store, {'a': (1, 0, 1), 'b': (2, 0, 2), 'c': (3, 0, 3)})
+    vehicles = store.view()
+    slots, distances = DetectionEngine({'cam': camera}).detect(vehicles.xy)['cam']
+    camera.update_detections(vehicles, slots, distances, 1.0)
+
+    # Vehicle state moves on before the camera runs again: a leaves, x takes its slot
+    update(store, {'b': (2, 0, 2), 'c': (3, 0, 3)})
+    update(store, {'x': (500, 500, 9), 'c': (4, 0, 3), 'b': (2, 0, 2)})
+    assert store.slots['x'] == slots[0]
+    snapshot = publisher.publish(3, 3.0, store.view(), {'cam': camera}, {})
+
+    data = snapshot.camera_data('cam')
+    assert [vehicle['id'] for vehicle in data] == ['b', 'c']
+    assert [vehicle['distance_to_camera'] for vehicle in data] == [2.0, 3.0]
+    assert data[1]['position'] == (4.0, 0.0)  # the vehicle's state at this step
+    assert snapshot.detections() == {'cam': ['b', 'c']}
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from traffic_sim.simulation.camera import Camera
+from traffic_sim.simulation.detection import DetectionEngine
+from traffic_sim.simulation.spatial_index import CameraGrid
+
+
+def random_cameras(rng, count):
+    return {
+        f'cam{i}': Camera(f'cam{i}', tuple(rng.uniform(-500, 1500, size=2)), float(rng.uniform(5, 120)))
+        for i in range(count)
+    }
+
+
+def grid_for(cameras, cell_size):
+    grid = CameraGrid(cell_size)
+    for camera in cameras.values():
+        grid.add_camera(camera.id, camera.position, camera.detection_radius)
+    return grid
+
+
+@pytest.mark.parametrize('cell_size', [10.0, 75.0, 400.0])
+def test_grid_detection_matches_testing_every_camera(cell_size):
+    rng = np.random.default_rng(3)
+    cameras = random_cameras(rng, 40)
+    positions = rng.uniform(-600, 1600, size=(4000, 2))
+    positions[::50] = np.nan
+
+    expected = DetectionEngine(cameras).detect(positions)
+    detections = DetectionEngine(cameras, grid_for(cameras, cell_size)).detect(positions)
+    for camera_id in cameras:
+        assert detections[camera_id][0].tolist() == expected[camera_id][0].tolist()
+        np.testing.assert_allclose(detections[camera_id][1], expected[camera_id][1])
+
+
+def test_every_point_in_a_circle_has_its_camera_as_candidate():
+    grid = CameraGrid(25.0)
+    grid.add_camera('cam', (-3.0, 7.0), 40.0)
+    rng = np.random.default_rng(4)
+    angles = rng.uniform(0, 2 * np.pi, 500)
+    radii = 40.0 * np.sqrt(rng.uniform(0, 1, 500))
+    for angle, radius in zip(angles, radii):
+        assert 'cam' in grid.candidates((-3.0 + radius * np.cos(angle), 7.0 + radius * np.sin(angle)))
+
+
+def test_moving_and_removing_cameras_refreshes_the_engine():
+    cameras = {'cam': Camera('cam', (0.0, 0.0), 10.0)}
+    grid = grid_for(cameras, 20.0)
+    engine = DetectionEngine(cameras, grid)
+    positions = np.array([[5.0, 5.0], [505.0, 505.0]])
+    assert engine.detect(positions)['cam'][0].tolist() == [0]
+
+    cameras = {'cam': Camera('cam', (500.0, 500.0), 10.0)}
+    grid.add_camera('cam', (500.0, 500.0), 10.0)  # re-adding moves it
+    engine.set_cameras(cameras)
+    assert engine.detect(positions)['cam'][0].tolist() == [1]
+
+    grid.remove_camera('cam')
+    assert grid.cells == {}
+    assert engine.detect(positions)['cam'][0].tolist() == []
+
+
+def test_cell_size_must_be_positive():
+    with pytest.raises(ValueError):
+        CameraGrid(0)
@@ -0,0 +1,51 @@
+import json
+import shutil
+
+from traffic_sim.simulation.sweep import (CONFIG_PATH, SweepRunner, expand_grid, run_scenario, scenario_id,
+                                         summarize_metrics)
+
+
+def test_expand_grid_covers_every_combination():
+    scenarios = expand_grid({'simulation.step_time': [0.1, 0.2], 'simulation.scale': [1.0, 2.0, 3.0]})
+    assert len(scenarios) == 6
+    assert {'simulation.scale': 3.0, 'simulation.step_time': 0.2} in scenarios
+    assert expand_grid({}) == [{}]
+
+
+def test_scenario_id_ignores_key_order():
+    assert scenario_id({'a': 1, 'b': 2}) == scenario_id({'b': 2, 'a': 1})
+    assert scenario_id({'a': 1}) != scenario_id({'a': 2})
+
+
+def test_summarize_metrics():
+    summary = summarize_metrics({'total_vehicles': [2, 4], 'average_speed': [], 'density': [1.0]})
+    assert summary['mean_total_vehicles'] == 3.0
+    assert summary['max_total_vehicles'] == 4.0
+    assert summary['mean_average_speed'] == 0.0
+    assert summary['max_density'] == 1.0
+
+
+def test_pending_skips_completed_scenarios(tmp_path):
+    results = tmp_path / 'results.jsonl'
+    grid = {'simulation.scale': [1.0, 2.0, 3.0]}
+    done, failed, _ = expand_grid(grid)
+    results.write_text(
+        json.dumps({'id': scenario_id(done), 'status': 'ok'}) + '\n'
+        + json.dumps({'id': scenario_id(failed), 'status': 'failed'}) + '\n'
+        + '{"id": "cut short'  # an interrupted sweep
+    )
+    runner = SweepRunner(grid, str(results))
+    assert runner.pending() == [failed, {'simulation.scale': 3.0}]
+
+
+def test_scenarios_record_the_backend_they_ran_on():
+    result = run_scenario(CONFIG_PATH, {'simulation.backend': 'microsim', 'simulation.max_steps': 20})
+    assert (result['status'], result['backend'], result['steps']) == ('ok', 'microsim', 20)
+
+
+def test_a_sumo_scenario_that_fell_back_to_the_microsimulation_failed(monkeypatch):
+    monkeypatch.setattr(shutil, 'which', lambda name: None)  # SUMO is not installed
+    result = run_scenario(CONFIG_PATH, {'simulation.backend': 'sumo', 'simulation.max_steps': 20})
+    assert result['backend'] == 'microsim'
+    assert result['status'] == 'failed'
+    assert 'sumo' in result['error']
@@ -0,0 +1,88 @@
+import json
+import os
+
+import pytest
+
+from traffic_sim.simulation.trajectory import META_FILE, TrajectoryReader, TrajectoryRecorder
+from traffic_sim.simulation.vehicle_store import VehicleStore
+
+
+def update(store, vehicles):
+    """Replace the store's population with {id: (x, y, speed)}."""
+    ids = list(vehicles)
+    store.update(
+        ids,
+        [vehicles[vehicle_id][:2] for vehicle_id in ids],
+        [vehicles[vehicle_id][2] for vehicle_id in ids],
+        ['lane_0'] * len(ids), ['edge'] * len(ids), ['route'] * len(ids), ['car'] * len(ids)
+    )
+
+
+def test_a_new_recording_can_be_opened_before_anything_is_flushed(tmp_path):
+    recorder = TrajectoryRecorder(str(tmp_path / 'run'), lane_lengths={'lane_0': 100.0})
+    try:
+        reader = TrajectoryReader(recorder.directory)
+        assert len(reader) == 0
+        assert reader.lane_lengths == {'lane_0': 100.0}
+        assert reader.window().tolist() == []
+    finally:
+        recorder.close()
+
+
+def test_metadata_follows_flushes_and_close(tmp_path):
+    store = VehicleStore(capacity=4)
+    recorder = TrajectoryRecorder(str(tmp_path / 'run'), steps_per_chunk=2)
+    meta_path = os.path.join(recorder.directory, META_FILE)
+    for step in range(1, 4):
+        update(store, {f'v{step}': (step, step, step)})
+        recorder.record(step, step * 0.5, store.view())
+    # The third step started a second chunk, flushing the first
+    with open(meta_path) as f:
+        assert json.load(f)['chunks'] == 1
+
+    update(store, {'v4': (4, 4, 4)})
+    recorder.record(4, 2.0, store.view())
+    recorder.flush()
+    with open(meta_path) as f:
+        meta = json.load(f)
+    assert meta['chunks'] == 2
+    assert meta['vehicle_ids'] == ['v1', 'v2', 'v3', 'v4']
+    recorder.close()
+
+    reader = TrajectoryReader(recorder.directory)
+    assert len(reader) == 4
+    assert [reader.vehicle_id(code) for code in reader.window(1.0, 2.0)['vehicle'].tolist()] == ['v2', 'v3', 'v4']
+    assert reader.lane_id(int(reader.step(3)['lane'][0])) == 'lane_0'
+    with pytest.raises(KeyError):
+        reader.step(9)
+
+
+def test_a_directory_holds_only_one_recording(tmp_path):
+    TrajectoryRecorder(str(tmp_path)).close()
+    with pytest.raises(FileExistsError):
+        TrajectoryRecorder(str(tmp_path))
+
+
+def test_a_recording_that_was_never_closed_only_shows_readable_steps(tmp_path):
+    store = VehicleStore(capacity=16)
+    recorder = TrajectoryRecorder(str(tmp_path / 'run'), steps_per_chunk=400)
+    try:
+        # Enough steps for the file buffers to fill on their own; each step adds a new vehicle
+        for step in range(700):
+            update(store, {f'v{vehicle}': (vehicle, step, 1.0) for vehicle in range(max(0, step - 10), step + 1)})
+            recorder.record(step, step * 0.1, store.view())
+
+        reader = TrajectoryReader(recorder.directory)
+        assert len(reader) == 400  # the steps of the chunk flushed when the next one started
+        for position in range(len(reader)):
+            rows = reader.entry(position)
+            assert len(rows) == reader.index['count'][position]
+            ids = {reader.vehicle_id(code) for code in rows['vehicle'].tolist()}
+            assert ids == {f'v{vehicle}' for vehicle in range(max(0, position - 10), position + 1)}
+
+        recorder.flush()
+        reader.refresh()
+        assert len(reader) == 700
+        assert 'v699' in {reader.vehicle_id(code) for code in reader.step(699)['vehicle'].tolist()}
+    finally:
+        recorder.close()
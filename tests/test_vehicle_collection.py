@@ -0,0 +1,48 @@
+from traffic_sim.benchmarks.suite import make_controller
+
+
+def vehicle_states(controller):
+    vehicles = controller.vehicles.view()
+    return {vehicles.ids[slot]: vehicles.vehicle(slot) for slot in vehicles.slots.tolist()}
+
+
+def test_subscription_collects_the_same_state_as_polling():
+    subscribed = make_controller(200, mode='subscription')
+    polled = make_controller(200, mode='polling')
+    try:
+        for _ in range(5):
+            assert vehicle_states(subscribed) == vehicle_states(polled)
+            # Churn replaces vehicles every step, so departures must be picked up
+            subscribed.connection.simulationStep()
+            polled.connection.simulationStep()
+            subscribed._update_vehicle_data()
+            polled._update_vehicle_data()
+        assert vehicle_states(subscribed) == vehicle_states(polled)
+        assert len(subscribed.vehicles) == 200
+    finally:
+        subscribed.close()
+        polled.close()
+
+
+def test_subscription_needs_no_per_vehicle_round_trips():
+    controller = make_controller(100, mode='subscription')
+    try:
+        fake = controller.connection
+        fake.churn = 0.0
+        fake.simulationStep()
+        before = fake.round_trips
+        controller._update_vehicle_data()
+        assert fake.round_trips - before == 0
+    finally:
+        controller.close()
+
+
+def test_subscription_after_skipped_steps_finds_every_departure():
+    controller = make_controller(100, mode='subscription')
+    try:
+        fake = controller.connection
+        fake.simulationStep(fake.time + 1.0)  # ten steps of churn in one jump
+        controller._update_vehicle_data(skipped_steps=True)
+        assert set(vehicle_states(controller)) == set(fake.ids)
+    finally:
+        controller.close()
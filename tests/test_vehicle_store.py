@@ -0,0 +1,78 @@
+import numpy as np
+
+from traffic_sim.simulation.camera import Camera
+from traffic_sim.simulation.detection import DetectionEngine
+from traffic_sim.simulation.vehicle_store import VehicleStore
+
+
+def update(store, vehicles):
+    """Replace the store's population with {id: (x, y, speed)}."""
+    ids = list(vehicles)
+    store.update(
+        ids,
+        [vehicles[vehicle_id][:2] for vehicle_id in ids],
+        [vehicles[vehicle_id][2] for vehicle_id in ids],
+        ['lane_0'] * len(ids), [f'edge_{vehicle_id}' for vehicle_id in ids],
+        ['route'] * len(ids), ['car'] * len(ids)
+    )
+
+
+def test_departed_vehicles_release_their_slots_for_reuse():
+    store = VehicleStore(capacity=4)
+    update(store, {'a': (0, 0, 1), 'b': (1, 1, 2), 'c': (2, 2, 3)})
+    slot_b = store.slots['b']
+    version = store.version
+
+    update(store, {'a': (0, 0, 1), 'c': (2, 2, 3)})
+    update(store, {'a': (0, 0, 1), 'c': (2, 2, 3), 'd': (5, 5, 9)})
+    vehicles = store.view()
+    assert store.slots['d'] == slot_b
+    assert vehicles.ids[slot_b] == 'd'
+    assert vehicles.vehicle_ids.lookup(int(vehicles.code[slot_b])) == 'd'
+    assert vehicles.get('d')['speed'] == 9
+    assert vehicles.get('b') is None
+    assert store.version == version + 2
+
+
+def test_vehicles_keep_their_slot_while_present():
+    store = VehicleStore(capacity=2)
+    update(store, {'a': (0, 0, 1)})
+    slot_a = store.slots['a']
+    update(store, {f'v{i}': (i, i, i) for i in range(10)} | {'a': (3, 4, 5)})  # grows the columns
+    vehicles = store.view()
+    assert store.capacity >= 11
+    assert store.slots['a'] == slot_a
+    assert vehicles.get('a')['position'] == (3.0, 4.0)
+    assert len(vehicles) == len(vehicles.slots) == 11
+
+
+def test_released_slots_are_never_detected():
+    store = VehicleStore(capacity=4)
+    update(store, {'a': (0, 0, 1), 'b': (1, 1, 2)})
+    update(store, {'a': (0, 0, 1)})
+    vehicles = store.view()
+    assert np.isnan(vehicles.xy[~vehicles.active]).all()
+    assert (vehicles.code[~vehicles.active] == -1).all()
+
+
+def test_camera_data_survives_slot_reuse():
+    store = VehicleStore(capacity=4)
+    update(store, {'a': (100, 100, 4), 'b': (110, 100, 6), 'far': (900, 900, 1)})
+    camera = Camera('cam', (100.0, 100.0), 50.0)
+    vehicles = store.view()
+    slots, distances = DetectionEngine({'cam': camera}).detect(vehicles.xy)['cam']
+    camera.update_detections(vehicles, slots, distances, 1.0)
+
+    # Later vehicle updates reuse the detected slots for other vehicles
+    update(store, {'far': (900, 900, 1)})
+    update(store, {'x': (500, 500, 20), 'y': (600, 600, 30), 'far': (900, 900, 1)})
+    assert store.slots['x'] in slots.tolist()
+
+    data = camera.get_vehicle_data()
+    assert [vehicle['id'] for vehicle in data] == ['a', 'b']
+    assert [vehicle['speed'] for vehicle in data] == [4, 6]
+    assert [vehicle['edge'] for vehicle in data] == ['edge_a', 'edge_b']
+    assert data[1]['position'] == (110.0, 100.0)
+    assert camera.detected_ids() == ['a', 'b']
+    assert camera.detected_speeds().tolist() == [4, 6]
+    assert camera.detected_count() == 2
@@ -0,0 +1,47 @@
+import random
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from traffic_sim.simulation.video_stream import VideoStream
+
+
+def metrics(vehicles):
+    return {'total_vehicles': 4 * vehicles, 'average_speed': 10.0, 'density': 1.0,
+            'vehicles_per_camera': {camera: vehicles for camera in ('cam_north', 'cam_south', 'cam_east', 'cam_west')}}
+
+
+def test_the_background_is_drawn_once_and_reused():
+    stream = VideoStream('cam_north')
+    first = stream.create_simulation_frame().copy()
+    np.testing.assert_array_equal(first, stream.background)
+    second = stream.create_simulation_frame(metrics(3), random.Random(1))
+    assert second is stream._frame  # the buffer is reused, not reallocated
+    assert not np.array_equal(second, stream.background)
+    np.testing.assert_array_equal(stream.create_simulation_frame(), first)  # no overlay left behind
+
+
+def test_concurrent_encodes_do_not_interleave_on_the_shared_frame(monkeypatch):
+    stream = VideoStream('cam_north')
+    expected = {vehicles: stream.encode_frame(metrics(vehicles), random.Random(vehicles)) for vehicles in range(1, 6)}
+    draw_vehicle = stream.draw_vehicle
+
+    def slow_draw_vehicle(frame, position, vehicle_type='passenger'):
+        time.sleep(0.0005)  # give other encodes every chance to run in between
+        return draw_vehicle(frame, position, vehicle_type)
+
+    monkeypatch.setattr(stream, 'draw_vehicle', slow_draw_vehicle)
+    results = {}
+
+    def encode(vehicles):
+        results[vehicles] = stream.encode_frame(metrics(vehicles), random.Random(vehicles))
+
+    threads = [threading.Thread(target=encode, args=(vehicles,)) for vehicles in expected]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == expected
+    assert cv2.imdecode(np.frombuffer(results[1], np.uint8), cv2.IMREAD_COLOR).shape == (480, 640, 3)
@@ -0,0 +1,20 @@
+from traffic_sim import web_interface
+from traffic_sim.web_interface import create_app
+
+
+def test_importing_builds_no_controller():
+    assert not hasattr(web_interface, 'sim_controller')
+    assert not hasattr(web_interface, 'app')
+
+
+def test_each_app_gets_its_own_controller():
+    first, second = create_app(), create_app()
+    try:
+        assert first.sim_controller is not second.sim_controller
+        client = first.test_client()
+        assert client.get('/camera/cam_north/zone').get_json()['camera_id'] == 'cam_north'
+        assert client.get('/camera/unknown/zone').status_code == 404
+        assert client.get('/replay').status_code == 404
+    finally:
+        first.sim_controller.close()
+        second.sim_controller.close()
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from traffic_sim.simulation.vehicle_store import VehicleStore
+from traffic_sim.simulation.zone_tracker import ZoneTracker
+
+
+def update(store, vehicles):
+    """Replace the store's population with {id: speed}."""
+    ids = list(vehicles)
+    store.update(ids, [(0.0, 0.0)] * len(ids), [vehicles[vehicle_id] for vehicle_id in ids],
+                 ['lane'] * len(ids), ['edge'] * len(ids), ['route'] * len(ids), ['car'] * len(ids))
+
+
+def observe(zone, store, inside, current_time):
+    """Run a detection pass in which the vehicles in inside are in the zone."""
+    return zone.update(store.view(), [store.slots[vehicle_id] for vehicle_id in inside], current_time)
+
+
+def test_enter_and_exit_events():
+    store = VehicleStore(capacity=8)
+    zone = ZoneTracker()
+    update(store, {'a': 5.0, 'b': 7.0})
+    assert observe(zone, store, ['a', 'b'], 1.0) == [
+        {'event': 'enter', 'vehicle_id': 'a', 'time': 1.0, 'entry_speed': 5.0},
+        {'event': 'enter', 'vehicle_id': 'b', 'time': 1.0, 'entry_speed': 7.0},
+    ]
+
+    update(store, {'a': 3.0, 'b': 8.0})
+    assert observe(zone, store, ['a', 'b'], 2.0) == []
+
+    update(store, {'a': 2.0, 'b': 9.0})
+    assert observe(zone, store, ['b'], 4.0) == [
+        {'event': 'exit', 'vehicle_id': 'a', 'time': 4.0, 'dwell': 3.0, 'entry_speed': 5.0, 'exit_speed': 3.0}
+    ]
+    assert zone.count() == 1
+    assert zone.stats()['entries'] == 2
+    assert zone.mean_dwell() == 3.0
+
+
+def test_a_vehicle_leaving_the_network_exits_the_zone_even_after_its_slot_is_reused():
+    store = VehicleStore(capacity=2)
+    zone = ZoneTracker()
+    update(store, {'a': 5.0})
+    observe(zone, store, ['a'], 1.0)
+
+    update(store, {})
+    update(store, {'c': 1.0})  # takes over the slot of a
+    events = observe(zone, store, ['c'], 2.0)
+    assert [(event['event'], event['vehicle_id']) for event in events] == [('exit', 'a'), ('enter', 'c')]
+
+
+def test_occupancy_counts_the_intervals_with_vehicles_inside():
+    store = VehicleStore(capacity=4)
+    zone = ZoneTracker()
+    update(store, {'a': 1.0})
+    observe(zone, store, [], 0.0)
+    observe(zone, store, ['a'], 1.0)   # empty during 0..1
+    observe(zone, store, ['a'], 3.0)   # occupied during 1..3
+    observe(zone, store, [], 4.0)      # occupied during 3..4
+    assert zone.occupancy() == pytest.approx(0.75)
+    assert [event['event'] for event in zone.recent_events()] == ['enter', 'exit']
+
+
+def test_dwell_times_stay_with_their_vehicles_as_others_come_and_go():
+    rng = np.random.default_rng(3)
+    store = VehicleStore(capacity=64)
+    zone = ZoneTracker()
+    update(store, {f'v{i}': float(i) for i in range(40)})
+    inside = {}  # vehicle id -> entry time, kept the simple way
+    for current_time in np.arange(1.0, 60.0):
+        now_inside = [f'v{i}' for i in np.flatnonzero(rng.random(40) < 0.3)]
+        events = observe(zone, store, now_inside, float(current_time))
+        exits = {event['vehicle_id']: event['dwell'] for event in events if event['event'] == 'exit'}
+        assert exits == {vehicle_id: current_time - entered for vehicle_id, entered in inside.items()
+                         if vehicle_id not in now_inside}
+        assert sorted(event['vehicle_id'] for event in events if event['event'] == 'enter') == \
+            sorted(set(now_inside) - set(inside))
+        inside = {vehicle_id: inside.get(vehicle_id, current_time) for vehicle_id in now_inside}
+        assert zone.count() == len(inside)
+    # An unchanged pass produces no events
+    assert observe(zone, store, list(inside), 61.0) == []
+    assert zone.stats()['entries'] - zone.stats()['exits'] == len(inside)
@@ -0,0 +1,124 @@
+"""Compare per-camera Camera.detect_vehicles loops against the batched DetectionEngine.
+
+The engine is timed both testing all vehicle/camera pairs and with the
+CameraGrid spatial index.
+
+Run from the repository root:
+
+    python -m traffic_sim.benchmarks.camera_detection --vehicles 10000 --cameras 200
+"""
+import argparse
+import time
+
+import numpy as np
+
+from traffic_sim.simulation.camera import Camera
+from traffic_sim.simulation.detection import DetectionEngine
+from traffic_sim.simulation.spatial_index import CameraGrid
+from traffic_sim.simulation.vehicle_store import VehicleStore
+
+
+def make_scenario(num_vehicles, num_cameras, extent, radius, seed=0):
+    """Create random vehicles, as dicts and in a VehicleStore, and a grid of cameras."""
+    rng = np.random.default_rng(seed)
+    side = int(np.ceil(np.sqrt(num_cameras)))
+    spacing = extent / side
+    cameras = {}
+    for i in range(num_cameras):
+        camera_id = f'cam_{i}'
+        location = [(i % side + 0.5) * spacing, (i // side + 0.5) * spacing]
+        cameras[camera_id] = Camera(camera_id, location, radius)
+
+    xy = rng.uniform(0, extent, size=(num_vehicles, 2))
+    vehicles = [
+        {
+            'id': f'veh_{i}',
+            'position': (float(x), float(y)),
+            'speed': 10.0,
+            'lane': 'lane_0',
+            'edge': 'edge_0',
+            'route': 'route_0',
+            'type': 'passenger'
+        }
+        for i, (x, y) in enumerate(xy)
+    ]
+    store = VehicleStore()
+    store.update(
+        [vehicle['id'] for vehicle in vehicles],
+        xy,
+        [vehicle['speed'] for vehicle in vehicles],
+        [vehicle['lane'] for vehicle in vehicles],
+        [vehicle['edge'] for vehicle in vehicles],
+        [vehicle['route'] for vehicle in vehicles],
+        [vehicle['type'] for vehicle in vehicles]
+    )
+    return cameras, vehicles, store
+
+
+def time_looped(cameras, vehicles):
+    """Time the original detection path: one Python loop per camera."""
+    start = time.perf_counter()
+    for camera in cameras.values():
+        camera.detect_vehicles(vehicles)
+    return time.perf_counter() - start, {cid: cam.get_vehicle_data() for cid, cam in cameras.items()}
+
+
+def make_grid(cameras, radius):
+    """Index the cameras in a grid with cells twice the detection radius."""
+    grid = CameraGrid(2 * radius)
+    for camera in cameras.values():
+        grid.add_camera(camera.id, camera.position, camera.detection_radius)
+    return grid
+
+
+def time_batched(cameras, store, repeat, camera_index=None):
+    """Time the batched engine over the vehicle store columns."""
+    engine = DetectionEngine(cameras, camera_index)
+    vehicles = store.view()
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        detections = engine.detect(vehicles.xy)
+        for camera_id, camera in cameras.items():
+            slots, distances = detections[camera_id]
+            camera.update_detections(vehicles, slots, distances, 0.0)
+        best = min(best, time.perf_counter() - start)
+    return best, {cid: cam.get_vehicle_data() for cid, cam in cameras.items()}
+
+
+def outputs_match(expected, actual):
+    """Check that both paths produced the same detections."""
+    for camera_id, rows in expected.items():
+        other = actual[camera_id]
+        if [row['id'] for row in rows] != [row['id'] for row in other]:
+            return False
+        for row, other_row in zip(rows, other):
+            if abs(row['distance_to_camera'] - other_row['distance_to_camera']) > 1e-9:
+                return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--vehicles', type=int, default=10000)
+    parser.add_argument('--cameras', type=int, default=200)
+    parser.add_argument('--extent', type=float, default=5000.0, help="side of the square area in meters")
+    parser.add_argument('--radius', type=float, default=50.0)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'vehicles':>9}{'cameras':>9}{'looped ms':>12}{'all-pairs ms':>14}{'grid ms':>10}"
+          f"{'speedup':>9}  match")
+    for num_vehicles in sorted({args.vehicles // 10, args.vehicles // 2, args.vehicles}):
+        for num_cameras in sorted({max(1, args.cameras // 4), args.cameras}):
+            cameras, vehicles, store = make_scenario(num_vehicles, num_cameras, args.extent, args.radius)
+            looped, expected = time_looped(cameras, vehicles)
+            batched, actual = time_batched(cameras, store, args.repeat)
+            gridded, grid_actual = time_batched(cameras, store, args.repeat, make_grid(cameras, args.radius))
+            match = outputs_match(expected, actual) and outputs_match(expected, grid_actual)
+            print(f"{num_vehicles:>9}{num_cameras:>9}{looped * 1000:>12.1f}{batched * 1000:>14.1f}"
+                  f"{gridded * 1000:>10.1f}{looped / gridded:>9.1f}  {match}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""In-process stand-in for a TraCI connection, for benchmarking without SUMO.
+
+FakeTraCI implements the part of the TraCI API that SimulationController
+uses, over a synthetic vehicle population that drives around a square
+area with a configurable share of vehicles arriving and departing each
+step. Every call that would be a socket round-trip with real TraCI counts
+one round-trip and waits for the configured latency, so polling and
+subscription collection can be compared as they would behave against
+SUMO. Assign an instance to SimulationController.connection to use it.
+"""
+import time
+
+import numpy as np
+import traci.constants as tc
+
+
+class _Domain:
+    def __init__(self, fake):
+        self._fake = fake
+
+
+class _VehicleDomain(_Domain):
+    def getIDList(self):
+        self._fake._round_trip()
+        return tuple(self._fake.ids)
+
+    def _get(self, vehicle_id):
+        self._fake._round_trip()
+        return self._fake.row(vehicle_id)
+
+    def getPosition(self, vehicle_id):
+        return self._fake.position(self._get(vehicle_id))
+
+    def getSpeed(self, vehicle_id):
+        return float(self._fake.speed[self._get(vehicle_id)])
+
+    def getLaneID(self, vehicle_id):
+        return self._fake.lane_of(self._get(vehicle_id))
+
+    def getLanePosition(self, vehicle_id):
+        return self._fake.lane_position(self._get(vehicle_id))
+
+    def getRoadID(self, vehicle_id):
+        return self._fake.lane_of(self._get(vehicle_id)).rpartition('_')[0]
+
+    def getRouteID(self, vehicle_id):
+        return self._fake.route_of(self._get(vehicle_id))
+
+    def getTypeID(self, vehicle_id):
+        return self._fake.type_of(self._get(vehicle_id))
+
+    def subscribe(self, vehicle_id, variables):
+        self._fake._round_trip()
+        self._fake.subscribed[vehicle_id] = tuple(variables)
+
+    def getAllSubscriptionResults(self):
+        # Delivered with the step response, so no extra round-trip
+        return self._fake.subscription_results()
+
+
+class _SimulationDomain(_Domain):
+    def subscribe(self, variables):
+        self._fake._round_trip()
+        self._fake.simulation_subscribed = True
+
+    def getSubscriptionResults(self):
+        if not self._fake.simulation_subscribed:
+            return {}
+        return {tc.VAR_TIME: self._fake.time, tc.VAR_DEPARTED_VEHICLES_IDS: tuple(self._fake.departed)}
+
+    def getTime(self):
+        self._fake._round_trip()
+        return self._fake.time
+
+
+class _LaneDomain(_Domain):
+    def getIDList(self):
+        self._fake._round_trip()
+        return tuple(self._fake.lane_ids)
+
+    def getLength(self, lane_id):
+        self._fake._round_trip()
+        return self._fake.lane_length
+
+
+class FakeTraCI:
+    """Synthetic TraCI connection with a moving vehicle population."""
+
+    def __init__(self, vehicles=1000, extent=1000.0, lanes=16, churn=0.01, step_time=0.1,
+                 latency=0.0, seed=0):
+        self.rng = np.random.default_rng(seed)
+        self.extent = extent
+        self.churn = churn
+        self.step_time = step_time
+        self.latency = latency
+        self.time = 0.0
+        self.round_trips = 0
+        self.lane_ids = [f'edge{i}_0' for i in range(lanes)]
+        self.lane_length = extent
+        self.route_ids = [f'route{i}' for i in range(4)]
+        self.type_ids = ['passenger', 'bus', 'truck']
+
+        self.ids = [f'veh{i}' for i in range(vehicles)]
+        self.rows = {vehicle_id: row for row, vehicle_id in enumerate(self.ids)}
+        self.next_id = vehicles
+        self.xy = self.rng.uniform(0, extent, size=(vehicles, 2))
+        self.heading = self.rng.uniform(0, 2 * np.pi, size=vehicles)
+        self.speed = self.rng.uniform(5, 15, size=vehicles)
+        self.lane_index = self.rng.integers(lanes, size=vehicles)
+        self.route = self.rng.integers(len(self.route_ids), size=vehicles)
+        self.vehicle_type = self.rng.integers(len(self.type_ids), size=vehicles)
+        self.departed = list(self.ids)
+        self.subscribed = {}
+        self.simulation_subscribed = False
+        self.vehicle = _VehicleDomain(self)
+        self.simulation = _SimulationDomain(self)
+        self.lane = _LaneDomain(self)
+
+    def _round_trip(self):
+        self.round_trips += 1
+        if self.latency:
+            # Spin rather than sleep: sleeps are far coarser than typical RPC latency
+            deadline = time.perf_counter() + self.latency
+            while time.perf_counter() < deadline:
+                pass
+
+    def row(self, vehicle_id):
+        return self.rows[vehicle_id]
+
+    def position(self, row):
+        return float(self.xy[row, 0]), float(self.xy[row, 1])
+
+    def lane_of(self, row):
+        return self.lane_ids[self.lane_index[row]]
+
+    def lane_position(self, row):
+        return float(self.xy[row, 0])
+
+    def route_of(self, row):
+        return self.route_ids[self.route[row]]
+
+    def type_of(self, row):
+        return self.type_ids[self.vehicle_type[row]]
+
+    def simulationStep(self, step=0.0):
+        """Advance one step, or to the given time, then replace churned vehicles."""
+        self._round_trip()
+        steps = max(1, int(round((step - self.time) / self.step_time))) if step else 1
+        self.departed = []
+        for _ in range(steps):
+            self._advance()
+
+    def _advance(self):
+        self.time = round(self.time + self.step_time, 6)
+        travel = self.speed * self.step_time
+        self.xy[:, 0] = (self.xy[:, 0] + np.cos(self.heading) * travel) % self.extent
+        self.xy[:, 1] = (self.xy[:, 1] + np.sin(self.heading) * travel) % self.extent
+
+        # Arrived vehicles leave and the same number depart under new ids
+        count = self.rng.binomial(len(self.ids), self.churn) if self.ids else 0
+        for row in self.rng.choice(len(self.ids), size=count, replace=False).tolist():
+            old_id = self.ids[row]
+            del self.rows[old_id]
+            self.subscribed.pop(old_id, None)
+            new_id = f'veh{self.next_id}'
+            self.next_id += 1
+            self.ids[row] = new_id
+            self.rows[new_id] = row
+            self.xy[row] = self.rng.uniform(0, self.extent, size=2)
+            self.departed.append(new_id)
+
+    def subscription_results(self):
+        """Return {vehicle id: {variable: value}} for the subscribed vehicles."""
+        results = {}
+        for vehicle_id, variables in self.subscribed.items():
+            row = self.rows[vehicle_id]
+            values = {}
+            for variable in variables:
+                if variable == tc.VAR_POSITION:
+                    values[variable] = self.position(row)
+                elif variable == tc.VAR_SPEED:
+                    values[variable] = float(self.speed[row])
+                elif variable == tc.VAR_LANE_ID:
+                    values[variable] = self.lane_of(row)
+                elif variable == tc.VAR_LANEPOSITION:
+                    values[variable] = self.lane_position(row)
+                elif variable == tc.VAR_ROAD_ID:
+                    values[variable] = self.lane_of(row).rpartition('_')[0]
+                elif variable == tc.VAR_ROUTE_ID:
+                    values[variable] = self.route_of(row)
+                elif variable == tc.VAR_TYPE:
+                    values[variable] = self.type_of(row)
+            results[vehicle_id] = values
+        return results
+
+    def close(self):
+        pass
@@ -0,0 +1,194 @@
+"""Time every hot path against a synthetic TraCI connection and emit JSON results.
+
+No SUMO is needed: the controller is driven by FakeTraCI, which generates
+the vehicle population and can add a fixed latency to each round-trip.
+Each result records its parameters and timing percentiles, so two runs
+can be diffed to spot regressions. Run from the repository root:
+
+    python -m traffic_sim.benchmarks.suite --vehicles 1000 10000 --output bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from traffic_sim.benchmarks.fake_traci import FakeTraCI
+from traffic_sim.simulation.sim_controller import SimulationController
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), '..', 'config', 'simulation_config.yaml')
+
+
+def summarize(name, params, durations, **extra):
+    """Reduce per-iteration durations in seconds to one result entry."""
+    durations = np.asarray(durations, dtype=float) * 1000
+    result = {
+        'name': name,
+        'params': params,
+        'iterations': len(durations),
+        'mean_ms': float(durations.mean()),
+        'p50_ms': float(np.percentile(durations, 50)),
+        'p95_ms': float(np.percentile(durations, 95)),
+        'ops_per_s': float(1000 / durations.mean()) if durations.mean() > 0 else 0.0
+    }
+    result.update(extra)
+    return result
+
+
+def time_calls(function, repeat):
+    """Return the wall time of each of repeat calls to function, after one warm-up call."""
+    function()
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def make_controller(vehicles, latency=0.0, mode='subscription'):
+    """Build a controller whose TraCI connection is a FakeTraCI, stepped once."""
+    controller = SimulationController(CONFIG_PATH, config_overrides={'logging.level': 'WARNING'})
+    controller.collection_mode = mode
+    controller.connection = FakeTraCI(vehicles=vehicles, latency=latency)
+    controller._load_lane_lengths()
+    controller.connection.simulationStep()
+    controller._update_vehicle_data()
+    return controller
+
+
+def bench_vehicle_collection(vehicles, latency, mode, repeat):
+    """Time _update_vehicle_data after each simulation step."""
+    controller = make_controller(vehicles, latency, mode)
+    fake = controller.connection
+    durations = []
+    round_trips = 0
+    for _ in range(repeat):
+        fake.simulationStep()
+        before = fake.round_trips
+        start = time.perf_counter()
+        controller._update_vehicle_data()
+        durations.append(time.perf_counter() - start)
+        round_trips += fake.round_trips - before
+    controller.close()
+    params = {'vehicles': vehicles, 'mode': mode, 'latency_us': latency * 1e6}
+    return summarize('vehicle_collection', params, durations,
+                     round_trips_per_step=round_trips / repeat)
+
+
+def bench_camera_detection(controller, vehicles, repeat):
+    """Time the per-camera detect_vehicles loop and the batched detection pass."""
+    view = controller.vehicles.view()
+    dicts = [view.vehicle(slot) for slot in view.slots.tolist()]
+    params = {'vehicles': vehicles, 'cameras': len(controller.cameras)}
+
+    def looped():
+        for camera in controller.cameras.values():
+            camera.detect_vehicles(dicts)
+
+    return [
+        summarize('camera_detect_vehicles', params, time_calls(looped, repeat)),
+        summarize('camera_detection_batched', params,
+                  time_calls(lambda: controller._update_camera_detections(controller.connection.time), repeat))
+    ]
+
+
+def bench_metrics(controller, vehicles, repeat):
+    """Time metric aggregation and snapshot publishing, and reading the result."""
+    params = {'vehicles': vehicles}
+    return [
+        summarize('publish_snapshot', params,
+                  time_calls(lambda: controller._publish_snapshot(controller.connection.time), repeat)),
+        summarize('get_traffic_metrics', params, time_calls(controller.get_traffic_metrics, repeat))
+    ]
+
+
+def bench_frames(controller, vehicles, repeat):
+    """Time rendering a camera frame and rendering plus JPEG encoding it."""
+    from traffic_sim.simulation.video_stream import VideoStream
+
+    stream = VideoStream('cam_north', controller)
+    params = {'vehicles': vehicles}
+    return [
+        summarize('create_simulation_frame', params, time_calls(stream.create_simulation_frame, repeat)),
+        summarize('encode_frame', params, time_calls(stream.encode_frame, repeat))
+    ]
+
+
+def bench_web(vehicles, requests):
+    """Time /metrics and /camera/<id>/data requests through the Flask test client."""
+    from traffic_sim.web_interface import create_app
+
+    app = create_app()
+    controller = app.sim_controller
+    controller.logger.setLevel('WARNING')
+    controller.connection = FakeTraCI(vehicles=vehicles)
+    controller._load_lane_lengths()
+    controller.connection.simulationStep()
+    controller._update_vehicle_data()
+    controller._update_camera_detections(controller.connection.time)
+    controller._publish_snapshot(controller.connection.time)
+
+    client = app.test_client()
+    params = {'vehicles': vehicles}
+    results = []
+    for name, url in (('web_metrics', '/metrics'), ('web_camera_data', '/camera/cam_north/data')):
+        results.append(summarize(name, params, time_calls(lambda: client.get(url).get_data(), requests)))
+    controller.close()
+    return results
+
+
+def environment():
+    """Describe the machine and revision the results were measured on."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(__file__), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'commit': commit
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--vehicles', type=int, nargs='+', default=[1000, 10000],
+                        help="vehicle population sizes to benchmark")
+    parser.add_argument('--latency-us', type=float, nargs='+', default=[0.0, 50.0],
+                        help="simulated TraCI round-trip latencies in microseconds")
+    parser.add_argument('--repeat', type=int, default=50, help="iterations per benchmark")
+    parser.add_argument('--requests', type=int, default=500, help="HTTP requests per endpoint")
+    parser.add_argument('--output', help="write results here instead of stdout")
+    args = parser.parse_args()
+
+    results = []
+    for vehicles in args.vehicles:
+        for latency in args.latency_us:
+            for mode in ('polling', 'subscription'):
+                results.append(bench_vehicle_collection(vehicles, latency / 1e6, mode, args.repeat))
+        controller = make_controller(vehicles)
+        results.extend(bench_camera_detection(controller, vehicles, args.repeat))
+        results.extend(bench_metrics(controller, vehicles, args.repeat))
+        results.extend(bench_frames(controller, vehicles, args.repeat))
+        controller.close()
+        results.extend(bench_web(vehicles, args.requests))
+        print(f"benchmarked {vehicles} vehicles", file=sys.stderr)
+
+    report = json.dumps({'meta': environment(), 'results': results}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report + '\n')
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Compare per-vehicle polling against subscription-based vehicle state collection.
+
+Requires SUMO. Run from the repository root:
+
+    python -m traffic_sim.benchmarks.vehicle_collection --steps 300 --scale 20
+"""
+import argparse
+import os
+import time
+
+import traci
+import traci.connection
+
+from traffic_sim.simulation.sim_controller import SimulationController
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), '..', 'config', 'simulation_config.yaml')
+
+
+class RoundTripCounter:
+    """Count TraCI socket round-trips while active."""
+
+    def __init__(self):
+        self.count = 0
+        self._original = None
+
+    def __enter__(self):
+        self._original = traci.connection.Connection._sendExact
+        original = self._original
+
+        def counting_send(connection):
+            self.count += 1
+            return original(connection)
+
+        traci.connection.Connection._sendExact = counting_send
+        return self
+
+    def __exit__(self, *exc_info):
+        traci.connection.Connection._sendExact = self._original
+        return False
+
+
+def run_mode(mode, steps, warmup, scale, begin):
+    """Run the simulation in one collection mode and return timing results."""
+    controller = SimulationController(CONFIG_PATH, config_overrides={'logging.level': 'WARNING'})
+    controller.collection_mode = mode
+    sumo_cmd = controller.build_sumo_command() + [
+        "--begin", str(begin),
+        "--scale", str(scale),
+        "--no-step-log",
+        "--no-warnings"
+    ]
+    traci.start(sumo_cmd)
+    try:
+        for _ in range(warmup):
+            traci.simulationStep()
+            controller._update_vehicle_data()
+
+        step_time = 0.0
+        collect_time = 0.0
+        vehicles = 0
+        with RoundTripCounter() as counter:
+            for _ in range(steps):
+                start = time.perf_counter()
+                traci.simulationStep()
+                stepped = time.perf_counter()
+                controller._update_vehicle_data()
+                collected = time.perf_counter()
+
+                step_time += collected - start
+                collect_time += collected - stepped
+                vehicles += len(controller.vehicles)
+    finally:
+        controller.close()
+
+    return {
+        'mode': mode,
+        'mean_vehicles': vehicles / steps,
+        'round_trips_per_step': counter.count / steps,
+        'collect_ms': collect_time / steps * 1000,
+        'step_ms': step_time / steps * 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--steps', type=int, default=300, help="measured steps per mode")
+    parser.add_argument('--warmup', type=int, default=3000, help="steps to fill the network first")
+    parser.add_argument('--scale', type=float, default=20.0, help="SUMO demand scale factor")
+    parser.add_argument('--begin', type=float, default=25200, help="simulation begin time in seconds")
+    args = parser.parse_args()
+
+    print(f"{'mode':<14}{'vehicles':>10}{'round-trips/step':>18}{'collect ms':>12}{'step ms':>10}")
+    for mode in ('polling', 'subscription'):
+        result = run_mode(mode, args.steps, args.warmup, args.scale, args.begin)
+        print(f"{result['mode']:<14}{result['mean_vehicles']:>10.0f}"
+              f"{result['round_trips_per_step']:>18.1f}{result['collect_ms']:>12.2f}"
+              f"{result['step_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,24 +13,8 @@ def main():
         # Start the simulation
         sim_controller.start_simulation()
         
-        # Generate some sample metrics for simulation-only mode
-        metrics = {
-            'total_vehicles': 10,
-            'average_speed': 15.5,
-            'density': 2.5,
-            'vehicles_per_camera': {
-                'cam_north': 3,
-                'cam_south': 2,
-                'cam_east': 2,
-                'cam_west': 3
-            },
-            'average_speed_per_lane': {
-                'north_to_south': 16.2,
-                'south_to_north': 14.8,
-                'east_to_west': 15.1,
-                'west_to_east': 15.9
-            }
-        }
+        # Metrics aggregated at the last simulated step
+        metrics = sim_controller.get_traffic_metrics()
         
         # Print formatted metrics
         print("\nTraffic Metrics Summary:")
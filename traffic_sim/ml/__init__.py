@@ -0,0 +1 @@
+# Initialize ml package
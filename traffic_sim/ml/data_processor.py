@@ -0,0 +1,256 @@
+"""Turn a trajectory recording into windowed per-camera training features.
+
+The recording is read window by window in bounded blocks of rows, split
+across worker processes, and reduced to per-camera vehicle counts and
+speed sums. Counts are reduced to their per-step means. The small
+per-window aggregates are then streamed in time order to build
+time-of-day and lagged history features. The rows are written as fixed-size
+float32 .npy shards that training can open with np.load(mmap_mode='r').
+
+    python -m traffic_sim.ml.data_processor --recording recordings/run_20240101_070000 \\
+        --output traffic_sim/data/processed/run_20240101_070000
+"""
+import argparse
+import json
+import logging
+import math
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import yaml
+
+from traffic_sim.simulation.camera import Camera
+from traffic_sim.simulation.detection import DetectionEngine
+from traffic_sim.simulation.spatial_index import CameraGrid
+from traffic_sim.simulation.trajectory import TrajectoryReader
+from .inference import SECONDS_PER_DAY, window_features
+
+CONFIG_DIR = os.path.join(os.path.dirname(__file__), '..', 'config')
+MANIFEST_FILE = 'manifest.json'
+
+def feature_columns(lags):
+    """Return the shard column names for a number of lagged windows."""
+    return (['window_start', 'camera', 'vehicle_count', 'avg_speed', 'time_of_day', 'historical_patterns',
+             'time_of_day_sin', 'time_of_day_cos']
+            + [f'count_lag_{lag}' for lag in range(1, lags + 1)]
+            + ['next_vehicle_count', 'next_avg_speed'])
+
+def _detection_engine(camera_positions):
+    """Build a gridded detection engine for the configured camera positions."""
+    cameras = {
+        position['id']: Camera(position['id'], position['location'], position['detection_radius'])
+        for position in camera_positions
+    }
+    grid = CameraGrid(2 * max((camera.detection_radius for camera in cameras.values()), default=50))
+    for camera in cameras.values():
+        grid.add_camera(camera.id, camera.position, camera.detection_radius)
+    return DetectionEngine(cameras, grid)
+
+def aggregate_windows(recording, camera_positions, boundaries, block_rows):
+    """Sum camera hits and speeds for consecutive windows of a recording.
+
+    boundaries holds the n + 1 window edges in simulation seconds. Each
+    window is read in blocks of at most block_rows vehicle rows, so memory
+    does not grow with the number of vehicles or the window length.
+    Returns (steps, hits, speed sums) with shapes (n,), (n, cameras) and
+    (n, cameras).
+    """
+    reader = TrajectoryReader(recording)
+    engine = _detection_engine(camera_positions)
+    num_cameras = len(engine.camera_ids)
+    times = reader.index['time']
+    counts = reader.index['count']
+    edges = np.searchsorted(times, boundaries, side='left')
+
+    steps = np.diff(edges)
+    hits = np.zeros((len(steps), num_cameras), dtype=np.int64)
+    speed_sums = np.zeros((len(steps), num_cameras))
+    for window in range(len(steps)):
+        position, end = int(edges[window]), int(edges[window + 1])
+        while position < end:
+            # Take as many whole steps as fit in one block, and at least one
+            rows_so_far = np.cumsum(counts[position:end], dtype=np.int64)
+            last = position + max(1, int(np.searchsorted(rows_so_far, block_rows, side='right')))
+            rows = reader.entries(position, last - 1)
+            positions = np.column_stack((rows['x'], rows['y']))
+            camera_idx, vehicle_idx, _ = engine.hits(positions)
+            hits[window] += np.bincount(camera_idx, minlength=num_cameras)
+            speed_sums[window] += np.bincount(camera_idx, weights=rows['speed'][vehicle_idx].astype(float),
+                                              minlength=num_cameras)
+            position = last
+    return steps, hits, speed_sums
+
+class ShardWriter:
+    def __init__(self, directory, prefix, columns, shard_rows):
+        """Write rows into fixed-size float32 .npy shards named prefix_00000.npy, ..."""
+        self.directory = directory
+        self.prefix = prefix
+        self.shard_rows = shard_rows
+        self.buffer = np.empty((shard_rows, len(columns)), dtype=np.float32)
+        self.filled = 0
+        self.shards = []
+
+    def write(self, rows):
+        """Append a 2-D block of rows, flushing every full shard."""
+        start = 0
+        while start < len(rows):
+            take = min(len(rows) - start, self.shard_rows - self.filled)
+            self.buffer[self.filled:self.filled + take] = rows[start:start + take]
+            self.filled += take
+            start += take
+            if self.filled == self.shard_rows:
+                self._flush()
+
+    def _flush(self):
+        if not self.filled:
+            return
+        name = f"{self.prefix}_{len(self.shards):05d}.npy"
+        np.save(os.path.join(self.directory, name), self.buffer[:self.filled])
+        self.shards.append({'file': name, 'rows': self.filled})
+        self.filled = 0
+
+    def close(self):
+        """Write the final, possibly short, shard and return the shard list."""
+        self._flush()
+        return self.shards
+
+class FeaturePipeline:
+    def __init__(self, recording, output, camera_positions, window=60.0, lags=5,
+                 shard_rows=65536, validation_split=0.2, block_rows=1 << 20, max_workers=None):
+        """Configure feature extraction for one recorded run."""
+        self.recording = recording
+        self.output = output
+        self.camera_positions = camera_positions
+        self.camera_ids = [position['id'] for position in camera_positions]
+        self.window = float(window)
+        self.lags = int(lags)
+        self.shard_rows = int(shard_rows)
+        self.validation_split = float(validation_split)
+        self.block_rows = int(block_rows)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.columns = feature_columns(self.lags)
+        self.logger = logging.getLogger('traffic_simulation')
+
+    def _boundaries(self):
+        """Return the window edges covering the recording, aligned to whole windows."""
+        reader = TrajectoryReader(self.recording)
+        if not len(reader):
+            return np.zeros(1)
+        first = math.floor(float(reader.index['time'][0]) / self.window) * self.window
+        last = float(reader.index['time'][-1])
+        count = int(math.floor((last - first) / self.window)) + 1
+        return first + self.window * np.arange(count + 1)
+
+    def _segments(self, boundaries):
+        """Split the windows into contiguous tasks, a few per worker."""
+        num_windows = len(boundaries) - 1
+        per_task = max(1, math.ceil(num_windows / (self.max_workers * 4)))
+        return [boundaries[start:min(start + per_task, num_windows) + 1]
+                for start in range(0, num_windows, per_task)]
+
+    def _aggregates(self, boundaries):
+        """Yield (window start, steps, hits, speed sums) per window, in time order."""
+        segments = self._segments(boundaries)
+        if self.max_workers == 1 or len(segments) == 1:
+            results = (aggregate_windows(self.recording, self.camera_positions, segment, self.block_rows)
+                       for segment in segments)
+            for segment, result in zip(segments, results):
+                yield from zip(segment[:-1], *result)
+            return
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            results = pool.map(aggregate_windows, [self.recording] * len(segments),
+                               [self.camera_positions] * len(segments), segments,
+                               [self.block_rows] * len(segments))
+            for segment, result in zip(segments, results):
+                yield from zip(segment[:-1], *result)
+
+    def run(self):
+        """Extract every window's features into train and validation shards and write the manifest."""
+        os.makedirs(self.output, exist_ok=True)
+        boundaries = self._boundaries()
+        num_windows = len(boundaries) - 1
+        validation_start = boundaries[0] + self.window * math.floor(num_windows * (1 - self.validation_split))
+        writers = {
+            'train': ShardWriter(self.output, 'train', self.columns, self.shard_rows),
+            'validation': ShardWriter(self.output, 'validation', self.columns, self.shard_rows)
+        }
+        num_cameras = len(self.camera_ids)
+        camera_column = np.arange(num_cameras, dtype=np.float32)
+        history = deque(maxlen=self.lags)
+        previous = None
+
+        for window_start, steps, hits, speed_sums in self._aggregates(boundaries):
+            lagged = np.array(history, dtype=float).reshape(-1, num_cameras)
+            counts, speeds, features = window_features(window_start, steps, hits, speed_sums, lagged)
+            if previous is not None:
+                # The previous window's row is complete now that its targets are known
+                start, prev_features, prev_lagged = previous
+                time_of_day = (start % SECONDS_PER_DAY) / SECONDS_PER_DAY
+                rows = np.empty((num_cameras, len(self.columns)), dtype=np.float32)
+                rows[:, 0] = start
+                rows[:, 1] = camera_column
+                rows[:, 2:6] = prev_features
+                rows[:, 6] = math.sin(2 * math.pi * time_of_day)
+                rows[:, 7] = math.cos(2 * math.pi * time_of_day)
+                rows[:, 8:8 + self.lags] = prev_lagged[::-1].T  # lag 1 is the most recent window
+                rows[:, -2] = counts
+                rows[:, -1] = speeds
+                writers['validation' if start >= validation_start else 'train'].write(rows)
+            # Rows need a full lag history, so the first windows only feed it
+            previous = (window_start, features, lagged) if len(history) == self.lags else None
+            history.append(counts)
+
+        manifest = {
+            'recording': os.path.abspath(self.recording),
+            'columns': self.columns,
+            'dtype': 'float32',
+            'cameras': self.camera_ids,
+            'window': self.window,
+            'lags': self.lags,
+            'shard_rows': self.shard_rows,
+            'validation_start': float(validation_start),
+            'splits': {name: writer.close() for name, writer in writers.items()}
+        }
+        with open(os.path.join(self.output, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        rows = sum(shard['rows'] for shards in manifest['splits'].values() for shard in shards)
+        self.logger.info(f"Wrote {rows} feature rows from {num_windows} windows to {self.output}")
+        return manifest
+
+def load_shards(directory, split='train'):
+    """Memory-map the shards of one split of a processed run."""
+    with open(os.path.join(directory, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    return [np.load(os.path.join(directory, shard['file']), mmap_mode='r')
+            for shard in manifest['splits'][split]]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--recording', required=True, help="trajectory recording run directory")
+    parser.add_argument('--output', required=True, help="directory the shards and manifest are written to")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    with open(os.path.join(CONFIG_DIR, 'simulation_config.yaml')) as f:
+        simulation_config = yaml.safe_load(f)
+    with open(os.path.join(CONFIG_DIR, 'ml_config.yaml')) as f:
+        ml_config = yaml.safe_load(f)['ml']
+    features = ml_config.get('features', {})
+    pipeline = FeaturePipeline(
+        args.recording, args.output, simulation_config['cameras']['positions'],
+        window=features.get('window', 60.0),
+        lags=features.get('lags', 5),
+        shard_rows=features.get('shard_rows', 65536),
+        validation_split=ml_config.get('training', {}).get('validation_split', 0.2),
+        block_rows=features.get('block_rows', 1 << 20),
+        max_workers=args.workers
+    )
+    manifest = pipeline.run()
+    for name, shards in manifest['splits'].items():
+        print(f"{name}: {sum(shard['rows'] for shard in shards)} rows in {len(shards)} shards")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""Congestion prediction in a worker process, micro-batched across cameras and ticks.
+
+The simulation thread adds each observation tick's detections to the
+current feature window and, once per window, puts the finished window's
+small feature array on a bounded queue. The worker collects requests until the
+batch is full or the oldest request reaches its latency deadline, runs the
+model once over every row, and sends the probabilities back. A collector
+thread in the simulation process keeps the latest predictions and the batch
+latency and queue depth statistics.
+"""
+import logging
+import math
+import multiprocessing
+import queue
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from .models.traffic_predictor import FEATURES, load_model
+
+SECONDS_PER_DAY = 86400.0
+
+def window_features(window_start, steps, hits, speed_sums, lagged):
+    """Return (counts, speeds, (n, 4) float32 features) of one aggregation window.
+
+    hits and speed_sums are the per-camera detections and their summed
+    speeds over the window's steps; lagged holds the per-step counts of the
+    preceding windows, one row per window. Training (FeaturePipeline) and
+    serving (FeatureBuilder) both build features here, so the model is
+    served the inputs it was trained on.
+    """
+    hits = np.asarray(hits, dtype=float)
+    counts = hits / steps if steps else np.zeros(len(hits))
+    speeds = np.divide(speed_sums, hits, out=np.zeros(len(hits)), where=hits > 0)
+    time_of_day = (window_start % SECONDS_PER_DAY) / SECONDS_PER_DAY
+    features = np.empty((len(hits), len(FEATURES)), dtype=np.float32)
+    features[:, 0] = counts
+    features[:, 1] = speeds
+    features[:, 2] = time_of_day
+    # Without lagged windows (lags: 0) the window is its own history
+    features[:, 3] = lagged.mean(axis=0) if len(lagged) else counts
+    return counts, speeds, features
+
+class FeatureBuilder:
+    def __init__(self, window=60.0, lags=5):
+        """Aggregate camera detections per window of simulation time, as in training.
+
+        Detections are summed over every tick of a window. The first tick of
+        the next window turns the finished one into feature rows, with
+        historical_patterns the mean count of the lags windows before it.
+        """
+        self.window = float(window)
+        self.lags = int(lags)
+        self._window = None  # index of the window being accumulated
+        self._steps = 0
+        self._hits = {}
+        self._speed_sums = {}
+        self._history = deque(maxlen=self.lags)  # per-step counts of past windows
+        self._history_cameras = ()
+
+    def build(self, cameras, sim_time):
+        """Add one tick's detections.
+
+        Returns (camera ids, (n, 4) float32 features) of the window the tick
+        completes, or ((), None) while the current window is still open.
+        """
+        window = math.floor(sim_time / self.window)
+        completed = ((), None)
+        if self._window is not None and window != self._window:
+            completed = self._complete()
+        self._window = window
+        self._steps += 1
+        for camera_id, camera in cameras.items():
+            speeds = camera.detected_speeds()
+            self._hits[camera_id] = self._hits.get(camera_id, 0) + len(speeds)
+            self._speed_sums[camera_id] = self._speed_sums.get(camera_id, 0.0) + float(speeds.sum())
+        return completed
+
+    def _complete(self):
+        """Turn the accumulated window into feature rows and start the next one."""
+        camera_ids = tuple(self._hits)
+        if camera_ids != self._history_cameras:
+            # Cameras were added or removed; their past windows no longer line up
+            self._history.clear()
+            self._history_cameras = camera_ids
+        lagged = np.array(self._history, dtype=float).reshape(-1, len(camera_ids))
+        counts, _, features = window_features(
+            self._window * self.window, self._steps,
+            [self._hits[camera_id] for camera_id in camera_ids],
+            [self._speed_sums[camera_id] for camera_id in camera_ids],
+            lagged
+        )
+        self._history.append(counts)
+        self._steps = 0
+        self._hits = {}
+        self._speed_sums = {}
+        return camera_ids, features
+
+def _serve(model_config, requests, results, max_batch_rows, max_latency):
+    """Worker process loop: batch requests under the latency deadline and predict."""
+    model = load_model(model_config)
+    while True:
+        request = requests.get()
+        if request is None:
+            break
+        batch = [request]
+        rows = len(request[3])
+        deadline = request[4] + max_latency  # measured from when the oldest request was submitted
+        stopping = False
+        while rows < max_batch_rows:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                stopping = True
+                break
+            batch.append(request)
+            rows += len(request[3])
+
+        started = time.monotonic()
+        probabilities = model.predict(np.concatenate([request[3] for request in batch]))
+        model_time = time.monotonic() - started
+        answers = []
+        start = 0
+        for step, sim_time, camera_ids, features, submitted in batch:
+            answers.append((step, sim_time, camera_ids, probabilities[start:start + len(camera_ids)], submitted))
+            start += len(camera_ids)
+        results.put((answers, rows, model_time))
+        if stopping:
+            break
+    results.put(None)
+
+class PredictionService:
+    def __init__(self, ml_config):
+        """Configure the service from the ml section of ml_config.yaml.
+
+        The worker process is spawned here rather than forked, so it does
+        not inherit the simulation's threads and open connections.
+        """
+        inference = ml_config.get('inference', {})
+        self.model_config = ml_config.get('model', {})
+        self.threshold = float(inference.get('threshold', 0.5))
+        self.max_batch_rows = int(inference.get('max_batch_rows', 256))
+        self.max_latency = float(inference.get('max_latency_ms', 50)) / 1000.0
+        self.queue_size = int(inference.get('queue_size', 64))
+        features = ml_config.get('features', {})
+        self.features = FeatureBuilder(features.get('window', 60.0), features.get('lags', 5))
+        self.logger = logging.getLogger('traffic_simulation')
+        self._context = multiprocessing.get_context('spawn')
+        self._process = None
+        self._collector = None
+        self._requests = None
+        self._results = None
+        self._failed = False
+        self._latest = {'cameras': {}, 'stats': {}}
+        self.submitted = 0
+        self.answered = 0
+        self.dropped = 0
+        self.batches = 0
+        self.batched_rows = 0
+        self.latency_total = 0.0
+        self.last_latency = 0.0
+        self.max_latency_seen = 0.0
+        self.last_batch_rows = 0
+        self.last_model_time = 0.0
+        self._start()
+
+    def _start(self):
+        """Spawn the worker process and the thread that collects its answers."""
+        try:
+            self._requests = self._context.Queue(self.queue_size)
+            self._results = self._context.Queue()
+            self._process = self._context.Process(
+                target=_serve, name='traffic-predictor', daemon=True,
+                args=(self.model_config, self._requests, self._results, self.max_batch_rows, self.max_latency)
+            )
+            self._process.start()
+        except (OSError, AssertionError, RuntimeError) as e:
+            # e.g. daemonic sweep workers may not start child processes, and an
+            # entry script without a __main__ guard cannot spawn one
+            self.logger.error(f"Error starting the prediction worker: {str(e)}")
+            self._process = None
+            self._failed = True
+            return
+        self._collector = threading.Thread(target=self._collect, name='prediction-collector', daemon=True)
+        self._collector.start()
+
+    def submit(self, step, sim_time, cameras):
+        """Add a tick's detections, queueing the features of a window it completes without blocking."""
+        if self._failed:
+            return
+        camera_ids, features = self.features.build(cameras, sim_time)
+        if not camera_ids:
+            return
+        try:
+            self._requests.put_nowait((step, sim_time, camera_ids, features, time.monotonic()))
+            self.submitted += 1
+        except queue.Full:
+            self.dropped += 1  # the worker is behind; newer windows will supersede this one
+
+    def _collect(self):
+        """Collector thread: publish each batch's answers and latency stats."""
+        while True:
+            try:
+                message = self._results.get()
+            except (EOFError, OSError):
+                break
+            if message is None:
+                break
+            answers, rows, model_time = message
+            received = time.monotonic()
+            latency = max(received - answer[4] for answer in answers)
+            self.answered += len(answers)
+            self.batches += 1
+            self.batched_rows += rows
+            self.latency_total += latency
+            self.last_latency = latency
+            self.max_latency_seen = max(self.max_latency_seen, latency)
+            self.last_batch_rows = rows
+            self.last_model_time = model_time
+
+            step, sim_time, camera_ids, probabilities, _ = answers[-1]
+            self._latest = {
+                'step': step,
+                'simulation_time': sim_time,
+                'cameras': {
+                    camera_id: {'congestion_probability': probability, 'congested': probability >= self.threshold}
+                    for camera_id, probability in zip(camera_ids, probabilities.tolist())
+                },
+                'stats': self.stats()
+            }
+
+    def stats(self):
+        """Return batch size, latency and queue depth statistics."""
+        return {
+            'batches': self.batches,
+            'mean_batch_rows': self.batched_rows / self.batches if self.batches else 0.0,
+            'last_batch_rows': self.last_batch_rows,
+            'last_latency_ms': self.last_latency * 1000,
+            'mean_latency_ms': self.latency_total / self.batches * 1000 if self.batches else 0.0,
+            'max_latency_ms': self.max_latency_seen * 1000,
+            'last_model_ms': self.last_model_time * 1000,
+            'queue_depth': self.submitted - self.answered,
+            'dropped': self.dropped
+        }
+
+    def latest(self):
+        """Return the predictions of the most recently answered tick."""
+        return self._latest
+
+    def close(self, timeout=5.0):
+        """Stop the worker process after it answers the queued ticks."""
+        if self._process is None:
+            return
+        try:
+            self._requests.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._process.join(timeout)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._results.put(None)  # the worker could not say goodbye to the collector
+        if self._collector is not None:
+            self._collector.join(timeout)
+        self._process = None
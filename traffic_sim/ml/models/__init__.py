@@ -0,0 +1 @@
+# Initialize models package
@@ -0,0 +1,53 @@
+import logging
+
+import numpy as np
+
+# Feature order of the vectors built for every camera
+FEATURES = ('vehicle_count', 'avg_speed', 'time_of_day', 'historical_patterns')
+
+class ReferencePredictor:
+    def __init__(self, capacity=20.0, free_speed=13.89, weights=(4.0, 3.0, 0.0, 2.0), bias=-4.0):
+        """Logistic congestion model over hand-scaled features.
+
+        Counts are scaled by the number of vehicles a camera zone holds when
+        jammed and speeds are turned into a slowdown relative to free flow,
+        so the default weights need no training. Used when no trained model
+        is configured or TensorFlow is not installed.
+        """
+        self.capacity = float(capacity)
+        self.free_speed = float(free_speed)
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = float(bias)
+
+    def predict(self, features):
+        """Return the congestion probability of each (n, 4) feature row."""
+        features = np.asarray(features, dtype=np.float32).reshape(-1, len(FEATURES))
+        scaled = np.empty_like(features)
+        scaled[:, 0] = features[:, 0] / self.capacity
+        # An empty zone has no speed; treat it as free flowing
+        scaled[:, 1] = np.where(features[:, 0] > 0, 1.0 - features[:, 1] / self.free_speed, 0.0)
+        scaled[:, 2] = features[:, 2]
+        scaled[:, 3] = features[:, 3] / self.capacity
+        return 1.0 / (1.0 + np.exp(-(scaled @ self.weights + self.bias)))
+
+class KerasPredictor:
+    def __init__(self, path):
+        """Wrap a saved Keras model with one sigmoid output per feature row."""
+        import tensorflow as tf  # optional; only needed for trained models
+        self.model = tf.keras.models.load_model(path)
+
+    def predict(self, features):
+        features = np.asarray(features, dtype=np.float32).reshape(-1, len(FEATURES))
+        return np.asarray(self.model.predict(features, verbose=0), dtype=float).reshape(len(features), -1)[:, 0]
+
+def load_model(model_config):
+    """Return the trained model named by model_config['path'], or the reference model."""
+    model_config = model_config or {}
+    path = model_config.get('path')
+    if path:
+        try:
+            return KerasPredictor(path)
+        except (ImportError, OSError, ValueError) as e:
+            logging.getLogger('traffic_simulation').error(
+                f"Error loading traffic predictor {path}, using the reference model: {str(e)}")
+    return ReferencePredictor(**model_config.get('reference', {}))
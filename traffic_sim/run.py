@@ -1,22 +1,16 @@
-import os
-from traffic_sim.simulation.sim_controller import SimulationController
-from traffic_sim.web_interface import app
+from traffic_sim.web_interface import create_app
 
 def main():
-    # Load configuration
-    config_path = os.path.join(os.path.dirname(__file__), 'config/simulation_config.yaml')
-    
-    # Initialize the simulation controller
-    sim_controller = SimulationController(config_path)
-    
+    app = create_app()
+    sim_controller = app.sim_controller
     try:
-        # Start the simulation in simulation-only mode (since we're in web environment)
-        print("Starting traffic simulation in simulation-only mode...")
-        sim_controller.start_simulation()
+        # Step the simulation on its own thread so the web server starts immediately
+        print("Starting traffic simulation in the background...")
+        sim_controller.start_background()
         
-        # Run the Flask app
+        # Run the Flask app; the reloader would start a second simulation
         print("Starting web interface on port 8000...")
-        app.run(host='0.0.0.0', port=8000, debug=True)
+        app.run(host='0.0.0.0', port=8000, debug=True, use_reloader=False)
         
     except KeyboardInterrupt:
         print("Server interrupted. Closing...")
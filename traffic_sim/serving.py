@@ -0,0 +1,154 @@
+"""Serve the dashboard from pre-forked HTTP workers sharing one simulation.
+
+The simulation process runs the only SimulationController (and the only
+TraCI connection) and copies every published snapshot into a shared memory
+region. Worker processes forked before the simulation starts accept
+connections on one shared listening socket and serve /metrics, camera data,
+frames and the metrics stream from that region, so request throughput grows
+with the number of workers without touching the simulation thread. Other
+routes (history, replay, zones, perf stats) are forwarded to the full web
+interface, which the simulation process serves on a local control port.
+
+    python -m traffic_sim.serving --workers 4 --port 8000
+"""
+import argparse
+import http.client
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+import yaml
+from flask import Flask, jsonify, render_template, Response, request
+from werkzeug.serving import make_server
+
+from traffic_sim.simulation.logger import configure_logging
+from traffic_sim.simulation.shared_snapshot import SharedSimulation, SharedSnapshotReader, SharedSnapshotWriter
+from traffic_sim.snapshot_routes import SnapshotRoutes
+from traffic_sim.web_interface import create_app
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), 'config', 'simulation_config.yaml')
+
+# Request headers passed on to the control server, and response headers not passed back
+FORWARDED_HEADERS = ('content-type', 'accept', 'if-none-match')
+HOP_BY_HOP_HEADERS = ('connection', 'keep-alive', 'transfer-encoding', 'content-length')
+
+def create_worker_app(source, config, control_address, forward_timeout=10.0):
+    """Build the Flask app of one HTTP worker around a SharedSimulation."""
+    app = Flask(__name__)
+    app.snapshot_routes = SnapshotRoutes(app, source, config)
+
+    @app.route('/')
+    def index():
+        """Render the main dashboard."""
+        return render_template('dashboard.html')
+
+    @app.route('/<path:path>', methods=['GET', 'POST'])
+    def forward(path):
+        """Pass a route that needs the live controller on to the simulation process."""
+        target = request.path
+        if request.query_string:
+            target += '?' + request.query_string.decode('latin-1')
+        headers = {name: value for name, value in request.headers.items() if name.lower() in FORWARDED_HEADERS}
+        connection = http.client.HTTPConnection(*control_address, timeout=forward_timeout)
+        try:
+            connection.request(request.method, target, body=request.get_data(), headers=headers)
+            upstream = connection.getresponse()
+            body = upstream.read()
+        except OSError as e:
+            return jsonify({'error': f"Simulation process unavailable: {str(e)}"}), 502
+        finally:
+            connection.close()
+        return Response(body, status=upstream.status, headers=[
+            (name, value) for name, value in upstream.getheaders() if name.lower() not in HOP_BY_HOP_HEADERS
+        ])
+
+    return app
+
+def serve_worker(listener, region, config, control_address):
+    """Worker process: serve requests from the shared snapshot region until terminated."""
+    # The parent handles Ctrl+C and terminates the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # The parent's log writer thread does not exist in this process
+    logger = configure_logging(config.get('logging'))
+    serving = config.get('serving', {})
+    source = SharedSimulation(SharedSnapshotReader(region), serving.get('poll_interval', 0.02))
+    if source.wait_for_snapshot(0, timeout=serving.get('startup_timeout', 30.0)).version == 0:
+        logger.warning(f"Worker {os.getpid()} started before the first snapshot was written")
+    app = create_worker_app(source, config, control_address)
+    host, port = listener.getsockname()[:2]
+    server = make_server(host, port, app, threaded=True, fd=listener.fileno())
+    server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--config', default=CONFIG_PATH, help="simulation config file")
+    parser.add_argument('--workers', type=int, default=None, help="HTTP worker processes (default: serving.workers)")
+    parser.add_argument('--host', default=None, help="address to listen on (default: serving.host)")
+    parser.add_argument('--port', type=int, default=None, help="port to listen on (default: serving.port)")
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        config = yaml.safe_load(f)
+    serving = config.get('serving', {})
+    workers = args.workers or serving.get('workers') or os.cpu_count() or 1
+    host = args.host or serving.get('host', '0.0.0.0')
+    port = args.port or serving.get('port', 8000)
+    control_address = ('127.0.0.1', serving.get('control_port', 8001))
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)  # no per-request access log
+    writer = SharedSnapshotWriter(int(serving.get('shared_memory_mb', 16)) * 1024 * 1024)
+    listener = socket.create_server((host, port), backlog=int(serving.get('backlog', 128)))
+
+    # Fork before the controller exists, so workers hold no simulation state or threads
+    context = multiprocessing.get_context('fork')
+    processes = [
+        context.Process(target=serve_worker, name=f'http-worker-{number}', daemon=True,
+                        args=(listener, writer.memory.buf, config, control_address))
+        for number in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    listener.close()
+
+    sim_controller = None
+    control_server = None
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        # The one SimulationController, built only after the workers are forked
+        app = create_app(args.config)
+        sim_controller = app.sim_controller
+        writer.start(sim_controller)
+        control_server = make_server(*control_address, app, threaded=True)
+        threading.Thread(target=control_server.serve_forever, name='control-server', daemon=True).start()
+
+        print("Starting traffic simulation in the background...")
+        sim_controller.start_background()
+        print(f"Serving on {host}:{port} with {workers} workers, control routes on port {control_address[1]}")
+
+        # Workers are not replaced: forking now would copy the running simulation's threads
+        while processes:
+            time.sleep(1.0)
+            for process in [process for process in processes if not process.is_alive()]:
+                sim_controller.logger.error(f"HTTP worker {process.name} exited with code {process.exitcode}")
+                processes.remove(process)
+    except KeyboardInterrupt:
+        print("Server interrupted. Closing...")
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+        if control_server is not None:
+            control_server.shutdown()
+        writer.close()
+        if sim_controller is not None:
+            sim_controller.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,55 @@
 import math
 import logging
 
+import numpy as np
+
+from .zone_tracker import ZoneTracker
+
+class DetectedVehicles:
+    def __init__(self, vehicles, slots, distances):
+        """Copy the columns of the detected slots out of a VehicleView.
+
+        The per-vehicle dicts are only built, once, when vehicle_data is
+        first called, which may happen on another thread after the slots
+        have been reused.
+        """
+        self.slots = slots
+        self.distances = distances
+        self.ids = [vehicles.ids[slot] for slot in slots.tolist()]
+        self.codes = vehicles.code[slots]
+        self.xy = vehicles.xy[slots]
+        self.speed = vehicles.speed[slots]
+        self.edge = vehicles.edge[slots]
+        self.route = vehicles.route[slots]
+        self.type = vehicles.type[slots]
+        # Interners only ever append, so codes stay valid
+        self.edges = vehicles.edges
+        self.routes = vehicles.routes
+        self.types = vehicles.types
+        self._vehicle_data = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def vehicle_data(self):
+        """Return the detected vehicles as dicts in the get_vehicle_data format."""
+        if self._vehicle_data is None:
+            self._vehicle_data = [
+                {
+                    'id': vehicle_id,
+                    'position': (x, y),
+                    'speed': speed,
+                    'edge': self.edges.lookup(edge),
+                    'route': self.routes.lookup(route),
+                    'type': self.types.lookup(vehicle_type),
+                    'distance_to_camera': distance
+                }
+                for vehicle_id, (x, y), speed, edge, route, vehicle_type, distance in zip(
+                    self.ids, self.xy.tolist(), self.speed.tolist(), self.edge.tolist(),
+                    self.route.tolist(), self.type.tolist(), np.asarray(self.distances).tolist())
+            ]
+        return self._vehicle_data
+
 class Camera:
     def __init__(self, camera_id, position, detection_radius):
         """Initialize a camera."""
@@ -8,6 +57,8 @@ class Camera:
         self.position = position
         self.detection_radius = detection_radius
         self.detected_vehicles = []
+        self._detections = None
+        self.zone = ZoneTracker()
         self.logger = logging.getLogger('traffic_simulation')
 
     def detect_vehicles(self, vehicles):
@@ -26,9 +77,25 @@ class Camera:
                         'distance_to_camera': self._calculate_distance(vehicle['position'])
                     }
                     self.detected_vehicles.append(vehicle_data)
+            self._detections = None
         except Exception as e:
             self.logger.error(f"Error in camera {self.id} detection: {str(e)}")
 
+    def update_detections(self, vehicles, slots, distances, current_time):
+        """Store detections precomputed by the batched detection engine.
+
+        The detected vehicles' columns are copied out of the VehicleView here,
+        on the simulation thread, since later steps reuse its slots. Returns
+        the zone enter and exit events of this pass.
+        """
+        self._detections = DetectedVehicles(vehicles, slots, distances)
+        self.detected_vehicles = None
+        try:
+            return self.zone.update(vehicles, slots, current_time)
+        except Exception as e:
+            self.logger.error(f"Error tracking zone of camera {self.id}: {str(e)}")
+            return []
+
     def _is_in_range(self, vehicle_position):
         """Check if a vehicle is within the camera's detection radius."""
         try:
@@ -48,6 +115,60 @@ class Camera:
             self.logger.error(f"Error calculating distance in camera {self.id}: {str(e)}")
             return float('inf')
 
+    def detected_slots(self):
+        """Return the vehicle store slots and distances of the current detections."""
+        detections = self._detections
+        if detections is None:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        return detections.slots, detections.distances
+
+    def detected_codes(self):
+        """Return the stable vehicle id codes of the current detections, aligned with detected_slots."""
+        detections = self._detections
+        if detections is None:
+            return np.empty(0, dtype=np.int32)
+        return detections.codes
+
+    def detected_ids(self):
+        """Return the ids of the currently detected vehicles."""
+        detections = self._detections
+        if detections is None:
+            return [vehicle['id'] for vehicle in self.detected_vehicles]
+        return detections.ids
+
+    def detected_speeds(self):
+        """Return the speeds of the currently detected vehicles as an array."""
+        detections = self._detections
+        if detections is None:
+            return np.array([vehicle['speed'] for vehicle in self.detected_vehicles], dtype=float)
+        return detections.speed
+
+    def detected_count(self):
+        """Return the number of vehicles currently detected."""
+        detections = self._detections
+        if detections is None:
+            return len(self.detected_vehicles)
+        return len(detections)
+
     def get_vehicle_data(self):
         """Return the list of detected vehicles."""
-        return self.detected_vehicles
+        detections = self._detections
+        if detections is None:
+            return self.detected_vehicles
+        try:
+            return detections.vehicle_data()
+        except Exception as e:
+            self.logger.error(f"Error in camera {self.id} detection: {str(e)}")
+            return []
+
+    def count(self):
+        """Return the number of vehicles in the camera zone."""
+        return self.zone.count()
+
+    def occupancy(self):
+        """Return the share of time the camera zone has been occupied."""
+        return self.zone.occupancy()
+
+    def mean_dwell(self):
+        """Return the mean seconds vehicles spent in the camera zone."""
+        return self.zone.mean_dwell()
@@ -0,0 +1,105 @@
+import numpy as np
+import logging
+
+class DetectionEngine:
+    # Upper bound on the number of vehicle/camera pairs evaluated per block
+    MAX_BLOCK_PAIRS = 1 << 20
+
+    def __init__(self, cameras, camera_index=None):
+        """Initialize the engine for a dict of Camera objects keyed by id.
+
+        When a CameraGrid is given, only the cameras covering a vehicle's grid
+        cell are tested instead of every camera.
+        """
+        self.logger = logging.getLogger('traffic_simulation')
+        self.camera_index = camera_index
+        self.set_cameras(cameras)
+
+    def set_cameras(self, cameras):
+        """Rebuild the camera position and radius arrays."""
+        self.camera_ids = list(cameras)
+        self.positions = np.array(
+            [cameras[camera_id].position for camera_id in self.camera_ids], dtype=float
+        ).reshape(-1, 2)
+        radii = np.array(
+            [cameras[camera_id].detection_radius for camera_id in self.camera_ids], dtype=float
+        )
+        self.radii_squared = radii * radii
+        self._camera_order = {camera_id: i for i, camera_id in enumerate(self.camera_ids)}
+        self._grid_tables = None
+        self._grid_version = None
+
+    def detect(self, vehicle_positions):
+        """Find the vehicles inside every camera's detection radius.
+
+        Returns a dict mapping each camera id to a tuple of the hit vehicle
+        indices (ascending) and their distances to the camera.
+        """
+        camera_idx, vehicle_idx, distances_squared = self.hits(vehicle_positions)
+
+        # Group hits by camera while keeping vehicles in ascending order
+        order = np.lexsort((vehicle_idx, camera_idx))
+        camera_idx = camera_idx[order]
+        vehicle_idx = vehicle_idx[order]
+        distances = np.sqrt(distances_squared[order])
+        bounds = np.searchsorted(camera_idx, np.arange(len(self.camera_ids) + 1))
+
+        detections = {}
+        for cam, camera_id in enumerate(self.camera_ids):
+            lo, hi = bounds[cam], bounds[cam + 1]
+            detections[camera_id] = (vehicle_idx[lo:hi], distances[lo:hi])
+        return detections
+
+    def hits(self, vehicle_positions):
+        """Return (camera indices, vehicle indices, squared distances) of every hit, ungrouped."""
+        positions = np.asarray(vehicle_positions, dtype=float).reshape(-1, 2)
+        if self.camera_index is None:
+            return self._candidate_hits_all_pairs(positions)
+        return self._candidate_hits_grid(positions)
+
+    def _candidate_hits_all_pairs(self, positions):
+        """Test every vehicle against every camera in bounded blocks."""
+        block_size = max(1, self.MAX_BLOCK_PAIRS // max(1, len(self.camera_ids)))
+        camera_parts, vehicle_parts, distance_parts = [], [], []
+        for start in range(0, len(positions), block_size):
+            block = positions[start:start + block_size]
+            dx = block[:, 0] - self.positions[:, 0, np.newaxis]
+            dy = block[:, 1] - self.positions[:, 1, np.newaxis]
+            distances_squared = dx * dx + dy * dy
+
+            camera_idx, vehicle_idx = np.nonzero(distances_squared <= self.radii_squared[:, np.newaxis])
+            camera_parts.append(camera_idx)
+            vehicle_parts.append(vehicle_idx + start)
+            distance_parts.append(distances_squared[camera_idx, vehicle_idx])
+
+        if not camera_parts:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp), np.empty(0, dtype=float)
+        return np.concatenate(camera_parts), np.concatenate(vehicle_parts), np.concatenate(distance_parts)
+
+    def _candidate_hits_grid(self, positions):
+        """Test each vehicle only against the cameras covering its grid cell."""
+        if self._grid_version != self.camera_index.version:
+            self._grid_tables = self.camera_index.compile(self._camera_order)
+            self._grid_version = self.camera_index.version
+        cell_keys, starts, flat = self._grid_tables
+
+        if len(cell_keys) == 0 or len(positions) == 0:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp), np.empty(0, dtype=float)
+
+        vehicle_keys = self.camera_index.cell_keys(positions)
+        rows = np.minimum(np.searchsorted(cell_keys, vehicle_keys), len(cell_keys) - 1)
+        covered = cell_keys[rows] == vehicle_keys
+        vehicle_idx = np.flatnonzero(covered)
+        rows = rows[covered]
+
+        # Expand every covered vehicle into one pair per candidate camera
+        counts = starts[rows + 1] - starts[rows]
+        pair_vehicle = np.repeat(vehicle_idx, counts)
+        pair_offset = np.repeat(starts[rows] - (np.cumsum(counts) - counts), counts)
+        pair_camera = flat[np.arange(len(pair_vehicle)) + pair_offset]
+
+        dx = positions[pair_vehicle, 0] - self.positions[pair_camera, 0]
+        dy = positions[pair_vehicle, 1] - self.positions[pair_camera, 1]
+        distances_squared = dx * dx + dy * dy
+        hit = distances_squared <= self.radii_squared[pair_camera]
+        return pair_camera[hit], pair_vehicle[hit], distances_squared[hit]
@@ -0,0 +1,108 @@
+import logging
+import queue
+import threading
+import time
+from flask import Response
+
+class FrameBroadcaster:
+    def __init__(self, video_stream, fps=5.0):
+        """Share one rendered and encoded frame per tick among all viewers of a camera."""
+        self.video_stream = video_stream
+        self.interval = 1.0 / fps
+        self.frames_encoded = 0
+        self.frames_dropped = 0
+        self.logger = logging.getLogger('traffic_simulation')
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def subscribe(self):
+        """Register a viewer and return the queue its frames arrive on.
+
+        Each queue holds a single frame, so a slow viewer only ever sees
+        the newest frame instead of a growing backlog.
+        """
+        subscriber = queue.Queue(maxsize=1)
+        with self._lock:
+            self._subscribers.add(subscriber)
+            self._ensure_running()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        """Remove a viewer; the render thread exits once nobody is left."""
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def subscriber_count(self):
+        """Return the number of connected viewers."""
+        return len(self._subscribers)
+
+    def _ensure_running(self):
+        """Start the render thread if it is not running. Caller holds the lock."""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name=f'frames-{self.video_stream.camera_id}', daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        """Render, encode and fan out one frame per tick while there are viewers."""
+        next_tick = time.monotonic()
+        while True:
+            with self._lock:
+                subscribers = list(self._subscribers)
+                if not subscribers:
+                    self._thread = None
+                    return
+
+            try:
+                frame = self.video_stream.encode_frame()
+                self.frames_encoded += 1
+                for subscriber in subscribers:
+                    self._offer(subscriber, frame)
+            except Exception as e:
+                self.logger.error(f"Error rendering frame for camera {self.video_stream.camera_id}: {str(e)}")
+
+            next_tick += self.interval
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # Rendering fell behind; restart the schedule instead of bursting
+                next_tick = time.monotonic()
+
+    def _offer(self, subscriber, frame):
+        """Hand a frame to a viewer, replacing any frame it has not picked up yet."""
+        try:
+            subscriber.put_nowait(frame)
+        except queue.Full:
+            try:
+                subscriber.get_nowait()
+                self.frames_dropped += 1
+            except queue.Empty:
+                pass
+            try:
+                subscriber.put_nowait(frame)
+            except queue.Full:
+                self.frames_dropped += 1
+
+    def generate_frames(self):
+        """Yield multipart JPEG parts for one viewer until it disconnects."""
+        subscriber = self.subscribe()
+        try:
+            while True:
+                try:
+                    frame = subscriber.get(timeout=max(1.0, 5 * self.interval))
+                except queue.Empty:
+                    # Restart the render thread if it stopped while we were subscribed
+                    with self._lock:
+                        self._ensure_running()
+                    continue
+                yield (b'--frame\r\n'
+                       b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+        finally:
+            self.unsubscribe(subscriber)
+
+    def get_video_feed(self):
+        return Response(self.generate_frames(),
+                        mimetype='multipart/x-mixed-replace; boundary=frame')
@@ -0,0 +1,53 @@
+import random
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Distinguishes this run's entity tags from those of earlier runs, whose snapshot
+# versions repeat. Drawn at import, so HTTP workers forked from one server share it.
+RUN_TOKEN = secrets.token_hex(4)
+
+class JpegSnapshotCache:
+    def __init__(self, video_streams, max_workers=2, run_token=RUN_TOKEN):
+        """Cache one encoded frame per camera for the latest snapshot.
+
+        video_streams maps camera ids to VideoStream objects. Entries are keyed
+        by snapshot version, which unlike the step never repeats within a run,
+        even when a replay loops or seeks. Encoding runs on a small thread
+        pool, and concurrent requests for the same camera and snapshot share
+        a single encode.
+        """
+        self.video_streams = video_streams
+        self.run_token = run_token
+        self.encodes = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='jpeg-encode')
+        self._entries = {}  # camera id -> (version, future)
+        self._lock = threading.Lock()
+
+    def etag(self, camera_id, version):
+        """Return the entity tag of a camera frame at a snapshot version of this run."""
+        return f'{self.run_token}-{camera_id}-{version}'
+
+    def get(self, camera_id, snapshot):
+        """Return a future resolving to the JPEG bytes of a camera in a snapshot."""
+        with self._lock:
+            entry = self._entries.get(camera_id)
+            if entry is not None and entry[0] == snapshot.version:
+                return entry[1]
+            future = self._executor.submit(self._encode, camera_id, snapshot)
+            self._entries[camera_id] = (snapshot.version, future)
+            return future
+
+    def _encode(self, camera_id, snapshot):
+        """Render and encode a camera frame from a snapshot on a pool thread.
+
+        The vehicle markers are drawn with a generator seeded by the camera
+        and version, so every HTTP worker encodes the same bytes for a tag.
+        """
+        self.encodes += 1
+        rng = random.Random(f'{camera_id}-{snapshot.version}')
+        return self.video_streams[camera_id].encode_frame(snapshot.metrics, rng)
+
+    def shutdown(self):
+        """Stop the encode pool."""
+        self._executor.shutdown(wait=False)
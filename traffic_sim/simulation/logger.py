@@ -1,30 +1,275 @@
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
+import random
+import threading
+import time
+
+import numpy as np
+
+LOGGER_NAME = 'traffic_simulation'
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Used when simulation_config.yaml has no logging section
+DEFAULT_LOGGING_CONFIG = {
+    'level': 'INFO',
+    'format': 'text',
+    'queue_size': 10000,
+    'categories': {}
+}
+
+class JsonFormatter(logging.Formatter):
+    """Render records as one JSON object per line."""
+
+    def format(self, record):
+        # Structured fields never replace the record's own keys
+        entry = dict(getattr(record, 'fields', None) or {})
+        entry.update({
+            'time': record.created,
+            'level': record.levelname,
+            'category': getattr(record, 'category', 'general'),
+            'message': record.getMessage()
+        })
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that drops records when the queue is full instead of blocking."""
+
+    def __init__(self, record_queue):
+        super().__init__(record_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Formatting happens on the listener thread; the args passed by the
+        # helpers below are immutable snapshots, so the record is queued as is.
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class DrainingQueueListener(logging.handlers.QueueListener):
+    """Queue listener whose stop waits for room in a full queue instead of raising."""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+class CategorySampler:
+    """Sample rate plus a token-bucket rate limit for one log category."""
+
+    def __init__(self, sample_rate=1.0, rate_limit=None):
+        self.sample_rate = float(sample_rate)
+        self.rate_limit = rate_limit
+        self._tokens = float(rate_limit) if rate_limit else 0.0
+        self._refilled = time.monotonic()
+        self._lock = threading.Lock()
+        self.emitted = 0
+        self.sampled_out = 0
+        self.rate_limited = 0
+
+    @property
+    def enabled(self):
+        return self.sample_rate > 0 and self.rate_limit != 0
+
+    def _take_tokens(self, wanted):
+        """Return how many of the wanted records the rate limit lets through."""
+        if self.rate_limit is None:
+            return wanted
+        now = time.monotonic()
+        self._tokens = min(float(self.rate_limit),
+                           self._tokens + (now - self._refilled) * self.rate_limit)
+        self._refilled = now
+        granted = min(wanted, int(self._tokens))
+        self._tokens -= granted
+        return granted
+
+    def admit(self):
+        """Decide whether a single record should be emitted."""
+        with self._lock:
+            if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+                self.sampled_out += 1
+                return False
+            if self._take_tokens(1) == 0:
+                self.rate_limited += 1
+                return False
+            self.emitted += 1
+            return True
+
+    def select(self, count):
+        """Pick which of count candidate records to emit, as an index array."""
+        with self._lock:
+            indices = np.arange(count)
+            if self.sample_rate < 1.0:
+                indices = indices[np.random.random(count) < self.sample_rate]
+            self.sampled_out += count - len(indices)
+            granted = self._take_tokens(len(indices))
+            self.rate_limited += len(indices) - granted
+            self.emitted += granted
+            return indices[:granted]
+
+    def stats(self):
+        return {
+            'sample_rate': self.sample_rate,
+            'rate_limit': self.rate_limit,
+            'emitted': self.emitted,
+            'sampled_out': self.sampled_out,
+            'rate_limited': self.rate_limited
+        }
+
+class LoggingPipeline:
+    """Bounded queue feeding a background listener that writes to stderr."""
+
+    def __init__(self, config):
+        self.level = logging.getLevelName(str(config.get('level', 'INFO')).upper())
+        self.queue = queue.Queue(maxsize=int(config.get('queue_size', 10000)))
+        self.handler = BoundedQueueHandler(self.queue)
+        stream_handler = logging.StreamHandler()
+        if config.get('format', 'text') == 'json':
+            stream_handler.setFormatter(JsonFormatter())
+        else:
+            stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        self.listener = DrainingQueueListener(self.queue, stream_handler)
+        self.samplers = {
+            name: CategorySampler(settings.get('sample_rate', 1.0), settings.get('rate_limit'))
+            for name, settings in (config.get('categories') or {}).items()
+        }
+
+    def sampler(self, category):
+        sampler = self.samplers.get(category)
+        if sampler is None:
+            sampler = self.samplers.setdefault(category, CategorySampler())
+        return sampler
+
+    def start(self):
+        self.listener.start()
+
+    def stop(self):
+        """Flush the queued records and stop the listener thread."""
+        self.listener.stop()
+
+    def stats(self):
+        return {
+            'queued': self.queue.qsize(),
+            'queue_size': self.queue.maxsize,
+            'dropped': self.handler.dropped,
+            'categories': {name: sampler.stats() for name, sampler in self.samplers.items()}
+        }
+
+_logger = logging.getLogger(LOGGER_NAME)
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+def configure_logging(config=None):
+    """Install the asynchronous logging pipeline, replacing any previous one."""
+    global _pipeline
+    settings = dict(DEFAULT_LOGGING_CONFIG)
+    settings.update(config or {})
+    with _pipeline_lock:
+        if _pipeline is not None:
+            _logger.removeHandler(_pipeline.handler)
+            _pipeline.stop()
+        for handler in list(_logger.handlers):
+            _logger.removeHandler(handler)
+        _pipeline = LoggingPipeline(settings)
+        _logger.setLevel(_pipeline.level)
+        _logger.addHandler(_pipeline.handler)
+        _pipeline.start()
+    return _logger
 
 def setup_logger(log_level=logging.INFO):
     """Set up the logger for the simulation."""
-    logger = logging.getLogger('traffic_simulation')
-    
-    # Only add handler if the logger doesn't already have handlers
-    if not logger.handlers:
-        logger.setLevel(log_level)
-        handler = logging.StreamHandler()
-        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
-    
-    return logger  # Ensure the logger is returned
-
-def log_vehicle_movement(vehicle_id, position, speed, lane, timestamp):
-    """Log vehicle movement details."""
-    logger = setup_logger()
-    logger.info(f"Vehicle {vehicle_id} moved to position {position} with speed {speed}, lane {lane} at time {timestamp}.")
+    # Only install the pipeline if the logger doesn't already have handlers
+    if not _logger.handlers:
+        configure_logging({'level': logging.getLevelName(log_level)})
+    return _logger  # Ensure the logger is returned
+
+def shutdown_logging():
+    """Stop the listener, writing out everything still queued."""
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is not None:
+            _logger.removeHandler(_pipeline.handler)
+            _pipeline.stop()
+            _pipeline = None
+
+atexit.register(shutdown_logging)
+
+def logging_stats():
+    """Return queue and per-category sampling counters."""
+    pipeline = _pipeline
+    return pipeline.stats() if pipeline is not None else {}
+
+def _sampler(category):
+    pipeline = _pipeline
+    return pipeline.sampler(category) if pipeline is not None else None
+
+def category_enabled(category, level=logging.INFO):
+    """Check whether records of a category can be emitted at all."""
+    if not _logger.isEnabledFor(level):
+        return False
+    sampler = _sampler(category)
+    return sampler is None or sampler.enabled
+
+def _admit(category, level=logging.INFO):
+    if not _logger.isEnabledFor(level):
+        return False
+    sampler = _sampler(category)
+    return sampler is None or sampler.admit()
+
+def log_vehicle_movements(vehicles, timestamp):
+    """Log a sampled subset of the vehicles in a VehicleView."""
+    if not category_enabled('vehicle'):
+        return
+    slots = vehicles.slots
+    sampler = _sampler('vehicle')
+    if sampler is not None:
+        slots = slots[sampler.select(len(slots))]
+    for slot in slots.tolist():
+        x, y = vehicles.xy[slot].tolist()
+        vehicle_id = vehicles.ids[slot]
+        speed = float(vehicles.speed[slot])
+        lane = vehicles.lanes.lookup(vehicles.lane[slot])
+        _logger.info("Vehicle %s moved to position %s with speed %s, lane %s at time %s.",
+                     vehicle_id, (x, y), speed, lane, timestamp,
+                     extra={'category': 'vehicle', 'fields': {
+                         'vehicle_id': vehicle_id, 'position': (x, y), 'speed': speed,
+                         'lane': lane, 'sim_time': timestamp}})
 
 def log_camera_detection(camera_id, detected_vehicles, timestamp):
-    """Log camera detection details."""
-    logger = setup_logger()
-    logger.info(f"Camera {camera_id} detected vehicles: {detected_vehicles} at time {timestamp}.")
+    """Log camera detection details.
+
+    detected_vehicles may be vehicle ids or the detected vehicle dicts; only
+    the ids are recorded.
+    """
+    if not _admit('camera'):
+        return
+    vehicle_ids = [vehicle['id'] if isinstance(vehicle, dict) else vehicle
+                   for vehicle in detected_vehicles]
+    _logger.info("Camera %s detected vehicles: %s at time %s.",
+                 camera_id, vehicle_ids, timestamp,
+                 extra={'category': 'camera', 'fields': {
+                     'camera_id': camera_id, 'vehicle_ids': vehicle_ids,
+                     'count': len(vehicle_ids), 'sim_time': timestamp}})
+
+def log_camera_zone_events(camera_id, events):
+    """Log the enter and exit events of a camera zone."""
+    if not category_enabled('camera'):
+        return
+    for event in events:
+        if not _admit('camera'):
+            continue
+        fields = {key: value for key, value in event.items() if key != 'time'}
+        fields.update(sim_time=event['time'], camera_id=camera_id)
+        _logger.info("Vehicle %s %s camera %s zone at time %s.",
+                     event['vehicle_id'], 'entered' if event['event'] == 'enter' else 'left',
+                     camera_id, event['time'], extra={'category': 'camera', 'fields': fields})
 
 def log_warning(message):
     """Log a warning message."""
-    logger = setup_logger()
-    logger.warning(message)
+    _logger.warning(message)
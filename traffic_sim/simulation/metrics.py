@@ -0,0 +1,65 @@
+import numpy as np
+
+class MetricsAggregator:
+    def __init__(self, camera_ids=()):
+        """Initialize empty aggregates for the given cameras."""
+        self.lane_lengths = {}
+        self.network_length_km = 0.0
+        self._current = {
+            'step': 0,
+            'simulation_time': 0.0,
+            'total_vehicles': 0,
+            'average_speed': 0.0,
+            'density': 0.0,
+            'vehicles_per_camera': {camera_id: 0 for camera_id in camera_ids},
+            'camera_zones': {},
+            'average_speed_per_lane': {}
+        }
+
+    def set_lane_lengths(self, lane_lengths):
+        """Set the length in meters of every lane used for density."""
+        self.lane_lengths = dict(lane_lengths)
+        self.network_length_km = sum(self.lane_lengths.values()) / 1000.0
+
+    def update(self, step, simulation_time, vehicles, cameras):
+        """Recompute the aggregates from one step's vehicle columns and camera hits.
+
+        Nothing carries over between steps: the network and per-lane speed
+        sums are rebuilt from every vehicle in one vectorized pass. The
+        resulting dict replaces the current one and is never modified
+        afterwards.
+        """
+        slots = vehicles.slots
+        speeds = vehicles.speed[slots]
+        lanes = vehicles.lane[slots]
+        num_lanes = len(vehicles.lanes)
+
+        total = len(slots)
+        speed_sum = float(speeds.sum())
+        lane_sums = np.bincount(lanes, weights=speeds, minlength=num_lanes)
+        lane_counts = np.bincount(lanes, minlength=num_lanes)
+
+        occupied = np.flatnonzero(lane_counts)
+        lane_means = lane_sums[occupied] / lane_counts[occupied]
+        lane_names = vehicles.lanes.values
+
+        self._current = {
+            'step': step,
+            'simulation_time': simulation_time,
+            'total_vehicles': total,
+            'average_speed': speed_sum / total if total else 0.0,
+            'density': total / self.network_length_km if self.network_length_km else 0.0,
+            'vehicles_per_camera': {
+                camera_id: camera.detected_count() for camera_id, camera in cameras.items()
+            },
+            'camera_zones': {
+                camera_id: camera.zone.stats() for camera_id, camera in cameras.items()
+            },
+            'average_speed_per_lane': {
+                lane_names[code]: mean for code, mean in zip(occupied.tolist(), lane_means.tolist())
+            }
+        }
+
+    def current(self):
+        """Return the latest aggregate."""
+        return self._current
@@ -0,0 +1,184 @@
+import math
+import threading
+
+import numpy as np
+
+# Scalar metrics kept in the history
+HISTORY_FIELDS = ('total_vehicles', 'average_speed', 'density')
+
+# Rollup resolutions and their bucket length in seconds
+ROLLUP_PERIODS = {'1s': 1.0, '10s': 10.0, '1m': 60.0}
+
+class RingBuffer:
+    def __init__(self, capacity, fields=HISTORY_FIELDS):
+        """Preallocate storage for a fixed number of timestamped samples."""
+        self.capacity = capacity
+        self.times = np.zeros(capacity)
+        self.values = {field: np.zeros(capacity) for field in fields}
+        self.head = 0    # next slot to write
+        self.count = 0
+
+    def append(self, time, values):
+        """Store a sample, overwriting the oldest one when full."""
+        slot = self.head
+        for field, column in self.values.items():
+            column[slot] = values[field]
+        self.times[slot] = time
+        self.head = (slot + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def clear(self):
+        """Drop all samples."""
+        self.head = 0
+        self.count = 0
+
+    def latest_time(self):
+        """Return the time of the newest sample, or None when empty."""
+        if not self.count:
+            return None
+        return float(self.times[self.head - 1])
+
+    def oldest_time(self):
+        """Return the time of the oldest sample, or None when empty."""
+        if not self.count:
+            return None
+        return float(self.times[self._segments()[0][0]])
+
+    def _segments(self):
+        """Return the physical ranges holding samples, oldest first."""
+        if self.count < self.capacity:
+            return [(0, self.count)]
+        return [(self.head, self.capacity), (0, self.head)]
+
+    def range(self, start, end):
+        """Return the times and values of samples with start <= time <= end."""
+        indices = []
+        for lo, hi in self._segments():
+            times = self.times[lo:hi]
+            first = np.searchsorted(times, start, side='left')
+            last = np.searchsorted(times, end, side='right')
+            if first < last:
+                indices.append(np.arange(lo + first, lo + last))
+        index = np.concatenate(indices) if indices else np.empty(0, dtype=np.intp)
+        return self.times[index], {field: column[index] for field, column in self.values.items()}
+
+
+class Rollup:
+    def __init__(self, period, capacity, fields=HISTORY_FIELDS):
+        """Average samples into fixed-length buckets stored in a ring buffer."""
+        self.period = period
+        self.buffer = RingBuffer(capacity, fields)
+        self._bucket = None
+        self._sums = dict.fromkeys(fields, 0.0)
+        self._samples = 0
+
+    def add(self, time, values):
+        """Add a sample, closing the current bucket when time moves past it."""
+        # The epsilon keeps accumulated step times such as 2.9999999 in the right bucket
+        bucket = math.floor(time / self.period + 1e-9)
+        if bucket != self._bucket:
+            self._flush()
+            self._bucket = bucket
+        for field in self._sums:
+            self._sums[field] += values[field]
+        self._samples += 1
+
+    def _flush(self):
+        """Store the mean of the current bucket, stamped with the bucket start."""
+        if self._samples:
+            means = {field: total / self._samples for field, total in self._sums.items()}
+            self.buffer.append(self._bucket * self.period, means)
+        self._sums = dict.fromkeys(self._sums, 0.0)
+        self._samples = 0
+
+    def clear(self):
+        """Drop all buckets."""
+        self.buffer.clear()
+        self._bucket = None
+        self._sums = dict.fromkeys(self._sums, 0.0)
+        self._samples = 0
+
+
+class MetricsHistory:
+    # Largest number of points an 'auto' resolution query returns
+    MAX_AUTO_POINTS = 1000
+
+    def __init__(self, step_time=0.1, step_capacity=36000, duration=86400):
+        """Keep raw per-step samples plus rollups that cover the given duration in seconds.
+
+        record runs on the simulation thread and query on HTTP threads; a lock
+        keeps a query from reading buffers halfway through a wraparound or a
+        clear.
+        """
+        self.step_time = step_time
+        self._lock = threading.Lock()
+        self.raw = RingBuffer(step_capacity)
+        self.rollups = {
+            name: Rollup(period, int(math.ceil(duration / period)) + 1)
+            for name, period in ROLLUP_PERIODS.items()
+        }
+
+    def record(self, metrics):
+        """Append one step's metrics to the raw buffer and every rollup."""
+        time = metrics['simulation_time']
+        with self._lock:
+            latest = self.raw.latest_time()
+            if latest is not None and time < latest:
+                # Simulation time went backwards, so a new run has started
+                self._clear()
+            self.raw.append(time, metrics)
+            for rollup in self.rollups.values():
+                rollup.add(time, metrics)
+
+    def clear(self):
+        """Forget all recorded history."""
+        with self._lock:
+            self._clear()
+
+    def _clear(self):
+        self.raw.clear()
+        for rollup in self.rollups.values():
+            rollup.clear()
+
+    def query(self, start=None, end=None, resolution='auto'):
+        """Return the samples between start and end (simulation seconds) at a resolution.
+
+        resolution is 'step', one of the rollup names, or 'auto' to pick the
+        finest resolution that fits MAX_AUTO_POINTS. end defaults to the
+        newest sample and start to ten minutes before end.
+        """
+        with self._lock:
+            if end is None:
+                end = self.raw.latest_time() or 0.0
+            if start is None:
+                start = end - 600.0
+            if start > end:
+                raise ValueError(f"'from' ({start}) must not be after 'to' ({end})")
+
+            if resolution == 'auto':
+                resolution = self._auto_resolution(start, end)
+            if resolution == 'step':
+                buffer = self.raw
+            elif resolution in self.rollups:
+                buffer = self.rollups[resolution].buffer
+            else:
+                raise ValueError(f"Unknown resolution '{resolution}', expected 'auto', 'step' or one of "
+                                 f"{', '.join(self.rollups)}")
+            # range copies the samples, so they are converted after the lock is released
+            times, values = buffer.range(start, end)
+
+        result = {'resolution': resolution, 'from': start, 'to': end, 'time': times.tolist()}
+        for field, column in values.items():
+            result[field] = column.tolist()
+        return result
+
+    def _auto_resolution(self, start, end):
+        """Pick the finest resolution returning at most MAX_AUTO_POINTS samples."""
+        span = end - start
+        oldest = self.raw.oldest_time()
+        if oldest is not None and oldest <= start and span / self.step_time <= self.MAX_AUTO_POINTS:
+            return 'step'
+        for name, period in ROLLUP_PERIODS.items():
+            if span / period <= self.MAX_AUTO_POINTS:
+                return name
+        return name
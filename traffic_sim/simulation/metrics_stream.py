@@ -0,0 +1,62 @@
+import json
+import time
+
+class MetricsStream:
+    def __init__(self, sim_controller, min_interval=0.5, keepalive=15.0):
+        """Turn published snapshots into per-client update messages.
+
+        min_interval bounds how often one client is sent an update; snapshots
+        published in between are coalesced into the next message.
+        """
+        self.sim_controller = sim_controller
+        self.min_interval = min_interval
+        self.keepalive = keepalive
+
+    def updates(self):
+        """Yield (event, payload) pairs for one client, or (None, None) as a keep-alive.
+
+        The first 'metrics' payload is the full metrics dict; later ones
+        only carry the top-level keys whose value changed. 'detections'
+        carries the detected vehicle ids of the cameras whose set changed.
+        """
+        version = 0
+        sent_metrics = {}
+        sent_detections = {}
+        while True:
+            snapshot = self.sim_controller.wait_for_snapshot(version, timeout=self.keepalive)
+            if snapshot.version == version:
+                yield None, None
+                continue
+            version = snapshot.version
+
+            metrics = snapshot.metrics
+            delta = {key: value for key, value in metrics.items() if sent_metrics.get(key) != value}
+            sent_metrics = metrics
+            if delta:
+                delta['version'] = version
+                yield 'metrics', delta
+
+            detections = {
+                camera_id: ids for camera_id, ids in snapshot.detections().items()
+                if sent_detections.get(camera_id) != ids
+            }
+            if detections and snapshot.is_valid():
+                sent_detections.update(detections)
+                yield 'detections', {'version': version, 'cameras': detections}
+
+            # Coalesce everything published while this client rests
+            time.sleep(self.min_interval)
+
+    def server_sent_events(self):
+        """Yield the updates formatted as a text/event-stream body."""
+        for event, payload in self.updates():
+            if event is None:
+                yield ': keep-alive\n\n'
+            else:
+                yield f"event: {event}\ndata: {json.dumps(payload, separators=(',', ':'))}\n\n"
+
+    def websocket_messages(self):
+        """Yield the updates as JSON text messages for a WebSocket."""
+        for event, payload in self.updates():
+            if event is not None:
+                yield json.dumps({'event': event, 'data': payload}, separators=(',', ':'))
@@ -0,0 +1,293 @@
+import logging
+from collections import deque
+
+import numpy as np
+
+from .road_network import load_network, load_routes
+
+# IDM parameters used when neither the config nor the route file sets them
+DEFAULT_ACCEL = 2.6
+DEFAULT_DECEL = 4.5
+DEFAULT_MIN_GAP = 2.5
+DEFAULT_HEADWAY = 1.0
+MAX_BRAKING = 9.0     # m/s^2, physical limit on the model's deceleration
+ACCEL_EXPONENT = 4
+SPEED_FACTOR_DEVIATION = 0.1  # spread of desired speeds around the limit, as in SUMO
+
+# Per-vehicle arrays, kept in the same row order
+STATE_COLUMNS = ('lane', 'offset', 'speed', 'vehicle_type', 'route', 'route_position', 'speed_factor', 'slot')
+
+def _clock_seconds(value):
+    """Convert 'HH:MM' or a number of seconds to seconds since midnight."""
+    if isinstance(value, str):
+        hours, minutes = value.split(':')
+        return int(hours) * 3600 + int(minutes) * 60
+    return float(value)
+
+class MicroSimulation:
+    def __init__(self, network, routes, vehicle_types, flow_rates, vehicles, step_time,
+                 begin=0.0, seed=None):
+        """Set up a vectorized car-following simulation on a road network.
+
+        routes maps route ids to edge id lists, vehicle_types is a list of
+        dicts with type, length, max_speed, probability and optional accel,
+        decel, min_gap and headway, and flow_rates is the traffic.flow_rates
+        config section. Vehicle state is written into the VehicleStore
+        vehicles after every step.
+        """
+        self.network = network
+        self.vehicles = vehicles
+        self.step_time = step_time
+        self.begin = float(begin)
+        self.time = self.begin
+        self.steps = 0
+        self.rng = np.random.default_rng(seed)
+        self.logger = logging.getLogger('traffic_simulation')
+
+        # Routes as padded lane index tables; -1 marks the end of a route
+        self.route_ids = list(routes)
+        longest = max((len(edges) for edges in routes.values()), default=0)
+        self.route_lanes = np.full((len(routes), longest + 1), -1, dtype=np.int32)
+        for index, edges in enumerate(routes.values()):
+            self.route_lanes[index, :len(edges)] = [network.edge_lane(edge) for edge in edges]
+        self.route_edges = [edges[0] for edges in routes.values()]
+
+        self.type_ids = [vehicle_type['type'] for vehicle_type in vehicle_types]
+        self.type_length = np.array([t['length'] for t in vehicle_types], dtype=float)
+        self.type_max_speed = np.array([t['max_speed'] for t in vehicle_types], dtype=float)
+        self.type_accel = np.array([t.get('accel', DEFAULT_ACCEL) for t in vehicle_types], dtype=float)
+        self.type_decel = np.array([t.get('decel', DEFAULT_DECEL) for t in vehicle_types], dtype=float)
+        self.type_min_gap = np.array([t.get('min_gap', DEFAULT_MIN_GAP) for t in vehicle_types], dtype=float)
+        self.type_headway = np.array([t.get('headway', DEFAULT_HEADWAY) for t in vehicle_types], dtype=float)
+        probability = np.array([t.get('probability', 1.0) for t in vehicle_types], dtype=float)
+        self.type_probability = probability / probability.sum()
+
+        base = flow_rates.get('base_flow', {}).get('vehicles_per_hour', 0)
+        self.base_rate = float(base)
+        self.peaks = [
+            (_clock_seconds(flow['start_time']), _clock_seconds(flow['end_time']), float(flow['vehicles_per_hour']))
+            for name, flow in flow_rates.items()
+            if isinstance(flow, dict) and 'start_time' in flow and 'end_time' in flow
+        ]
+
+        # Per-vehicle state, one row per vehicle in the network
+        self.lane = np.zeros(0, dtype=np.int32)
+        self.offset = np.zeros(0)          # metres from the start of the lane
+        self.speed = np.zeros(0)
+        self.vehicle_type = np.zeros(0, dtype=np.int32)
+        self.route = np.zeros(0, dtype=np.int32)
+        self.route_position = np.zeros(0, dtype=np.int32)
+        self.speed_factor = np.zeros(0)
+        self.slot = np.zeros(0, dtype=np.int64)   # VehicleStore slot
+        self._lane_stride = float(network.lane_length.max(initial=0.0)) + 1.0
+        self._rear_offset = np.full(len(network), np.inf)
+
+        # Vehicles waiting for space at the start of their route, by route
+        self.pending = [deque() for _ in self.route_ids]
+        self._queue_vehicles(int(flow_rates.get('additional_vehicles', 0)))
+        self.spawned = 0
+        self.arrived = 0
+
+        # Codes of the network's strings in the store's interners
+        self.lane_codes = np.array([vehicles.lanes.intern(lane) for lane in network.lane_ids], dtype=np.int32)
+        self.edge_codes = np.array([vehicles.edges.intern(edge) for edge in network.lane_edges], dtype=np.int32)
+        self.route_codes = np.array([vehicles.routes.intern(route) for route in self.route_ids], dtype=np.int32)
+        self.type_codes = np.array([vehicles.types.intern(t) for t in self.type_ids], dtype=np.int32)
+
+    @classmethod
+    def from_config(cls, config, net_file, route_file, vehicles, seed=None, network=None):
+        """Build the simulation from simulation_config.yaml and the SUMO network files.
+
+        network is an already loaded RoadNetwork for net_file, if any.
+        """
+        if network is None:
+            network = load_network(net_file, config.get('network', {}).get('cache_directory'))
+        route_types, routes = load_routes(route_file)
+        vehicle_types = []
+        for vehicle_type in config['traffic']['vehicle_types']:
+            merged = dict(vehicle_type)
+            # Take acceleration behaviour from the matching vType of the route file
+            sumo_type = route_types.get(vehicle_type['type'], {})
+            for key, attribute in (('accel', 'accel'), ('decel', 'decel'), ('min_gap', 'minGap'), ('headway', 'tau')):
+                if key not in merged and attribute in sumo_type:
+                    merged[key] = float(sumo_type[attribute])
+            vehicle_types.append(merged)
+        if not routes:
+            # Without a route file every edge is a one-edge route
+            routes = {edge: [edge] for edge in network.edges}
+        simulation = config['simulation']
+        return cls(network, routes, vehicle_types, config['traffic'].get('flow_rates', {}), vehicles,
+                   simulation['step_time'], simulation.get('begin', 0.0),
+                   simulation.get('seed', seed))
+
+    def __len__(self):
+        return len(self.lane)
+
+    def flow_rate(self, sim_time):
+        """Return the configured demand in vehicles per hour at a simulation time."""
+        clock = sim_time % 86400
+        for start, end, rate in self.peaks:
+            if start <= clock < end:
+                return rate
+        return self.base_rate
+
+    def _queue_vehicles(self, count):
+        """Assign new vehicles a random route and type and queue them for insertion."""
+        routes = self.rng.integers(len(self.route_ids), size=count)
+        vehicle_types = self.rng.choice(len(self.type_ids), size=count, p=self.type_probability)
+        for route, vehicle_type in zip(routes.tolist(), vehicle_types.tolist()):
+            self.pending[route].append(vehicle_type)
+
+    def step(self, write=True):
+        """Advance every vehicle by one step and write the result to the vehicle store.
+
+        With write=False the store is left as it was, for steps nobody observes.
+        """
+        self._move(self.step_time)
+        self._spawn(self.step_time)
+        self.steps += 1
+        self.time = self.begin + self.steps * self.step_time
+        if write:
+            self._write()
+        return self.time
+
+    def _sort(self):
+        """Order the vehicle rows by lane, then by position along the lane.
+
+        Vehicles cannot overtake on a lane, so the rows stay nearly sorted
+        between steps and the stable sort has little to do.
+        """
+        key = self.lane * self._lane_stride + self.offset
+        if len(key) < 2 or np.all(key[1:] >= key[:-1]):
+            return
+        order = np.argsort(key, kind='stable')
+        for name in STATE_COLUMNS:
+            setattr(self, name, getattr(self, name)[order])
+
+    def _move(self, dt):
+        """Apply the Intelligent Driver Model to all vehicles at once."""
+        network = self.network
+        self._rear_offset = np.full(len(network), np.inf)
+        count = len(self.lane)
+        if not count:
+            return
+        self._sort()
+        lane, offset, speed, vehicle_type = self.lane, self.offset, self.speed, self.vehicle_type
+        length = self.type_length[vehicle_type]
+
+        # With rows sorted, each vehicle's leader on the same lane is the next row
+        same_lane = lane[1:] == lane[:-1]
+        gap = np.full(count, np.inf)
+        leader_speed = np.zeros(count)
+        gap[:-1] = np.where(same_lane, offset[1:] - offset[:-1] - length[1:], np.inf)
+        leader_speed[:-1] = np.where(same_lane, speed[1:], 0.0)
+
+        # The front vehicle of a lane follows the rearmost vehicle on its next lane
+        rearmost = np.flatnonzero(np.concatenate(([True], ~same_lane)))
+        rear_offset = np.full(len(network), np.inf)
+        rear_length = np.zeros(len(network))
+        rear_speed = np.zeros(len(network))
+        rear_offset[lane[rearmost]] = offset[rearmost]
+        rear_length[lane[rearmost]] = length[rearmost]
+        rear_speed[lane[rearmost]] = speed[rearmost]
+        front = np.flatnonzero(np.concatenate((~same_lane, [True])))
+        next_lane = self.route_lanes[self.route[front], self.route_position[front] + 1]
+        front, next_lane = front[next_lane >= 0], next_lane[next_lane >= 0]
+        gap[front] = (network.lane_length[lane[front]] - offset[front]
+                      + rear_offset[next_lane] - rear_length[next_lane])
+        leader_speed[front] = rear_speed[next_lane]
+
+        accel = self.type_accel[vehicle_type]
+        decel = self.type_decel[vehicle_type]
+        desired_speed = np.minimum(self.type_max_speed[vehicle_type], network.lane_speed[lane]) * self.speed_factor
+        desired_gap = self.type_min_gap[vehicle_type] + np.maximum(
+            0.0, speed * self.type_headway[vehicle_type] + speed * (speed - leader_speed) / (2 * np.sqrt(accel * decel))
+        )
+        interaction = np.where(np.isfinite(gap), (desired_gap / np.maximum(gap, 0.01)) ** 2, 0.0)
+        acceleration = accel * (1 - (speed / desired_speed) ** ACCEL_EXPONENT - interaction)
+        acceleration = np.maximum(acceleration, -MAX_BRAKING)
+
+        new_speed = np.maximum(speed + acceleration * dt, 0.0)
+        advance = 0.5 * (speed + new_speed) * dt
+        # Never move past the rear of the leader
+        room = np.maximum(gap, 0.0)
+        blocked = advance > room
+        advance[blocked] = room[blocked]
+        new_speed[blocked] = np.minimum(new_speed[blocked], advance[blocked] / dt)
+        offset += advance
+        self.speed = new_speed
+
+        # Continue onto the next lane of the route, or leave the network
+        crossed = np.flatnonzero(offset >= network.lane_length[lane])
+        arrived = crossed[:0]
+        if len(crossed):
+            offset[crossed] -= network.lane_length[lane[crossed]]
+            self.route_position[crossed] += 1
+            following = self.route_lanes[self.route[crossed], self.route_position[crossed]]
+            lane[crossed[following >= 0]] = following[following >= 0]
+            arrived = crossed[following < 0]
+
+        # Only previous rearmost vehicles and lane changers can now be last on a lane
+        candidates = np.concatenate((rearmost, crossed))
+        candidates = candidates[~np.isin(candidates, arrived)]
+        np.minimum.at(self._rear_offset, lane[candidates], offset[candidates])
+        if len(arrived):
+            self._remove(arrived)
+
+    def _remove(self, rows):
+        """Drop vehicles that reached the end of their route."""
+        slot_ids = self.vehicles.slot_ids
+        for slot in self.slot[rows].tolist():
+            self.vehicles.remove(slot_ids[slot])
+        keep = np.ones(len(self.lane), dtype=bool)
+        keep[rows] = False
+        for name in STATE_COLUMNS:
+            setattr(self, name, getattr(self, name)[keep])
+        self.arrived += len(rows)
+
+    def _spawn(self, dt):
+        """Queue Poisson arrivals and insert waiting vehicles where there is room."""
+        self._queue_vehicles(self.rng.poisson(self.flow_rate(self.time) * dt / 3600.0))
+
+        waiting = [route for route, queue in enumerate(self.pending) if queue]
+        if not waiting:
+            return
+        rear_offset = self._rear_offset
+        max_length = self.type_length.max()
+
+        new_rows = []
+        for route in waiting:
+            first_lane = self.route_lanes[route, 0]
+            vehicle_type = self.pending[route][0]
+            # Depart at standstill when the rear of the lane is clear
+            if rear_offset[first_lane] - max_length < self.type_min_gap[vehicle_type]:
+                continue
+            self.pending[route].popleft()
+            rear_offset[first_lane] = 0.0
+            vehicle_id = f"{self.route_ids[route]}.{self.spawned}"
+            self.spawned += 1
+            new_rows.append((first_lane, vehicle_type, route, self.vehicles.add(vehicle_id)))
+
+        if new_rows:
+            lanes, types, routes, slots = (np.array(column) for column in zip(*new_rows))
+            factors = np.clip(self.rng.normal(1.0, SPEED_FACTOR_DEVIATION, len(new_rows)), 0.8, 1.2)
+            self.lane = np.concatenate((self.lane, lanes.astype(np.int32)))
+            self.offset = np.concatenate((self.offset, np.zeros(len(new_rows))))
+            self.speed = np.concatenate((self.speed, np.zeros(len(new_rows))))
+            self.vehicle_type = np.concatenate((self.vehicle_type, types.astype(np.int32)))
+            self.route = np.concatenate((self.route, routes.astype(np.int32)))
+            self.route_position = np.concatenate((self.route_position, np.zeros(len(new_rows), dtype=np.int32)))
+            self.speed_factor = np.concatenate((self.speed_factor, factors))
+            self.slot = np.concatenate((self.slot, slots.astype(np.int64)))
+
+    def _write(self):
+        """Publish positions and interned attributes to the vehicle store."""
+        self.vehicles.write(
+            self.slot,
+            self.network.positions(self.lane, self.offset),
+            self.speed,
+            self.lane_codes[self.lane],
+            self.edge_codes[self.lane],
+            self.route_codes[self.route],
+            self.type_codes[self.vehicle_type]
+        )
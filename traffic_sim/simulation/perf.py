@@ -0,0 +1,155 @@
+import bisect
+import functools
+import threading
+import time
+
+# Upper bounds in seconds, from sub-millisecond state collection to slow SUMO steps
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+METRIC_HELP = {
+    'traffic_sim_phase_seconds': 'Duration of each phase of a simulation step.',
+    'traffic_sim_frame_seconds': 'Time to render or encode one camera frame.',
+    'traffic_sim_http_request_seconds': 'Latency of HTTP requests by route.'
+}
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in labels)
+
+class Histogram:
+    def __init__(self, buckets):
+        """Count observations into fixed buckets, Prometheus style."""
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last bucket is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        """Return (cumulative bucket counts, sum, count)."""
+        with self._lock:
+            counts = list(self.counts)
+            total, count = self.sum, self.count
+        cumulative = []
+        running = 0
+        for value in counts:
+            running += value
+            cumulative.append(running)
+        return cumulative, total, count
+
+class PerfStats:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """Fixed-bucket duration histograms keyed by metric name and labels."""
+        self.buckets = tuple(sorted(buckets))
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name, **labels):
+        """Return the histogram for a metric and label set, creating it on first use."""
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(key, Histogram(self.buckets))
+        return histogram
+
+    def timed(self, function, name, **labels):
+        """Wrap function so every call is observed in a histogram.
+
+        The histogram is resolved once here, so each call only costs two
+        clock reads and a bucket increment.
+        """
+        histogram = self.histogram(name, **labels)
+        clock = time.perf_counter
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            started = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.observe(clock() - started)
+        return wrapper
+
+    def _sorted_histograms(self):
+        """Return the (key, histogram) pairs sorted by key, copied while no histogram is being added."""
+        with self._lock:
+            items = list(self.histograms.items())
+        return sorted(items, key=lambda item: item[0])
+
+    def as_dict(self):
+        """Return every histogram with its count, mean and bucket counts for /debug/perf."""
+        metrics = {}
+        for (name, labels), histogram in self._sorted_histograms():
+            cumulative, total, count = histogram.snapshot()
+            metrics.setdefault(name, []).append({
+                'labels': dict(labels),
+                'count': count,
+                'sum': total,
+                'mean': total / count if count else 0.0,
+                'buckets': dict(zip([str(bound) for bound in self.buckets] + ['+Inf'], cumulative))
+            })
+        return metrics
+
+    def prometheus_text(self):
+        """Render every histogram in the Prometheus text exposition format."""
+        lines = []
+        previous = None
+        for (name, labels), histogram in self._sorted_histograms():
+            if name != previous:
+                lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+                previous = name
+            cumulative, total, count = histogram.snapshot()
+            prefix = _format_labels(labels)
+            separator = ',' if prefix else ''
+            for bound, value in zip([repr(bound) for bound in self.buckets] + ['+Inf'], cumulative):
+                lines.append(f'{name}_bucket{{{prefix}{separator}le="{bound}"}} {value}')
+            suffix = f'{{{prefix}}}' if prefix else ''
+            lines.append(f"{name}_sum{suffix} {total!r}")
+            lines.append(f"{name}_count{suffix} {count}")
+        return '\n'.join(lines) + '\n'
+
+def logging_stats_text(stats):
+    """Render the logger's queue and per-category sampling counters in the Prometheus text format.
+
+    stats is the dict returned by logger.logging_stats().
+    """
+    if not stats:
+        return ''
+    lines = [
+        "# HELP traffic_sim_log_queued_records Log records waiting for the writer thread.",
+        "# TYPE traffic_sim_log_queued_records gauge",
+        f"traffic_sim_log_queued_records {stats['queued']}",
+        "# HELP traffic_sim_log_dropped_records_total Log records dropped because the queue was full.",
+        "# TYPE traffic_sim_log_dropped_records_total counter",
+        f"traffic_sim_log_dropped_records_total {stats['dropped']}",
+        "# HELP traffic_sim_log_records_total Log records by category and sampling outcome.",
+        "# TYPE traffic_sim_log_records_total counter"
+    ]
+    for category, counters in sorted(stats['categories'].items()):
+        for outcome in ('emitted', 'sampled_out', 'rate_limited'):
+            labels = _format_labels((('category', category), ('outcome', outcome)))
+            lines.append(f"traffic_sim_log_records_total{{{labels}}} {counters[outcome]}")
+    return '\n'.join(lines) + '\n'
+
+def configure_perf(config):
+    """Return PerfStats for the perf config section, or None when it is disabled.
+
+    Callers only wrap their functions when stats exist, so a disabled
+    configuration leaves every code path exactly as it was.
+    """
+    config = config or {}
+    if not config.get('enabled', False):
+        return None
+    return PerfStats(config.get('buckets') or DEFAULT_BUCKETS)
@@ -0,0 +1,108 @@
+import threading
+import time
+
+import numpy as np
+
+from .trajectory import TrajectoryReader
+
+class ReplaySource:
+    def __init__(self, directory, speed=1.0, loop=False):
+        """Play a trajectory recording back step by step.
+
+        speed is a multiple of real time; 0 replays as fast as the consumer
+        can take the steps.
+        """
+        self.reader = TrajectoryReader(directory)
+        if not len(self.reader):
+            raise ValueError(f"Trajectory recording in {directory} has no steps")
+        times = self.reader.index['time']
+        self.start_time = float(times[0])
+        self.end_time = float(times[-1])
+        self.step_time = float(times[1] - times[0]) if len(times) > 1 else 0.0
+        self.speed = speed
+        self.loop = loop
+        self.position = 0
+        self._anchor = None  # (wall clock, simulation time) that pacing is measured from
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.reader)
+
+    def position_of(self, sim_time):
+        """Return the index position of the first step at or after sim_time."""
+        index_times = self.reader.index['time']
+        last = len(index_times) - 1
+        if self.step_time > 0:
+            # Steps are recorded at a fixed interval, so the position is arithmetic
+            position = int(np.ceil((sim_time - self.start_time) / self.step_time - 1e-9))
+            position = min(max(position, 0), last)
+            if abs(index_times[position] - max(sim_time, self.start_time)) < self.step_time / 2:
+                return position
+        # Recordings with gaps fall back to a binary search
+        return min(int(np.searchsorted(index_times, sim_time, side='left')), last)
+
+    def seek(self, sim_time):
+        """Continue playback from the step at sim_time."""
+        with self._lock:
+            self.position = self.position_of(sim_time)
+            self._anchor = None
+
+    def set_speed(self, speed):
+        """Change the playback speed from the current step on."""
+        with self._lock:
+            self.speed = speed
+            self._anchor = None
+
+    def status(self):
+        with self._lock:
+            position = min(self.position, len(self.reader) - 1)
+            return {
+                'time': float(self.reader.index['time'][position]),
+                'start_time': self.start_time,
+                'end_time': self.end_time,
+                'speed': self.speed,
+                'loop': self.loop
+            }
+
+    def next_step(self, stop_event=None):
+        """Wait until the next step is due and return (step, time, columns).
+
+        Returns None at the end of a non-looping recording or when
+        stop_event is set while waiting.
+        """
+        with self._lock:
+            if self.position >= len(self.reader):
+                if not self.loop:
+                    return None
+                self.position = 0
+                self._anchor = None
+            position = self.position
+            self.position += 1
+            sim_time = float(self.reader.index['time'][position])
+            delay = 0.0
+            if self.speed > 0:
+                if self._anchor is None:
+                    self._anchor = (time.monotonic(), sim_time)
+                wall, anchor_time = self._anchor
+                delay = wall + (sim_time - anchor_time) / self.speed - time.monotonic()
+        if delay > 0:
+            if stop_event is not None:
+                if stop_event.wait(delay):
+                    return None
+            else:
+                time.sleep(delay)
+        step = int(self.reader.index['step'][position])
+        return step, sim_time, self.columns(self.reader.entry(position))
+
+    def columns(self, rows):
+        """Convert recorded rows to the per-vehicle columns VehicleStore.update takes."""
+        vehicle_ids = self.reader.vehicle_ids
+        lane_ids = self.reader.lanes
+        ids = [vehicle_ids[code] for code in rows['vehicle'].tolist()]
+        positions = np.column_stack((rows['x'], rows['y'])).astype(float)
+        speeds = rows['speed'].astype(float)
+        lanes = [lane_ids[code] if code >= 0 else '' for code in rows['lane'].tolist()]
+        # SUMO lane ids are <edge>_<index>; routes and types are not recorded
+        edges = [lane.rpartition('_')[0] for lane in lanes]
+        unknown = [''] * len(ids)
+        return ids, positions, speeds, lanes, edges, unknown, unknown
@@ -0,0 +1,140 @@
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from flask import Response
+
+try:
+    import orjson
+except ImportError:  # the standard library encoder is used instead
+    orjson = None
+
+GZIP_ETAG_SUFFIX = '-gz'
+
+def _default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(payload):
+    """Serialize a payload to compact JSON bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, separators=(',', ':'), default=_default).encode('utf-8')
+
+def loads(data):
+    """Parse JSON bytes written by dumps."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def project(payload, fields):
+    """Keep only the given top-level fields of a dict, or of every dict in a list."""
+    if not fields:
+        return payload
+    if isinstance(payload, dict):
+        return {field: payload[field] for field in fields if field in payload}
+    if isinstance(payload, list):
+        return [project(item, fields) for item in payload]
+    return payload
+
+def parse_fields(value):
+    """Turn a ?fields=a,b query value into a sorted tuple of field names."""
+    if not value:
+        return ()
+    return tuple(sorted({field.strip() for field in value.split(',') if field.strip()}))
+
+class CachedPayload:
+    __slots__ = ('version', 'body', 'gzipped', 'etag')
+
+    def __init__(self, version, body, gzipped):
+        self.version = version
+        self.body = body
+        self.gzipped = gzipped
+        # Content-based, so a new step with unchanged data still revalidates
+        self.etag = hashlib.blake2b(body, digest_size=8).hexdigest()
+
+class ResponseCache:
+    def __init__(self, gzip_enabled=True, gzip_min_bytes=1024, gzip_level=6, max_entries=256):
+        """Cache serialized JSON responses per key until a newer snapshot version is published.
+
+        Each entry holds the encoded bytes and, for large enough payloads,
+        a gzipped copy made once at build time, so a cache hit costs a dict
+        lookup. Concurrent misses on the same key build the payload once.
+        """
+        self.gzip_enabled = gzip_enabled
+        self.gzip_min_bytes = gzip_min_bytes
+        self.gzip_level = gzip_level
+        self.max_entries = max_entries
+        self.hits = 0
+        self.builds = 0
+        self._entries = OrderedDict()  # key -> CachedPayload
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, version, build):
+        """Return the cached payload for key at version, building it on a miss.
+
+        build returns (version, payload) so it can read a newer snapshot
+        than the one looked up; the entry is stored under that version.
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry.version >= version:
+            self.hits += 1
+            return entry
+        with self._lock:
+            key_lock = self._locks.setdefault(key, threading.Lock())
+        with key_lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version >= version:
+                self.hits += 1
+                return entry
+            built_version, payload = build()
+            body = dumps(payload)
+            gzipped = None
+            if self.gzip_enabled and len(body) >= self.gzip_min_bytes:
+                gzipped = gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+            entry = CachedPayload(built_version, body, gzipped)
+            self.builds += 1
+            with self._lock:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    stale, _ = self._entries.popitem(last=False)
+                    self._locks.pop(stale, None)
+            return entry
+
+    def respond(self, request, key, version, build):
+        """Return a Flask response for a cached payload, honouring ETags and gzip.
+
+        ?fields=a,b projects the payload before it is cached, so each
+        projection is serialized once per version as well.
+        """
+        fields = parse_fields(request.args.get('fields'))
+
+        def build_projected():
+            built_version, payload = build()
+            return built_version, project(payload, fields)
+
+        entry = self.get((key, fields), version, build_projected)
+        send_gzip = entry.gzipped is not None and 'gzip' in request.accept_encodings
+        # The gzipped bytes differ from the identity body, so they get their own strong tag;
+        # either tag still names this payload when a client revalidates
+        etag = entry.etag + GZIP_ETAG_SUFFIX if send_gzip else entry.etag
+        if any(request.if_none_match.contains(tag) for tag in (entry.etag, entry.etag + GZIP_ETAG_SUFFIX)):
+            response = Response(status=304)
+        elif send_gzip:
+            response = Response(entry.gzipped, mimetype='application/json')
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = Response(entry.body, mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        response.vary.add('Accept-Encoding')
+        return response
@@ -0,0 +1,358 @@
+import hashlib
+import logging
+import os
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+# Bump when the compiled arrays change so stale caches are ignored
+CACHE_VERSION = 1
+
+def _parse_shape(shape):
+    return [tuple(float(value) for value in point.split(',')[:2]) for point in shape.split()]
+
+def _csr(rows, values, size):
+    """Group values by row into (starts, flat) with starts of length size + 1."""
+    rows = np.asarray(rows, dtype=np.int64)
+    values = np.asarray(values, dtype=np.int64)
+    order = np.lexsort((values, rows))
+    starts = np.searchsorted(rows[order], np.arange(size + 1))
+    return starts.astype(np.int64), values[order]
+
+class RoadNetwork:
+    # Arrays written to and restored from the compiled cache
+    ARRAYS = ('lane_length', 'lane_speed', 'lane_edge', 'shape_offset', 'shape_scale', 'straight',
+              'origin', 'direction', 'shape_points', 'shape_distance', 'shape_lane',
+              'lane_successor_starts', 'lane_successors', 'edge_successor_starts', 'edge_successors',
+              'edge_from', 'edge_to', 'junction_xy')
+    STRINGS = ('lane_ids', 'edge_ids', 'junction_ids', 'junction_types')
+
+    def __init__(self, lanes, edges, connections=(), junctions=()):
+        """Build lane lookup tables from parsed lanes.
+
+        lanes is a list of (lane_id, edge_id, length, speed, shape points)
+        and edges maps each edge id to its lane ids in index order. Internal
+        junction lanes are not included. connections are (from lane id, to
+        lane id) pairs and junctions are (junction_id, type, x, y, from edge
+        ids, to edge ids) tuples; both are optional.
+        """
+        self.lane_ids = [lane[0] for lane in lanes]
+        self.edge_ids = list(edges)
+        edge_index = {edge_id: index for index, edge_id in enumerate(self.edge_ids)}
+        self.lane_index = {lane_id: index for index, lane_id in enumerate(self.lane_ids)}
+        self.lane_length = np.array([lane[2] for lane in lanes], dtype=float)
+        self.lane_speed = np.array([lane[3] for lane in lanes], dtype=float)
+        self.lane_edge = np.array([edge_index[lane[1]] for lane in lanes], dtype=np.int64)
+
+        # All lane shapes in one flat table so positions can be interpolated in bulk;
+        # lanes are laid end to end on a shared distance axis
+        points = []
+        distances = []
+        shape_lanes = []
+        self.shape_offset = np.zeros(len(lanes))
+        self.shape_scale = np.ones(len(lanes))
+        self.straight = np.zeros(len(lanes), dtype=bool)
+        self.origin = np.zeros((len(lanes), 2))
+        self.direction = np.zeros((len(lanes), 2))  # displacement per metre of lane length
+        axis = 0.0
+        for index, lane in enumerate(lanes):
+            shape = np.asarray(lane[4], dtype=float)
+            segment = np.hypot(*np.diff(shape, axis=0).T)
+            shape_length = float(segment.sum())
+            self.shape_offset[index] = axis
+            self.straight[index] = len(shape) == 2
+            # SUMO lane lengths can differ from the drawn geometry
+            if lane[2] > 0 and shape_length > 0:
+                self.shape_scale[index] = shape_length / lane[2]
+            if len(shape) == 2 and lane[2] > 0:
+                self.origin[index] = shape[0]
+                self.direction[index] = (shape[1] - shape[0]) / lane[2]
+            points.append(shape)
+            distances.append(axis + np.concatenate(([0.0], np.cumsum(segment))))
+            shape_lanes.append(np.full(len(shape), index, dtype=np.int64))
+            axis += shape_length + 1.0  # gap keeps neighbouring lanes' segments apart
+        self.shape_points = np.concatenate(points) if points else np.zeros((0, 2))
+        self.shape_distance = np.concatenate(distances) if distances else np.zeros(0)
+        self.shape_lane = np.concatenate(shape_lanes) if shape_lanes else np.zeros(0, dtype=np.int64)
+
+        # Lane and edge adjacency as compressed rows: successors of row i are
+        # flat[starts[i]:starts[i + 1]]
+        connections = [(self.lane_index[a], self.lane_index[b]) for a, b in connections
+                       if a in self.lane_index and b in self.lane_index]
+        from_lanes = [a for a, _ in connections]
+        to_lanes = [b for _, b in connections]
+        self.lane_successor_starts, self.lane_successors = _csr(from_lanes, to_lanes, len(self.lane_ids))
+        edge_pairs = sorted({(int(self.lane_edge[a]), int(self.lane_edge[b])) for a, b in connections})
+        self.edge_successor_starts, self.edge_successors = _csr(
+            [a for a, _ in edge_pairs], [b for _, b in edge_pairs], len(self.edge_ids))
+
+        self.junction_ids = [junction[0] for junction in junctions]
+        self.junction_types = [junction[1] for junction in junctions]
+        self.junction_xy = np.array([junction[2:4] for junction in junctions], dtype=float).reshape(-1, 2)
+        self.edge_from = np.full(len(self.edge_ids), -1, dtype=np.int64)
+        self.edge_to = np.full(len(self.edge_ids), -1, dtype=np.int64)
+        for index, junction in enumerate(junctions):
+            for edge_id in junction[4]:
+                if edge_id in edge_index:
+                    self.edge_from[edge_index[edge_id]] = index
+            for edge_id in junction[5]:
+                if edge_id in edge_index:
+                    self.edge_to[edge_index[edge_id]] = index
+        self._derive_lookups()
+
+    def _derive_lookups(self):
+        """Rebuild the dict and list lookups that are not stored in the cache."""
+        self.lane_index = {lane_id: index for index, lane_id in enumerate(self.lane_ids)}
+        self.lane_edges = [self.edge_ids[edge] for edge in self.lane_edge.tolist()]
+        self.edges = {edge_id: [] for edge_id in self.edge_ids}
+        for lane_id, edge_id in zip(self.lane_ids, self.lane_edges):
+            self.edges[edge_id].append(lane_id)
+
+    def __len__(self):
+        return len(self.lane_ids)
+
+    def lane_lengths(self):
+        """Return {lane_id: length} for density metrics."""
+        return dict(zip(self.lane_ids, self.lane_length.tolist()))
+
+    def edge_lane(self, edge_id, index=0):
+        """Return the lane index of an edge's lane."""
+        return self.lane_index[self.edges[edge_id][index]]
+
+    def lane_successors_of(self, lane):
+        """Return the indices of the lanes a lane connects to."""
+        return self.lane_successors[self.lane_successor_starts[lane]:self.lane_successor_starts[lane + 1]]
+
+    def edge_successors_of(self, edge):
+        """Return the indices of the edges an edge connects to."""
+        return self.edge_successors[self.edge_successor_starts[edge]:self.edge_successor_starts[edge + 1]]
+
+    def positions(self, lanes, offsets):
+        """Return the x, y coordinates of positions along lanes as an (n, 2) array."""
+        lanes = np.asarray(lanes)
+        offsets = np.minimum(np.maximum(np.asarray(offsets, dtype=float), 0.0), self.lane_length[lanes])
+        # Straight lanes are a single segment, so the position is linear in the offset
+        positions = self.origin[lanes] + self.direction[lanes] * offsets[:, None]
+        curved = np.flatnonzero(~self.straight[lanes])
+        if len(curved):
+            positions[curved] = self._curved_positions(lanes[curved], offsets[curved])
+        return positions
+
+    def _curved_positions(self, lanes, offsets):
+        """Interpolate positions on lanes whose shape has several segments."""
+        distance = self.shape_offset[lanes] + offsets * self.shape_scale[lanes]
+        segment = np.searchsorted(self.shape_distance, distance, side='right') - 1
+        segment = np.clip(segment, 0, len(self.shape_distance) - 2)
+        start = self.shape_distance[segment]
+        span = self.shape_distance[segment + 1] - start
+        fraction = np.divide(distance - start, span, out=np.zeros_like(distance), where=span > 0)
+        fraction = np.clip(fraction, 0.0, 1.0)[:, None]
+        return self.shape_points[segment] * (1 - fraction) + self.shape_points[segment + 1] * fraction
+
+    def camera_coverage(self, cameras):
+        """Precompute which lane offset ranges each camera's detection circle covers."""
+        return LaneCameraIndex(self, cameras)
+
+    def save(self, path):
+        """Write the compiled arrays to an .npz file."""
+        arrays = {name: getattr(self, name) for name in self.ARRAYS}
+        for name in self.STRINGS:
+            arrays[name] = np.array(getattr(self, name), dtype=str)
+        arrays['cache_version'] = np.array(CACHE_VERSION)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(temporary, path)  # readers never see a half-written cache
+
+    @classmethod
+    def load(cls, path):
+        """Restore a network written by save."""
+        with np.load(path, allow_pickle=False) as data:
+            if int(data['cache_version']) != CACHE_VERSION:
+                raise ValueError(f"Network cache {path} has an old format")
+            network = cls.__new__(cls)
+            for name in cls.ARRAYS:
+                setattr(network, name, data[name])
+            for name in cls.STRINGS:
+                setattr(network, name, data[name].tolist())
+        network._derive_lookups()
+        return network
+
+class LaneCameraIndex:
+    def __init__(self, network, cameras):
+        """Table of (lane, offset range, camera) intervals for a set of cameras.
+
+        Each lane segment is intersected with every detection circle once,
+        so assigning vehicles to cameras becomes a lookup on lane index and
+        lane offset instead of a distance test per camera.
+        """
+        self.camera_ids = list(cameras)
+        self.positions = np.array([cameras[camera_id].position for camera_id in self.camera_ids],
+                                  dtype=float).reshape(-1, 2)
+        lane_parts, start_parts, end_parts, camera_parts = [], [], [], []
+
+        # Segments within one lane; the joins between consecutive lanes are not segments
+        points = network.shape_points
+        segment = np.flatnonzero(network.shape_lane[:-1] == network.shape_lane[1:])
+        a = points[segment]
+        d = points[segment + 1] - a
+        lane = network.shape_lane[segment]
+        seg_start = network.shape_distance[segment] - network.shape_offset[lane]
+        seg_length = network.shape_distance[segment + 1] - network.shape_distance[segment]
+        dd = np.einsum('ij,ij->i', d, d)
+
+        for index, camera_id in enumerate(self.camera_ids):
+            camera = cameras[camera_id]
+            center = self.positions[index]
+            radius = float(camera.detection_radius)
+            # Solve |a + t d - center| = radius for t along each segment
+            f = a - center
+            b = 2 * np.einsum('ij,ij->i', d, f)
+            c = np.einsum('ij,ij->i', f, f) - radius * radius
+            disc = b * b - 4 * dd * c
+            hit = (disc >= 0) & (dd > 0)
+            root = np.sqrt(np.where(hit, disc, 0.0))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                t0 = np.clip((-b - root) / (2 * dd), 0.0, 1.0)
+                t1 = np.clip((-b + root) / (2 * dd), 0.0, 1.0)
+            hit &= t1 > t0
+            # Degenerate segments count when their point is inside the circle
+            hit |= (dd == 0) & (c <= 0)
+            hits = np.flatnonzero(hit)
+            if not len(hits):
+                continue
+            scale = network.shape_scale[lane[hits]]
+            lane_parts.append(lane[hits])
+            start_parts.append((seg_start[hits] + t0[hits] * seg_length[hits]) / scale)
+            end_parts.append((seg_start[hits] + t1[hits] * seg_length[hits]) / scale)
+            camera_parts.append(np.full(len(hits), index, dtype=np.int64))
+
+        if lane_parts:
+            lanes = np.concatenate(lane_parts)
+            starts = np.concatenate(start_parts)
+            ends = np.concatenate(end_parts)
+            camera_idx = np.concatenate(camera_parts)
+            lanes, starts, ends, camera_idx = self._merge(lanes, starts, ends, camera_idx)
+        else:
+            lanes = np.zeros(0, dtype=np.int64)
+            starts = ends = np.zeros(0)
+            camera_idx = np.zeros(0, dtype=np.int64)
+        self.lane = lanes
+        self.start = starts
+        self.end = ends
+        self.camera = camera_idx
+        self.lane_starts = np.searchsorted(lanes, np.arange(len(network) + 1))
+
+    @staticmethod
+    def _merge(lanes, starts, ends, cameras):
+        """Join the touching intervals of consecutive segments of a lane and camera."""
+        order = np.lexsort((starts, cameras, lanes))
+        lanes, starts, ends, cameras = lanes[order], starts[order], ends[order], cameras[order]
+        merged = []
+        for lane, start, end, camera in zip(lanes.tolist(), starts.tolist(), ends.tolist(), cameras.tolist()):
+            if merged and merged[-1][0] == lane and merged[-1][3] == camera and start <= merged[-1][2] + 1e-6:
+                merged[-1][2] = max(merged[-1][2], end)
+            else:
+                merged.append([lane, start, end, camera])
+        merged.sort(key=lambda interval: (interval[0], interval[1]))
+        table = np.array(merged, dtype=float).reshape(-1, 4)
+        return table[:, 0].astype(np.int64), table[:, 1], table[:, 2], table[:, 3].astype(np.int64)
+
+    def lookup(self, lanes, offsets):
+        """Return (query indices, camera indices) of every camera covering each lane position."""
+        lanes = np.asarray(lanes, dtype=np.int64)
+        offsets = np.asarray(offsets, dtype=float)
+        counts = self.lane_starts[lanes + 1] - self.lane_starts[lanes]
+        query = np.repeat(np.arange(len(lanes)), counts)
+        interval = np.arange(len(query)) + np.repeat(self.lane_starts[lanes] - (np.cumsum(counts) - counts), counts)
+        inside = (self.start[interval] <= offsets[query]) & (offsets[query] <= self.end[interval])
+        return query[inside], self.camera[interval[inside]]
+
+    def detect(self, lanes, offsets, slots, positions):
+        """Find the vehicles on covered lane ranges, in the DetectionEngine.detect format.
+
+        lanes, offsets and slots describe each vehicle; positions are the
+        vehicle store coordinates indexed by slot, used for the distances.
+        """
+        query, camera_idx = self.lookup(lanes, offsets)
+        vehicle_slots = np.asarray(slots)[query]
+        order = np.lexsort((vehicle_slots, camera_idx))
+        camera_idx = camera_idx[order]
+        vehicle_slots = vehicle_slots[order]
+        distances = np.hypot(*(positions[vehicle_slots] - self.positions[camera_idx]).T)
+        bounds = np.searchsorted(camera_idx, np.arange(len(self.camera_ids) + 1))
+        return {
+            camera_id: (vehicle_slots[bounds[cam]:bounds[cam + 1]], distances[bounds[cam]:bounds[cam + 1]])
+            for cam, camera_id in enumerate(self.camera_ids)
+        }
+
+def parse_network(net_file):
+    """Parse the normal (non-internal) lanes, connections and junctions of a SUMO .net.xml file."""
+    lanes = []
+    edges = {}
+    connections = []
+    junctions = []
+    edge_ends = {}
+    for element in ET.parse(net_file).getroot():
+        if element.tag == 'edge':
+            if element.get('function') == 'internal':
+                continue
+            lane_ids = []
+            for lane in element.iter('lane'):
+                lanes.append((
+                    lane.get('id'),
+                    element.get('id'),
+                    float(lane.get('length')),
+                    float(lane.get('speed')),
+                    _parse_shape(lane.get('shape'))
+                ))
+                lane_ids.append(lane.get('id'))
+            edges[element.get('id')] = lane_ids
+            edge_ends[element.get('id')] = (element.get('from'), element.get('to'))
+        elif element.tag == 'connection':
+            source, target = element.get('from'), element.get('to')
+            if source.startswith(':') or target.startswith(':'):
+                continue
+            connections.append((f"{source}_{element.get('fromLane')}", f"{target}_{element.get('toLane')}"))
+        elif element.tag == 'junction' and element.get('type') != 'internal':
+            junctions.append([element.get('id'), element.get('type'),
+                              float(element.get('x')), float(element.get('y')), [], []])
+    junction_index = {junction[0]: junction for junction in junctions}
+    for edge_id, (source, target) in edge_ends.items():
+        if source in junction_index:
+            junction_index[source][4].append(edge_id)
+        if target in junction_index:
+            junction_index[target][5].append(edge_id)
+    return RoadNetwork(lanes, edges, connections, [tuple(junction) for junction in junctions])
+
+def load_network(net_file, cache_directory=None):
+    """Load a SUMO .net.xml file, through a compiled cache keyed by its hash when a directory is given."""
+    if not cache_directory:
+        return parse_network(net_file)
+    logger = logging.getLogger('traffic_simulation')
+    digest = hashlib.sha1()
+    with open(net_file, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    name = os.path.basename(net_file).split('.')[0]
+    cache_path = os.path.join(cache_directory, f"{name}.{digest.hexdigest()[:16]}.v{CACHE_VERSION}.npz")
+    if os.path.exists(cache_path):
+        try:
+            return RoadNetwork.load(cache_path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Error reading network cache {cache_path}: {str(e)}")
+    network = parse_network(net_file)
+    try:
+        os.makedirs(cache_directory, exist_ok=True)
+        network.save(cache_path)
+    except OSError as e:
+        logger.error(f"Error writing network cache {cache_path}: {str(e)}")
+    return network
+
+def load_routes(route_file):
+    """Parse the vehicle types and named routes of a SUMO .rou.xml file."""
+    root = ET.parse(route_file).getroot()
+    vehicle_types = {vtype.get('id'): dict(vtype.attrib) for vtype in root.iter('vType')}
+    routes = {route.get('id'): route.get('edges').split()
+              for route in root.iter('route') if route.get('id') and route.get('edges')}
+    return vehicle_types, routes
@@ -0,0 +1,26 @@
+class ObservationScheduler:
+    def __init__(self, step_time, periods):
+        """Schedule observers at their own periods on the simulation step grid.
+
+        periods maps observer names to a period in simulation seconds. Periods
+        are rounded to whole steps and observers run when the absolute step
+        number (simulation time / step_time) is a multiple of their period,
+        so observations line up with simulation time regardless of where a
+        run begins.
+        """
+        self.step_time = step_time
+        self.periods = {
+            name: max(1, int(round(period / step_time))) for name, period in periods.items()
+        }
+
+    def step_at(self, sim_time):
+        """Return the absolute step number of a simulation time."""
+        return int(round(sim_time / self.step_time))
+
+    def next_step(self, step):
+        """Return the first step after step at which any observer is due."""
+        return min((step // period + 1) * period for period in self.periods.values())
+
+    def due(self, step):
+        """Return the names of the observers due at a step."""
+        return {name for name, period in self.periods.items() if step % period == 0}
@@ -0,0 +1,215 @@
+import logging
+import struct
+import threading
+import time
+from multiprocessing import shared_memory
+
+from .response_cache import dumps, loads
+
+# sequence, version, step, time, index length, sections length
+HEADER = struct.Struct('<QQqdQQ')
+SEQUENCE = struct.Struct('<Q')
+BODY_OFFSET = 64
+
+def encode_sections(snapshot):
+    """Serialize the parts of a snapshot HTTP workers serve, keyed by section name."""
+    sections = {
+        'metrics': dumps(snapshot.metrics),
+        'detections': dumps(snapshot.detections())
+    }
+    for camera_id in snapshot.camera_hits:
+        sections[f'camera/{camera_id}'] = dumps(snapshot.camera_data(camera_id))
+    return sections
+
+class SharedSnapshotWriter:
+    def __init__(self, size, name=None):
+        """Create a shared memory region that published snapshots are copied into.
+
+        The region starts with a sequence-lock header: the sequence number is
+        odd while a snapshot is being written, so readers in other processes
+        retry until they copy a body whose sequence did not change under them.
+        Only one thread may write.
+        """
+        self.memory = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.name = self.memory.name
+        self.sequence = 0
+        self.version = 0
+        self.writes = 0
+        self.skipped = 0
+        self.logger = logging.getLogger('traffic_simulation')
+        HEADER.pack_into(self.memory.buf, 0, 0, 0, 0, 0.0, 0, 0)
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def capacity(self):
+        return self.memory.size - BODY_OFFSET
+
+    def write(self, version, step, sim_time, sections):
+        """Copy serialized sections into the region under the sequence lock."""
+        index = {}
+        offset = 0
+        for name, data in sections.items():
+            index[name] = (offset, len(data))
+            offset += len(data)
+        index_bytes = dumps(index)
+        if len(index_bytes) + offset > self.capacity:
+            self.skipped += 1
+            self.logger.error(f"Snapshot {version} needs {len(index_bytes) + offset} bytes, "
+                              f"shared memory holds {self.capacity}; keeping the previous one")
+            return False
+
+        buffer = self.memory.buf
+        self.sequence += 1
+        SEQUENCE.pack_into(buffer, 0, self.sequence)
+        position = BODY_OFFSET
+        buffer[position:position + len(index_bytes)] = index_bytes
+        position += len(index_bytes)
+        for data in sections.values():
+            buffer[position:position + len(data)] = data
+            position += len(data)
+        HEADER.pack_into(buffer, 0, self.sequence, version, step, sim_time, len(index_bytes), offset)
+        self.sequence += 1
+        SEQUENCE.pack_into(buffer, 0, self.sequence)
+        self.version = version
+        self.writes += 1
+        return True
+
+    def start(self, sim_controller):
+        """Copy every snapshot the controller publishes on a background thread."""
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, args=(sim_controller,),
+                                        name='shared-snapshot-writer', daemon=True)
+        self._thread.start()
+
+    def _run(self, sim_controller):
+        version = self.version
+        while not self._stopped.is_set():
+            snapshot = sim_controller.wait_for_snapshot(version, timeout=0.5)
+            if snapshot.version == version:
+                continue
+            try:
+                sections = encode_sections(snapshot)
+                # A reused buffer means a newer snapshot exists; write that one next
+                if snapshot.is_valid():
+                    self.write(snapshot.version, snapshot.step, snapshot.time, sections)
+                    version = snapshot.version
+            except Exception as e:
+                self.logger.error(f"Error writing snapshot {snapshot.version} to shared memory: {str(e)}")
+                version = snapshot.version
+
+    def close(self):
+        """Stop the writer thread and remove the shared memory region."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.memory.close()
+        try:
+            self.memory.unlink()
+        except FileNotFoundError:
+            pass
+
+class SharedSnapshot:
+    __slots__ = ('version', 'step', 'time', '_index', '_sections', '_metrics')
+
+    def __init__(self, version, step, sim_time, body, index_length):
+        """Wrap one consistent copy of the shared region's body."""
+        self.version = version
+        self.step = step
+        self.time = sim_time
+        self._index = loads(body[:index_length]) if index_length else {}
+        self._sections = memoryview(body)[index_length:]
+        self._metrics = None
+
+    def section(self, name):
+        """Return the serialized JSON bytes of a section, or None if it is missing."""
+        entry = self._index.get(name)
+        if entry is None:
+            return None
+        offset, length = entry
+        return self._sections[offset:offset + length].tobytes()
+
+    @property
+    def metrics(self):
+        if self._metrics is None:
+            data = self.section('metrics')
+            self._metrics = loads(data) if data is not None else {}
+        return self._metrics
+
+    def detections(self):
+        """Return the detected vehicle ids of every camera."""
+        data = self.section('detections')
+        return loads(data) if data is not None else {}
+
+    def camera_data(self, camera_id):
+        """Return the detections of a camera in the Camera.get_vehicle_data format."""
+        data = self.section(f'camera/{camera_id}')
+        return loads(data) if data is not None else []
+
+    def is_valid(self):
+        # The body is a private copy, so it never changes under the reader
+        return True
+
+class SharedSnapshotReader:
+    def __init__(self, buffer):
+        """Read snapshots from a shared region written by SharedSnapshotWriter.
+
+        buffer is the region's memory, e.g. the SharedMemory.buf inherited by
+        a forked worker; it is only ever read. The last snapshot is kept, so
+        polling an unchanged region costs one 8-byte read.
+        """
+        self.buffer = memoryview(buffer).toreadonly()
+        self.retries = 0
+        self._sequence = None
+        self._snapshot = SharedSnapshot(0, 0, 0.0, b'', 0)
+
+    def latest(self):
+        """Return the most recently written snapshot."""
+        while True:
+            sequence = SEQUENCE.unpack_from(self.buffer, 0)[0]
+            if sequence == self._sequence:
+                return self._snapshot
+            if sequence & 1:
+                self.retries += 1
+                time.sleep(0)  # the writer is mid-copy; let it finish
+                continue
+            _, version, step, sim_time, index_length, sections_length = HEADER.unpack_from(self.buffer, 0)
+            end = min(BODY_OFFSET + index_length + sections_length, len(self.buffer))
+            body = self.buffer[BODY_OFFSET:end].tobytes()
+            if SEQUENCE.unpack_from(self.buffer, 0)[0] != sequence:
+                self.retries += 1
+                continue
+            if version:
+                self._snapshot = SharedSnapshot(version, step, sim_time, body, index_length)
+            self._sequence = sequence
+            return self._snapshot
+
+class SharedSimulation:
+    def __init__(self, reader, poll_interval=0.02):
+        """Present a shared snapshot region with the controller's read-only snapshot API.
+
+        Lets the snapshot routes, video streams and metrics stream run in
+        HTTP worker processes that have no simulation of their own.
+        """
+        self.reader = reader
+        self.poll_interval = poll_interval
+        self.perf = None
+
+    def latest_snapshot(self):
+        return self.reader.latest()
+
+    def read_snapshot(self, reader):
+        return reader(self.reader.latest())
+
+    def wait_for_snapshot(self, version, timeout=None):
+        """Poll until a snapshot newer than version is written, then return the latest."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        snapshot = self.reader.latest()
+        while snapshot.version == version and (deadline is None or time.monotonic() < deadline):
+            time.sleep(self.poll_interval)
+            snapshot = self.reader.latest()
+        return snapshot
+
+    def get_traffic_metrics(self):
+        return self.reader.latest().metrics
@@ -1,17 +1,101 @@
 import os
+import shutil
 import sys
+import threading
+import xml.etree.ElementTree as ET
+import numpy as np
 import traci
+import traci.constants as tc
 import yaml
-from .logger import setup_logger, log_vehicle_movement, log_camera_detection
+from .logger import (configure_logging, category_enabled, log_vehicle_movements, log_camera_detection,
+                     log_camera_zone_events)
 from .camera import Camera
+from .detection import DetectionEngine
+from .spatial_index import CameraGrid
+from .vehicle_store import VehicleStore
+from .snapshot import SnapshotPublisher
+from .metrics import MetricsAggregator
+from .metrics_history import MetricsHistory
+from .trajectory import TrajectoryRecorder, new_recording_directory
+from .replay import ReplaySource
+from .microsim import MicroSimulation
+from .road_network import load_network
+from .scheduler import ObservationScheduler
+from traffic_sim.ml.inference import PredictionService
+from .perf import configure_perf
+
+NET_FILE = "traffic_sim/simulation/network/intersection.net.xml"
+ROUTE_FILE = "traffic_sim/simulation/network/routes.rou.xml"
+
+# Vehicle variables delivered with every simulation step in subscription mode
+VEHICLE_SUBSCRIPTION_VARS = (
+    tc.VAR_POSITION,
+    tc.VAR_SPEED,
+    tc.VAR_LANE_ID,
+    tc.VAR_LANEPOSITION,
+    tc.VAR_ROAD_ID,
+    tc.VAR_ROUTE_ID,
+    tc.VAR_TYPE
+)
+
+# Simulation variables used to keep the vehicle subscriptions up to date
+SIMULATION_SUBSCRIPTION_VARS = (
+    tc.VAR_TIME,
+    tc.VAR_DEPARTED_VEHICLES_IDS
+)
+
+def apply_config_overrides(config, overrides):
+    """Set dotted keys such as 'simulation.step_time' in a nested config dict."""
+    for key, value in overrides.items():
+        section = config
+        *parents, name = key.split('.')
+        for parent in parents:
+            section = section.setdefault(parent, {})
+        section[name] = value
 
 class SimulationController:
-    def __init__(self, config_path):
-        """Initialize the simulation controller."""
+    def __init__(self, config_path, label='default', config_overrides=None):
+        """Initialize the simulation controller.
+
+        label names the TraCI connection this controller starts, so several
+        controllers can drive their own SUMO instances.
+        """
+        self.config_path = config_path
         self.load_config(config_path)
+        if config_overrides:
+            apply_config_overrides(self.config, config_overrides)
+        self.label = label
+        self.connection = traci  # the active default connection until start_simulation
         self.cameras = self._initialize_cameras()
-        self.vehicle_data = {}
-        self.logger = setup_logger()  # Initialize logger
+        self.detection_engine = DetectionEngine(self.cameras, self.camera_index)
+        self.vehicles = VehicleStore()
+        self.collection_mode = self.config['simulation'].get('state_collection', 'subscription')
+        self.backend = self.config['simulation'].get('backend', 'sumo')
+        self.active_backend = None  # the backend start_simulation actually ran, after any fallback
+        self._subscriptions_active = False
+        self.current_step = 0
+        self.metrics = MetricsAggregator(self.cameras)
+        history_config = self.config.get('metrics', {}).get('history', {})
+        self.metrics_history = MetricsHistory(
+            step_time=self.config['simulation']['step_time'],
+            step_capacity=history_config.get('step_capacity', 36000),
+            duration=history_config.get('duration', 86400)
+        )
+        self.snapshots = SnapshotPublisher()
+        self.recorder = None
+        self.scheduler = self._initialize_scheduler()
+        self._stop_event = threading.Event()
+        self._engine_thread = None
+        self.logger = configure_logging(self.config.get('logging'))  # Initialize logger
+        self.network = self._load_network()
+        self.camera_coverage = self.network.camera_coverage(self.cameras) if self.network is not None else None
+        self.lane_positions = None  # returns (lanes, offsets, slots) when the backend tracks them
+        self._lane_state = ((), (), ())  # vehicle ids, SUMO lane ids and lane positions of the last update
+        self.predictions = self._initialize_predictions()
+        self.replay = self._open_replay() if self.backend == 'replay' else None
+        self.perf = configure_perf(self.config.get('perf'))
+        self._instrument_phases()
+        self._publish_snapshot(0.0)
         self.logger.info("Simulation Controller initialized with config: %s", self.config)
         
     def load_config(self, config_path):
@@ -20,7 +104,7 @@ class SimulationController:
             self.config = yaml.safe_load(f)
         
     def _initialize_cameras(self):
-        """Initialize camera objects based on configuration."""
+        """Initialize camera objects and their spatial index based on configuration."""
         cameras = {}
         for cam_config in self.config['cameras']['positions']:
             cameras[cam_config['id']] = Camera(
@@ -28,102 +112,497 @@ class SimulationController:
                 position=cam_config['location'],
                 detection_radius=cam_config['detection_radius']
             )
+
+        # Default to cells twice the largest radius so most cameras span few cells
+        cell_size = self.config['cameras'].get('grid_cell_size')
+        if not cell_size:
+            cell_size = 2 * max((camera.detection_radius for camera in cameras.values()), default=50)
+        self.camera_index = CameraGrid(cell_size)
+        for camera in cameras.values():
+            self.camera_index.add_camera(camera.id, camera.position, camera.detection_radius)
         return cameras
 
-    def start_simulation(self):
-        """Start the SUMO simulation with TraCI."""
-        # Force non-GUI mode for web environment
-        os.environ['SUMO_HOME'] = '/usr'  # Set SUMO_HOME
+    def _initialize_scheduler(self):
+        """Read each observer's period, defaulting to every simulation step."""
+        step_time = self.config['simulation']['step_time']
+        observation = self.config['simulation'].get('observation', {})
+        return ObservationScheduler(step_time, {
+            'vehicle_state': observation.get('vehicle_state', step_time),
+            'camera_detection': self.config['cameras'].get('update_frequency', step_time),
+            'metrics': observation.get('metrics', step_time),
+            'logging': observation.get('logging', 1.0)
+        })
+
+    def _timed(self, function, phase):
+        """Return function, timed as a step phase when perf stats are enabled."""
+        if self.perf is None:
+            return function
+        return self.perf.timed(function, 'traffic_sim_phase_seconds', phase=phase)
+
+    def _instrument_phases(self):
+        """Time the observers of each step; with perf disabled nothing is wrapped."""
+        if self.perf is None:
+            return
+        self._update_vehicle_data = self._timed(self._update_vehicle_data, 'vehicle_state')
+        self._update_camera_detections = self._timed(self._update_camera_detections, 'camera_detection')
+        self._publish_snapshot = self._timed(self._publish_snapshot, 'metrics')
+        self._record_step = self._timed(self._record_step, 'recording')
+        self._log_step = self._timed(self._log_step, 'logging')
+
+    def _initialize_predictions(self):
+        """Set up congestion prediction if ml_config.yaml next to the config enables it."""
+        ml_config_path = os.path.join(os.path.dirname(self.config_path), 'ml_config.yaml')
+        try:
+            with open(ml_config_path, 'r') as f:
+                ml_config = (yaml.safe_load(f) or {}).get('ml', {})
+        except OSError:
+            return None
+        if not ml_config.get('inference', {}).get('enabled', False):
+            return None
+        return PredictionService(ml_config)
+
+    def _load_network(self):
+        """Load the road network model, through its compiled cache, and take lane lengths from it."""
+        try:
+            network = load_network(NET_FILE, self.config.get('network', {}).get('cache_directory'))
+        except (OSError, ValueError, ET.ParseError) as e:
+            self.logger.error(f"Error loading road network: {str(e)}")
+            return None
+        self.metrics.set_lane_lengths(network.lane_lengths())
+        return network
+
+    def add_camera(self, camera_id, location, detection_radius):
+        """Add or replace a camera while the simulation is running."""
+        camera = Camera(camera_id=camera_id, position=location, detection_radius=detection_radius)
+        # Copy on write so the simulation thread never sees the dict change mid-iteration
+        self.cameras = {**self.cameras, camera_id: camera}
+        self.camera_index.add_camera(camera_id, location, detection_radius)
+        self.detection_engine.set_cameras(self.cameras)
+        if self.network is not None:
+            self.camera_coverage = self.network.camera_coverage(self.cameras)
+        self.logger.info(f"Camera {camera_id} added at {location} with radius {detection_radius}")
+        return camera
+
+    def remove_camera(self, camera_id):
+        """Remove a camera while the simulation is running."""
+        if camera_id not in self.cameras:
+            return False
+        self.cameras = {cid: camera for cid, camera in self.cameras.items() if cid != camera_id}
+        self.camera_index.remove_camera(camera_id)
+        self.detection_engine.set_cameras(self.cameras)
+        if self.network is not None:
+            self.camera_coverage = self.network.camera_coverage(self.cameras)
+        self.logger.info(f"Camera {camera_id} removed")
+        return True
+
+    def build_sumo_command(self):
+        """Build the SUMO command line for the configured network."""
+        simulation = self.config['simulation']
         sumo_cmd = [
             'sumo',  # Always use non-GUI version
-            "-n", "traffic_sim/simulation/network/intersection.net.xml",
-            "-r", "traffic_sim/simulation/network/routes.rou.xml",
-            "--step-length", str(self.config['simulation']['step_time']),
+            "-n", NET_FILE,
+            "-r", ROUTE_FILE,
+            "--step-length", str(simulation['step_time']),
             "--start",
             "--quit-on-end"
         ]
+        # Optional demand multiplier, start time and random seed
+        if 'scale' in simulation:
+            sumo_cmd += ["--scale", str(simulation['scale'])]
+        if 'begin' in simulation:
+            sumo_cmd += ["--begin", str(simulation['begin'])]
+        if 'seed' in simulation:
+            sumo_cmd += ["--seed", str(simulation['seed'])]
+        return sumo_cmd
+
+    def start_simulation(self):
+        """Start the SUMO simulation with TraCI."""
+        if self.backend == 'replay':
+            self._run_replay()
+            return
+        if self.backend == 'microsim':
+            self._run_microsim()
+            return
+
+        # Force non-GUI mode for web environment
+        os.environ['SUMO_HOME'] = '/usr'  # Set SUMO_HOME
+        sumo_cmd = self.build_sumo_command()
         
         try:
             # Check if network files exist
-            net_file = "traffic_sim/simulation/network/intersection.net.xml"
-            route_file = "traffic_sim/simulation/network/routes.rou.xml"
-            
-            if not os.path.exists(net_file) or not os.path.exists(route_file):
+            if not os.path.exists(NET_FILE) or not os.path.exists(ROUTE_FILE):
                 self.logger.error("Network or route file not found")
                 self.logger.info("Running in simulation-only mode")
                 return
 
             # Check if SUMO is installed
             from subprocess import run, PIPE
-            result = run(['sumo', '--version'], stdout=PIPE, stderr=PIPE)
-            if result.returncode != 0:
+            if shutil.which('sumo') is None or run(['sumo', '--version'], stdout=PIPE, stderr=PIPE).returncode != 0:
                 self.logger.error("SUMO is not installed or not in PATH")
-                self.logger.info("Running in simulation-only mode")
+                self.logger.info("Running the built-in microsimulation instead")
+                self._run_microsim()
                 return
 
-            # Start SUMO with default port
-            traci.start(sumo_cmd)
+            # Start SUMO on a free port under this controller's connection label
+            traci.start(sumo_cmd, label=self.label)
+            self.connection = traci.getConnection(self.label)
+            self.active_backend = 'sumo'
             self.logger.info("Simulation started successfully with SUMO.")
+            self._load_lane_lengths()
+            self._open_recorder()
+            if self.network is not None and self.collection_mode == 'subscription':
+                self.lane_positions = self._sumo_lane_positions
             
-            # Run simulation steps
-            step = 0
-            while step < self.config['simulation']['max_steps']:
-                traci.simulationStep()
-                current_time = traci.simulation.getTime()
-                
-                # Update vehicle data
-                self._update_vehicle_data()
-                
-                # Update camera detections
-                self._update_camera_detections()
-                
-                # Log data every second
-                if step % 10 == 0:  # Every 1 second (since step_time is 0.1)
-                    for vehicle_id in self.vehicle_data:
-                        position = self.vehicle_data[vehicle_id]['position']
-                        speed = self.vehicle_data[vehicle_id]['speed']
-                        lane = self.vehicle_data[vehicle_id]['lane']
-                        log_vehicle_movement(vehicle_id, position, speed, lane, current_time)
-
-                    for camera_id, camera in self.cameras.items():
-                        detected_vehicles = camera.get_vehicle_data()
-                        log_camera_detection(camera_id, detected_vehicles, current_time)
-                
-                step += 1
+            # Run simulation steps, letting SUMO run unobserved up to the next due observer
+            step_time = self.config['simulation']['step_time']
+            first_step = self.scheduler.step_at(self.connection.simulation.getTime())
+            last_step = first_step + self.config['simulation']['max_steps']
+            step = first_step
+            advance = self._timed(self.connection.simulationStep, 'simulation_step')
+            while step < last_step and not self._stop_event.is_set():
+                target = min(self.scheduler.next_step(step), last_step)
+                advance(target * step_time)
+                current_time = self._get_simulation_time()
+                skipped = self.scheduler.step_at(current_time) - step > 1
+                step = self.scheduler.step_at(current_time)
+                self.current_step = step - first_step
+                self._observe(self.scheduler.due(step) or {'vehicle_state'}, current_time,
+                              lambda: self._update_vehicle_data(skipped))
         except Exception as e:
             self.logger.error("Failed to start SUMO: %s", str(e))
             self.logger.info("Running in simulation-only mode")
+        finally:
+            self._close_recorder()
+            self.lane_positions = None
+
+    def _sumo_lane_positions(self):
+        """Return (lanes, offsets, slots) of the last subscribed vehicle update.
+
+        SUMO lane ids are mapped to network lane indices; lanes the network
+        model leaves out, such as internal junction lanes, map to -1.
+        """
+        vehicle_ids, lane_ids, offsets = self._lane_state
+        lane_index = self.network.lane_index
+        slots = self.vehicles.slots
+        return (
+            np.array([lane_index.get(lane_id, -1) for lane_id in lane_ids], dtype=np.int64),
+            np.asarray(offsets, dtype=float),
+            np.array([slots[vehicle_id] for vehicle_id in vehicle_ids], dtype=np.int64)
+        )
+
+    def _run_microsim(self):
+        """Run the built-in vectorized car-following simulation instead of SUMO."""
+        try:
+            engine = MicroSimulation.from_config(self.config, NET_FILE, ROUTE_FILE, self.vehicles,
+                                                 network=self.network)
+        except (OSError, ValueError, KeyError) as e:
+            self.logger.error(f"Error building the microsimulation: {str(e)}")
+            return
+        self.metrics.set_lane_lengths(engine.network.lane_lengths())
+        self._open_recorder()
+        self.active_backend = 'microsim'
+        self.logger.info("Simulation started with the built-in microsimulation.")
+        if engine.network is self.network:
+            self.lane_positions = lambda: (engine.lane, engine.offset, engine.slot)
+        try:
+            advance = self._timed(engine.step, 'simulation_step')
+            step = 0
+            while step < self.config['simulation']['max_steps'] and not self._stop_event.is_set():
+                # The model itself must advance every step; observers run when due
+                due = self.scheduler.due(self.scheduler.step_at(engine.time + engine.step_time))
+                current_time = advance(write=bool(due))
+                step += 1
+                self.current_step = step
+                if due:
+                    self._observe(due, current_time, None)
+        finally:
+            self._close_recorder()
+            self.lane_positions = None
+
+    def _observe(self, due, current_time, update_vehicles):
+        """Run the observers due at the current time and publish what they saw.
+
+        update_vehicles refreshes the vehicle store; it runs before any
+        observer since they all read vehicle state.
+        """
+        if update_vehicles is not None:
+            update_vehicles()
+        if 'camera_detection' in due:
+            self._update_camera_detections(current_time)
+        self._publish_snapshot(current_time, update_metrics='metrics' in due)
+        self._record_step(current_time)
+        if 'logging' in due:
+            self._log_step(current_time)
+
+    def _log_step(self, current_time):
+        """Log sampled vehicle movements and camera detections."""
+        vehicles = self.vehicles.view()
+        log_vehicle_movements(vehicles, current_time)
+
+        if category_enabled('camera'):
+            for camera_id, camera in self.cameras.items():
+                log_camera_detection(camera_id, camera.detected_ids(), current_time)
 
     def step(self):
         """Execute one simulation step and collect data."""
         self.logger.info("Executing simulation step.")
-        traci.simulationStep()
+        self.connection.simulationStep()
         self._update_vehicle_data()
-        self._update_camera_detections()
-        self.logger.info(f"Updated {len(self.vehicle_data)} vehicles")
+        current_time = self._get_simulation_time()
+        self.current_step += 1
+        self._update_camera_detections(current_time)
+        self._publish_snapshot(current_time)
+        self._record_step(current_time)
+        self.logger.info(f"Updated {len(self.vehicles)} vehicles")
+
+    def start_background(self):
+        """Run start_simulation on a dedicated thread and return immediately."""
+        if self._engine_thread is not None and self._engine_thread.is_alive():
+            return self._engine_thread
+        self._stop_event.clear()
+        self._engine_thread = threading.Thread(
+            target=self.start_simulation, name='simulation-engine', daemon=True
+        )
+        self._engine_thread.start()
+        return self._engine_thread
+
+    def stop(self, timeout=None):
+        """Ask the background simulation thread to finish and wait for it."""
+        self._stop_event.set()
+        if self._engine_thread is not None and self._engine_thread is not threading.current_thread():
+            self._engine_thread.join(timeout)
+
+    def _load_lane_lengths(self):
+        """Read the length of every non-internal lane once for density metrics."""
+        if self.network is not None:
+            return  # already set from the network model
+        try:
+            self.metrics.set_lane_lengths({
+                lane_id: self.connection.lane.getLength(lane_id)
+                for lane_id in self.connection.lane.getIDList() if not lane_id.startswith(':')
+            })
+        except traci.exceptions.TraCIException as e:
+            self.logger.error(f"Error reading lane lengths: {str(e)}")
+
+    def _publish_snapshot(self, current_time, update_metrics=True):
+        """Aggregate metrics and publish the state of the current step for lock-free readers."""
+        try:
+            vehicles = self.vehicles.view()
+            cameras = self.cameras
+            if update_metrics:
+                self.metrics.update(self.current_step, current_time, vehicles, cameras)
+                self.metrics_history.record(self.metrics.current())
+            self.snapshots.publish(self.current_step, current_time, vehicles, cameras, self.get_traffic_metrics())
+        except Exception as e:
+            self.logger.error(f"Error publishing simulation snapshot: {str(e)}")
+
+    def _open_replay(self):
+        """Open the trajectory recording configured for the replay backend."""
+        replay = self.config.get('replay', {})
+        try:
+            return ReplaySource(replay.get('directory', ''), replay.get('speed', 1.0), replay.get('loop', False))
+        except (OSError, ValueError) as e:
+            self.logger.error(f"Error opening replay recording: {str(e)}")
+            return None
+
+    def _run_replay(self):
+        """Feed recorded steps through detection, metrics and snapshots at the replay speed."""
+        if self.replay is None:
+            self.logger.info("No recording to replay")
+            return
+        self.metrics.set_lane_lengths(self.replay.reader.lane_lengths)
+        self.active_backend = 'replay'
+        self.logger.info(f"Replaying {len(self.replay)} recorded steps")
+        while not self._stop_event.is_set():
+            recorded = self.replay.next_step(self._stop_event)
+            if recorded is None:
+                break
+            step, current_time, columns = recorded
+            self.vehicles.update(*columns)
+            self.current_step = step
+            self._update_camera_detections(current_time)
+            self._publish_snapshot(current_time)
+        self.logger.info("Replay finished")
+
+    def seek_replay(self, sim_time):
+        """Jump the replay to a simulation time."""
+        if self.replay is None:
+            raise ValueError("Simulation is not running from a recording")
+        self.replay.seek(sim_time)
+        return self.replay.status()
+
+    def set_replay_speed(self, speed):
+        """Change the replay speed; 0 replays as fast as possible."""
+        if self.replay is None:
+            raise ValueError("Simulation is not running from a recording")
+        if speed < 0:
+            raise ValueError("Replay speed must not be negative")
+        self.replay.set_speed(speed)
+        return self.replay.status()
+
+    def _open_recorder(self):
+        """Start a trajectory recording for this run if enabled in the config."""
+        recording = self.config.get('recording', {})
+        if not recording.get('enabled', False) or self.recorder is not None:
+            return
+        try:
+            directory = new_recording_directory(recording.get('directory', 'recordings'))
+            self.recorder = TrajectoryRecorder(
+                directory, recording.get('steps_per_chunk', 3600), self.metrics.lane_lengths
+            )
+            self.logger.info(f"Recording trajectories to {directory}")
+        except OSError as e:
+            self.logger.error(f"Error starting trajectory recording: {str(e)}")
+
+    def _record_step(self, current_time):
+        """Append the current vehicle columns to the trajectory recording."""
+        if self.recorder is None:
+            return
+        try:
+            self.recorder.record(self.current_step, current_time, self.vehicles.view())
+        except OSError as e:
+            self.logger.error(f"Error recording trajectories: {str(e)}")
+            self._close_recorder()
+
+    def _close_recorder(self):
+        """Flush and close the trajectory recording, if any."""
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+
+    def latest_snapshot(self):
+        """Return the most recently published simulation snapshot."""
+        return self.snapshots.latest()
+
+    def wait_for_snapshot(self, version, timeout=None):
+        """Wait until a snapshot newer than version is published and return the latest."""
+        return self.snapshots.wait_for_update(version, timeout)
+
+    def read_snapshot(self, reader):
+        """Apply reader to the latest snapshot, retrying if it is overwritten meanwhile."""
+        return self.snapshots.read(reader)
         
-    def _update_vehicle_data(self):
-        """Update vehicle positions and states."""
+    def _update_vehicle_data(self, skipped_steps=False):
+        """Update vehicle positions and states.
+
+        skipped_steps says SUMO advanced several steps since the last update.
+        """
+        if self.collection_mode == 'subscription':
+            self._update_vehicle_data_subscribed(skipped_steps)
+        else:
+            self._update_vehicle_data_polled()
+
+    def _update_vehicle_data_polled(self):
+        """Update vehicle states with one TraCI request per vehicle variable."""
+        try:
+            vehicle_ids = self.connection.vehicle.getIDList()
+            self.vehicles.update(
+                vehicle_ids,
+                [self.connection.vehicle.getPosition(vehicle_id) for vehicle_id in vehicle_ids],
+                [self.connection.vehicle.getSpeed(vehicle_id) for vehicle_id in vehicle_ids],
+                [self.connection.vehicle.getLaneID(vehicle_id) for vehicle_id in vehicle_ids],
+                [self.connection.vehicle.getRoadID(vehicle_id) for vehicle_id in vehicle_ids],
+                [self.connection.vehicle.getRouteID(vehicle_id) for vehicle_id in vehicle_ids],
+                [self.connection.vehicle.getTypeID(vehicle_id) for vehicle_id in vehicle_ids]
+            )
+        except traci.exceptions.TraCIException as e:
+            self.logger.error(f"Error updating vehicle data: {str(e)}")
+
+    def _update_vehicle_data_subscribed(self, skipped_steps=False):
+        """Update vehicle states from the subscription results of the last step.
+
+        Every vehicle is subscribed once when it departs, after which SUMO
+        returns its state with the simulation step response. Arrived vehicles
+        drop out of the results on their own.
+        """
         try:
-            self.vehicle_data = {}
-            for vehicle_id in traci.vehicle.getIDList():
-                self.vehicle_data[vehicle_id] = {
-                    'id': vehicle_id,
-                    'position': traci.vehicle.getPosition(vehicle_id),
-                    'speed': traci.vehicle.getSpeed(vehicle_id),
-                    'lane': traci.vehicle.getLaneID(vehicle_id),
-                    'edge': traci.vehicle.getRoadID(vehicle_id),
-                    'route': traci.vehicle.getRouteID(vehicle_id),
-                    'type': traci.vehicle.getTypeID(vehicle_id)
-                }
+            if not self._subscriptions_active:
+                self.connection.simulation.subscribe(SIMULATION_SUBSCRIPTION_VARS)
+                departed = self.connection.vehicle.getIDList()
+                self._subscriptions_active = True
+            elif skipped_steps:
+                # The departures list only covers the last step, so look for
+                # vehicles that departed earlier in the jump and are unsubscribed
+                subscribed = self.connection.vehicle.getAllSubscriptionResults()
+                departed = [vehicle_id for vehicle_id in self.connection.vehicle.getIDList()
+                            if vehicle_id not in subscribed]
+            else:
+                departed = self.connection.simulation.getSubscriptionResults().get(tc.VAR_DEPARTED_VEHICLES_IDS, ())
+
+            for vehicle_id in departed:
+                self.connection.vehicle.subscribe(vehicle_id, VEHICLE_SUBSCRIPTION_VARS)
+
+            results = self.connection.vehicle.getAllSubscriptionResults()
+            states = results.values()
+            vehicle_ids = list(results)
+            lane_ids = [values[tc.VAR_LANE_ID] for values in states]
+            self.vehicles.update(
+                vehicle_ids,
+                [values[tc.VAR_POSITION] for values in states],
+                [values[tc.VAR_SPEED] for values in states],
+                lane_ids,
+                [values[tc.VAR_ROAD_ID] for values in states],
+                [values[tc.VAR_ROUTE_ID] for values in states],
+                [values[tc.VAR_TYPE] for values in states]
+            )
+            # Mapped to network lanes only if camera detection asks for them
+            self._lane_state = (vehicle_ids, lane_ids, [values[tc.VAR_LANEPOSITION] for values in states])
         except traci.exceptions.TraCIException as e:
             self.logger.error(f"Error updating vehicle data: {str(e)}")
 
-    def _update_camera_detections(self):
-        """Update all camera detections."""
-        vehicles = list(self.vehicle_data.values())
-        for camera in self.cameras.values():
-            camera.detect_vehicles(vehicles)
+    def _get_simulation_time(self):
+        """Return the current simulation time in seconds."""
+        if self._subscriptions_active:
+            return self.connection.simulation.getSubscriptionResults()[tc.VAR_TIME]
+        return self.connection.simulation.getTime()
+
+    def _update_camera_detections(self, current_time):
+        """Update all camera detections and their zone occupants."""
+        vehicles = self.vehicles.view()
+        lane_positions, coverage = self.lane_positions, self.camera_coverage
+        try:
+            if lane_positions is not None and coverage is not None:
+                # Vehicles on known lane offsets: a table lookup instead of distance tests
+                detections = self._detect_on_lanes(coverage, *lane_positions(), vehicles.xy)
+            else:
+                # Free slots hold NaN positions and are never detected
+                detections = self.detection_engine.detect(vehicles.xy)
+        except Exception as e:
+            self.logger.error(f"Error in batched camera detection: {str(e)}")
+            return
+        for camera_id, camera in self.cameras.items():
+            if camera_id in detections:  # skip cameras added since the pass started
+                slots, distances = detections[camera_id]
+                events = camera.update_detections(vehicles, slots, distances, current_time)
+                if events:
+                    log_camera_zone_events(camera_id, events)
+        if self.predictions is not None:
+            # Only queues the features; the model runs in the prediction worker
+            self.predictions.submit(self.current_step, current_time, self.cameras)
+
+    def _detect_on_lanes(self, coverage, lanes, offsets, slots, positions):
+        """Detect vehicles through the lane coverage table, in the DetectionEngine.detect format.
+
+        Vehicles on lanes outside the network model (lane -1) are tested by
+        distance instead.
+        """
+        on_network = lanes >= 0
+        if on_network.all():
+            return coverage.detect(lanes, offsets, slots, positions)
+        detections = coverage.detect(lanes[on_network], offsets[on_network], slots[on_network], positions)
+        off_network = np.full_like(positions, np.nan)
+        off_slots = slots[~on_network]
+        off_network[off_slots] = positions[off_slots]
+        extra = self.detection_engine.detect(off_network)
+        merged = {}
+        for camera_id, (hit_slots, distances) in detections.items():
+            if camera_id in extra:
+                hit_slots = np.concatenate((hit_slots, extra[camera_id][0]))
+                distances = np.concatenate((distances, extra[camera_id][1]))
+                order = np.argsort(hit_slots, kind='stable')
+                hit_slots, distances = hit_slots[order], distances[order]
+            merged[camera_id] = (hit_slots, distances)
+        return merged
 
     def get_camera_data(self, camera_id):
         """Get data from a specific camera."""
@@ -132,44 +611,26 @@ class SimulationController:
         return []
 
     def get_traffic_metrics(self):
-        """Calculate and return traffic metrics."""
-        import random
-        import math
-        import time
-
-        # Generate sample data when in simulation-only mode
-        current_time = time.time()
-        base_vehicles = 15
-        variation = math.sin(current_time * 0.1) * 5  # Varies between -5 and +5
-        total_vehicles = max(0, int(base_vehicles + variation))
-        
-        metrics = {
-            'total_vehicles': total_vehicles,
-            'average_speed': 15 + math.sin(current_time * 0.2) * 3,  # Varies between 12-18 m/s
-            'density': total_vehicles / 4,  # 4 km total road length
-            'vehicles_per_camera': {
-                'cam_north': max(0, int(total_vehicles/4 + random.randint(-2, 2))),
-                'cam_south': max(0, int(total_vehicles/4 + random.randint(-2, 2))),
-                'cam_east': max(0, int(total_vehicles/4 + random.randint(-2, 2))),
-                'cam_west': max(0, int(total_vehicles/4 + random.randint(-2, 2)))
-            },
-            'average_speed_per_lane': {
-                'north_to_south': 15 + random.uniform(-2, 2),
-                'south_to_north': 15 + random.uniform(-2, 2),
-                'east_to_west': 15 + random.uniform(-2, 2),
-                'west_to_east': 15 + random.uniform(-2, 2)
-            }
-        }
-        
-        # Log the metrics
-        self.logger.info(f"Traffic Metrics: {metrics}")
-            
+        """Return the traffic metrics aggregated at the last simulation step, with the latest predictions."""
+        metrics = self.metrics.current()
+        if self.predictions is not None:
+            metrics = {**metrics, 'predictions': self.predictions.latest()}
         return metrics
 
+    def get_metrics_history(self, start=None, end=None, resolution='auto'):
+        """Return recorded metrics between two simulation times at the given resolution."""
+        return self.metrics_history.query(start, end, resolution)
+
     def close(self):
-        """Close the TraCI connection."""
+        """Stop the background simulation and close the TraCI connection."""
+        self.stop()
+        self._close_recorder()
+        if self.predictions is not None:
+            self.predictions.close()
         try:
-            traci.close()
+            self.connection.close()
+            self.connection = traci
+            self._subscriptions_active = False
             self.logger.info("Simulation closed")
         except:
             self.logger.info("Simulation already closed or not started with SUMO")
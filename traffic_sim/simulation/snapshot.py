@@ -0,0 +1,160 @@
+import threading
+import numpy as np
+
+class _SnapshotBuffer:
+    def __init__(self, capacity):
+        """Allocate vehicle columns for the given number of vehicles."""
+        self.version = 0
+        self.xy = np.empty((capacity, 2))
+        self.speed = np.empty(capacity)
+        self.lane = np.empty(capacity, dtype=np.int32)
+        self.edge = np.empty(capacity, dtype=np.int32)
+        self.route = np.empty(capacity, dtype=np.int32)
+        self.type = np.empty(capacity, dtype=np.int32)
+
+    @property
+    def capacity(self):
+        return len(self.speed)
+
+
+class Snapshot:
+    __slots__ = ('version', 'step', 'time', 'ids', 'xy', 'speed', 'lane', 'edge', 'route', 'type',
+                 'lanes', 'edges', 'routes', 'types', 'camera_hits', 'metrics', '_buffer')
+
+    def __init__(self, version, step, time, ids, buffer, vehicles, camera_hits, metrics):
+        """Wrap the first len(ids) rows of a buffer as one published step."""
+        count = len(ids)
+        self.version = version
+        self.step = step
+        self.time = time
+        self.ids = ids
+        self.xy = buffer.xy[:count]
+        self.speed = buffer.speed[:count]
+        self.lane = buffer.lane[:count]
+        self.edge = buffer.edge[:count]
+        self.route = buffer.route[:count]
+        self.type = buffer.type[:count]
+        for column in (self.xy, self.speed, self.lane, self.edge, self.route, self.type):
+            column.flags.writeable = False
+        # Interners only ever append, so sharing them with later steps is safe
+        self.lanes = vehicles.lanes
+        self.edges = vehicles.edges
+        self.routes = vehicles.routes
+        self.types = vehicles.types
+        self.camera_hits = camera_hits
+        self.metrics = metrics
+        self._buffer = buffer
+
+    def __len__(self):
+        return len(self.ids)
+
+    def is_valid(self):
+        """Return False once the buffer behind this snapshot has been reused."""
+        return self._buffer.version == self.version
+
+    def vehicle(self, row):
+        """Return the state of one vehicle as a dict."""
+        x, y = self.xy[row].tolist()
+        return {
+            'id': self.ids[row],
+            'position': (x, y),
+            'speed': float(self.speed[row]),
+            'lane': self.lanes.lookup(self.lane[row]),
+            'edge': self.edges.lookup(self.edge[row]),
+            'route': self.routes.lookup(self.route[row]),
+            'type': self.types.lookup(self.type[row])
+        }
+
+    def detections(self):
+        """Return the detected vehicle ids of every camera."""
+        return {
+            camera_id: [self.ids[row] for row in rows.tolist()]
+            for camera_id, (rows, _) in self.camera_hits.items()
+        }
+
+    def camera_data(self, camera_id):
+        """Return the detections of a camera in the Camera.get_vehicle_data format."""
+        if camera_id not in self.camera_hits:
+            return []
+        rows, distances = self.camera_hits[camera_id]
+        detected = []
+        for row, distance in zip(rows.tolist(), distances.tolist()):
+            vehicle = self.vehicle(row)
+            del vehicle['lane']
+            vehicle['distance_to_camera'] = distance
+            detected.append(vehicle)
+        return detected
+
+
+class SnapshotPublisher:
+    def __init__(self, capacity=1024):
+        """Initialize two snapshot buffers and publish an empty step."""
+        self._buffers = [_SnapshotBuffer(capacity), _SnapshotBuffer(capacity)]
+        self._version = 0
+        self._latest = None
+        self._published = threading.Condition()
+
+    def latest(self):
+        """Return the most recently published snapshot without locking."""
+        return self._latest
+
+    def wait_for_update(self, version, timeout=None):
+        """Block until a snapshot newer than version is published, then return the latest.
+
+        Returns the current snapshot unchanged if the timeout expires first.
+        Only waiting takes the condition lock; reads never do.
+        """
+        if self._version == version:
+            with self._published:
+                self._published.wait_for(lambda: self._version != version, timeout)
+        return self._latest
+
+    def read(self, reader):
+        """Call reader on the latest snapshot, retrying if its buffer was reused meanwhile."""
+        while True:
+            snapshot = self._latest
+            result = reader(snapshot)
+            if snapshot.is_valid():
+                return result
+
+    def publish(self, step, time, vehicles, cameras, metrics):
+        """Copy the current vehicle view and camera hits into the back buffer and swap it in.
+
+        Only the simulation thread may call this. Readers keep using the
+        previous snapshot, whose buffer is left untouched, until the swap.
+        """
+        version = self._version + 1
+        buffer = self._buffers[version % 2]
+        slots = vehicles.slots
+        count = len(slots)
+        if count > buffer.capacity:
+            buffer = _SnapshotBuffer(max(count, 2 * buffer.capacity))
+            self._buffers[version % 2] = buffer
+
+        # Mark the buffer as in flux so readers of the snapshot it held retry
+        buffer.version = -1
+        np.take(vehicles.xy, slots, axis=0, out=buffer.xy[:count])
+        np.take(vehicles.speed, slots, out=buffer.speed[:count])
+        np.take(vehicles.lane, slots, out=buffer.lane[:count])
+        np.take(vehicles.edge, slots, out=buffer.edge[:count])
+        np.take(vehicles.route, slots, out=buffer.route[:count])
+        np.take(vehicles.type, slots, out=buffer.type[:count])
+        buffer.version = version
+        ids = [vehicles.ids[slot] for slot in slots.tolist()]
+
+        # Translate each camera's hit slots into rows of the compacted columns. Detections
+        # can be older than the vehicle columns, so only vehicles still holding their slot
+        # are kept; free slots have code -1 and reused ones another vehicle's code.
+        camera_hits = {}
+        for camera_id, camera in cameras.items():
+            hit_slots, distances = camera.detected_slots()
+            present = vehicles.code[hit_slots] == camera.detected_codes()
+            camera_hits[camera_id] = (np.searchsorted(slots, hit_slots[present]),
+                                      np.asarray(distances)[present])
+
+        snapshot = Snapshot(version, step, time, ids, buffer, vehicles, camera_hits, metrics)
+        self._version = version
+        self._latest = snapshot
+        with self._published:
+            self._published.notify_all()
+        return snapshot
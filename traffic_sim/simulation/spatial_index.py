@@ -0,0 +1,84 @@
+import math
+import numpy as np
+
+# Cell coordinates are packed into one int64 key: (cx + OFFSET) * STRIDE + (cy + OFFSET)
+CELL_OFFSET = 1 << 20
+CELL_STRIDE = 1 << 21
+
+class CameraGrid:
+    def __init__(self, cell_size):
+        """Initialize an empty uniform grid with square cells of the given size in meters."""
+        if cell_size <= 0:
+            raise ValueError(f"Grid cell size must be positive, got {cell_size}")
+        self.cell_size = float(cell_size)
+        self.cells = {}          # cell key -> set of camera ids covering the cell
+        self.camera_cells = {}   # camera id -> list of cell keys it was inserted into
+        self.version = 0         # bumped on every change so compiled tables can be refreshed
+
+    def cell_key(self, position):
+        """Return the key of the cell containing a position."""
+        cx = math.floor(position[0] / self.cell_size)
+        cy = math.floor(position[1] / self.cell_size)
+        return (cx + CELL_OFFSET) * CELL_STRIDE + (cy + CELL_OFFSET)
+
+    def cell_keys(self, positions):
+        """Return the cell keys of an (N, 2) array of positions.
+
+        Rows with NaN coordinates get the key -1, which matches no cell.
+        """
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        keys = np.full(len(positions), -1, dtype=np.int64)
+        valid = np.isfinite(positions).all(axis=1)
+        cells = np.floor(positions[valid] / self.cell_size).astype(np.int64)
+        keys[valid] = (cells[:, 0] + CELL_OFFSET) * CELL_STRIDE + (cells[:, 1] + CELL_OFFSET)
+        return keys
+
+    def add_camera(self, camera_id, position, detection_radius):
+        """Insert a camera into every cell its detection circle overlaps."""
+        if camera_id in self.camera_cells:
+            self.remove_camera(camera_id)
+
+        x, y = position
+        size = self.cell_size
+        keys = []
+        for cx in range(math.floor((x - detection_radius) / size), math.floor((x + detection_radius) / size) + 1):
+            for cy in range(math.floor((y - detection_radius) / size), math.floor((y + detection_radius) / size) + 1):
+                # Skip cells whose nearest point lies outside the circle
+                nearest_x = min(max(x, cx * size), (cx + 1) * size)
+                nearest_y = min(max(y, cy * size), (cy + 1) * size)
+                if (nearest_x - x) ** 2 + (nearest_y - y) ** 2 > detection_radius ** 2:
+                    continue
+                key = (cx + CELL_OFFSET) * CELL_STRIDE + (cy + CELL_OFFSET)
+                self.cells.setdefault(key, set()).add(camera_id)
+                keys.append(key)
+        self.camera_cells[camera_id] = keys
+        self.version += 1
+
+    def remove_camera(self, camera_id):
+        """Remove a camera from the cells it covers."""
+        for key in self.camera_cells.pop(camera_id, ()):
+            members = self.cells[key]
+            members.discard(camera_id)
+            if not members:
+                del self.cells[key]
+        self.version += 1
+
+    def candidates(self, position):
+        """Return the ids of cameras whose detection circle may contain a position."""
+        return self.cells.get(self.cell_key(position), frozenset())
+
+    def compile(self, camera_order):
+        """Flatten the grid into sorted lookup arrays.
+
+        camera_order maps camera ids to integer indices. Returns the sorted
+        cell keys, the start offset of each cell's candidates (with a final
+        end offset) and the flat array of candidate camera indices.
+        """
+        keys = np.array(sorted(self.cells), dtype=np.int64)
+        starts = np.zeros(len(keys) + 1, dtype=np.intp)
+        flat = []
+        for i, key in enumerate(keys.tolist()):
+            members = sorted(camera_order[camera_id] for camera_id in self.cells[key])
+            flat.extend(members)
+            starts[i + 1] = len(flat)
+        return keys, starts, np.array(flat, dtype=np.intp)
@@ -0,0 +1,153 @@
+"""Run a grid of configuration overrides as parallel SUMO simulations.
+
+Each scenario runs in a worker process with its own labelled TraCI
+connection and SUMO instance. Summaries are appended to a JSON-lines
+results file as scenarios finish; running the same sweep again skips the
+scenarios already in it.
+
+    python -m traffic_sim.simulation.sweep --grid sweep.yaml --results sweep.jsonl
+
+where sweep.yaml maps dotted config keys to the values to try:
+
+    simulation.scale: [0.5, 1.0, 1.5, 2.0, 2.5]
+    simulation.step_time: [0.1, 0.2]
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import yaml
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), '..', 'config', 'simulation_config.yaml')
+
+def expand_grid(grid):
+    """Return one overrides dict per combination of the grid's values."""
+    keys = sorted(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+
+def scenario_id(overrides):
+    """Return a stable id for a set of overrides."""
+    encoded = json.dumps(overrides, sort_keys=True).encode('utf-8')
+    return hashlib.sha1(encoded).hexdigest()[:12]
+
+def summarize_metrics(history):
+    """Reduce a run's per-second metrics history to a compact summary."""
+    summary = {}
+    for field in ('total_vehicles', 'average_speed', 'density'):
+        values = np.asarray(history.get(field, []), dtype=float)
+        summary[f'mean_{field}'] = float(values.mean()) if len(values) else 0.0
+        summary[f'max_{field}'] = float(values.max()) if len(values) else 0.0
+    return summary
+
+def run_scenario(config_path, overrides):
+    """Run one scenario to completion and return its summary.
+
+    A scenario that fell back from the requested backend, e.g. to the
+    microsimulation without SUMO, is reported as failed.
+    """
+    # Imported here so the parent process never loads TraCI state
+    from .sim_controller import SimulationController
+
+    identifier = scenario_id(overrides)
+    settings = {'logging.level': 'WARNING'}
+    settings.update(overrides)
+    result = {'id': identifier, 'overrides': overrides}
+    started = time.perf_counter()
+    controller = SimulationController(config_path, label=f"sweep-{identifier}", config_overrides=settings)
+    try:
+        controller.start_simulation()
+        end_time = controller.metrics.current()['simulation_time']
+        history = controller.get_metrics_history(0.0, end_time, '1s')
+        result.update({
+            'status': 'ok' if controller.current_step else 'failed',
+            'backend': controller.active_backend,
+            'steps': controller.current_step,
+            'simulation_time': end_time,
+            'wall_time': time.perf_counter() - started
+        })
+        result.update(summarize_metrics(history))
+        if controller.active_backend != controller.backend:
+            # A fallback ignores backend-specific overrides, so its results are not comparable
+            result.update({'status': 'failed',
+                           'error': f"Requested the {controller.backend} backend, "
+                                    f"ran on {controller.active_backend or 'none'}"})
+    except Exception as e:
+        result.update({'status': 'failed', 'error': str(e)})
+    finally:
+        controller.close()
+    return result
+
+def load_completed(results_path):
+    """Return the ids of scenarios already in a results file."""
+    completed = set()
+    if os.path.exists(results_path):
+        with open(results_path) as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by an interrupted sweep
+                if result.get('status') == 'ok':
+                    completed.add(result['id'])
+    return completed
+
+class SweepRunner:
+    def __init__(self, grid, results_path, config_path=CONFIG_PATH, max_workers=None):
+        """Prepare a sweep over every combination in grid."""
+        self.scenarios = expand_grid(grid)
+        self.results_path = results_path
+        self.config_path = os.path.abspath(config_path)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.logger = logging.getLogger('traffic_simulation')
+
+    def pending(self):
+        """Return the scenarios without a successful result yet."""
+        completed = load_completed(self.results_path)
+        return [overrides for overrides in self.scenarios if scenario_id(overrides) not in completed]
+
+    def run(self):
+        """Run the pending scenarios and yield each summary as it finishes."""
+        pending = self.pending()
+        if not pending:
+            return
+        workers = min(self.max_workers, len(pending))
+        with ProcessPoolExecutor(max_workers=workers) as pool, open(self.results_path, 'a') as results:
+            futures = {pool.submit(run_scenario, self.config_path, overrides): overrides
+                       for overrides in pending}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    overrides = futures[future]
+                    result = {'id': scenario_id(overrides), 'overrides': overrides,
+                              'status': 'failed', 'error': str(e)}
+                    self.logger.error(f"Scenario {result['id']} failed: {str(e)}")
+                results.write(json.dumps(result) + '\n')
+                results.flush()
+                yield result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--grid', required=True, help="YAML file mapping dotted config keys to value lists")
+    parser.add_argument('--results', required=True, help="JSON-lines file results are appended to")
+    parser.add_argument('--config', default=CONFIG_PATH, help="base simulation config")
+    parser.add_argument('--workers', type=int, default=None, help="concurrent SUMO instances (default: CPU count)")
+    args = parser.parse_args()
+
+    with open(args.grid) as f:
+        grid = yaml.safe_load(f)
+    runner = SweepRunner(grid, args.results, args.config, args.workers)
+    pending = runner.pending()
+    print(f"{len(runner.scenarios) - len(pending)} of {len(runner.scenarios)} scenarios already done")
+    for done, result in enumerate(runner.run(), start=1):
+        print(f"[{done}/{len(pending)}] {result['id']} {result['status']} {json.dumps(result['overrides'])}")
+
+
+if __name__ == "__main__":
+    main()
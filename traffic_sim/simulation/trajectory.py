@@ -0,0 +1,231 @@
+import json
+import logging
+import os
+import time
+
+import numpy as np
+
+# One row per vehicle per recorded step; fixed width so files can be memory-mapped
+RECORD_DTYPE = np.dtype([
+    ('time', '<f8'),
+    ('vehicle', '<i4'),
+    ('x', '<f4'),
+    ('y', '<f4'),
+    ('speed', '<f4'),
+    ('lane', '<i4')
+])
+
+# One row per recorded step: where its vehicle rows live
+INDEX_DTYPE = np.dtype([
+    ('step', '<i8'),
+    ('time', '<f8'),
+    ('chunk', '<i4'),
+    ('offset', '<i8'),   # byte offset of the first row in the chunk file
+    ('count', '<i4')
+])
+
+FORMAT_VERSION = 1
+INDEX_FILE = 'index.bin'
+META_FILE = 'meta.json'
+
+def chunk_file_name(chunk):
+    return f"chunk_{chunk:05d}.bin"
+
+class TrajectoryRecorder:
+    def __init__(self, directory, steps_per_chunk=3600, lane_lengths=None):
+        """Start a new recording in directory, which must not already hold one."""
+        self.directory = directory
+        self.steps_per_chunk = steps_per_chunk
+        self.lane_lengths = dict(lane_lengths or {})
+        self.logger = logging.getLogger('traffic_simulation')
+        os.makedirs(directory, exist_ok=True)
+        if os.path.exists(os.path.join(directory, INDEX_FILE)):
+            raise FileExistsError(f"Trajectory recording already exists in {directory}")
+        self._index_file = open(os.path.join(directory, INDEX_FILE), 'wb')
+        self._chunk = -1
+        self._chunk_file = None
+        self._chunk_offset = 0
+        self._steps_in_chunk = 0
+        self._vehicle_ids = None
+        self._lanes = None
+        self._index_row = np.zeros(1, dtype=INDEX_DTYPE)
+        self._pending_index = bytearray()  # index rows of steps not flushed yet
+        self._rows = np.zeros(0, dtype=RECORD_DTYPE)
+        self.steps_recorded = 0
+        # Readers can open the recording before the first chunk is flushed
+        self._write_meta()
+
+    def _next_chunk(self):
+        if self._chunk_file is not None:
+            self.flush()
+            self._chunk_file.close()
+        self._chunk += 1
+        self._chunk_file = open(os.path.join(self.directory, chunk_file_name(self._chunk)), 'wb')
+        self._chunk_offset = 0
+        self._steps_in_chunk = 0
+
+    def record(self, step, sim_time, vehicles):
+        """Append the occupied rows of a VehicleView as one step."""
+        if self._chunk_file is None or self._steps_in_chunk >= self.steps_per_chunk:
+            self._next_chunk()
+        # The string tables are only written out on flush, so keep references
+        self._vehicle_ids = vehicles.vehicle_ids
+        self._lanes = vehicles.lanes
+
+        slots = vehicles.slots
+        count = len(slots)
+        if len(self._rows) < count:
+            self._rows = np.zeros(max(count, 2 * len(self._rows)), dtype=RECORD_DTYPE)
+        rows = self._rows[:count]
+        rows['time'] = sim_time
+        rows['vehicle'] = vehicles.code[slots]
+        rows['x'] = vehicles.xy[slots, 0]
+        rows['y'] = vehicles.xy[slots, 1]
+        rows['speed'] = vehicles.speed[slots]
+        rows['lane'] = vehicles.lane[slots]
+        self._chunk_file.write(rows.tobytes())
+
+        index_row = self._index_row
+        index_row['step'] = step
+        index_row['time'] = sim_time
+        index_row['chunk'] = self._chunk
+        index_row['offset'] = self._chunk_offset
+        index_row['count'] = count
+        self._pending_index += index_row.tobytes()
+
+        self._chunk_offset += count * RECORD_DTYPE.itemsize
+        self._steps_in_chunk += 1
+        self.steps_recorded += 1
+
+    def flush(self):
+        """Write buffered rows and the id/lane tables so readers see every recorded step.
+
+        Index entries are only written here, after the rows and string tables
+        they refer to, so a live reader or the recording of a crashed run
+        never sees an entry it cannot read.
+        """
+        if self._chunk_file is not None:
+            self._chunk_file.flush()
+        self._write_meta()
+        self._index_file.write(self._pending_index)
+        self._index_file.flush()
+        self._pending_index.clear()
+
+    def _write_meta(self):
+        """Atomically replace meta.json with the current chunk count and string tables."""
+        meta = {
+            'version': FORMAT_VERSION,
+            'steps_per_chunk': self.steps_per_chunk,
+            'chunks': self._chunk + 1,
+            'vehicle_ids': list(self._vehicle_ids.values) if self._vehicle_ids else [],
+            'lanes': list(self._lanes.values) if self._lanes else [],
+            'lane_lengths': self.lane_lengths
+        }
+        meta_path = os.path.join(self.directory, META_FILE)
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    def close(self):
+        """Flush and close the recording files."""
+        try:
+            self.flush()
+        except Exception as e:
+            self.logger.error(f"Error writing trajectory metadata: {str(e)}")
+        if self._chunk_file is not None:
+            self._chunk_file.close()
+            self._chunk_file = None
+        self._index_file.close()
+
+class TrajectoryReader:
+    def __init__(self, directory):
+        """Memory-map a trajectory recording for slicing."""
+        self.directory = directory
+        self.refresh()
+
+    def refresh(self):
+        """Re-read the index and metadata to pick up steps flushed since opening.
+
+        Every index entry read here refers to rows and codes already on disk.
+        """
+        with open(os.path.join(self.directory, META_FILE)) as f:
+            meta = json.load(f)
+        if meta['version'] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported trajectory format version {meta['version']}")
+        self.vehicle_ids = meta['vehicle_ids']
+        self.lanes = meta['lanes']
+        self.lane_lengths = meta.get('lane_lengths', {})
+        index_path = os.path.join(self.directory, INDEX_FILE)
+        steps = os.path.getsize(index_path) // INDEX_DTYPE.itemsize
+        self.index = np.memmap(index_path, dtype=INDEX_DTYPE, mode='r', shape=(steps,)) \
+            if steps else np.zeros(0, dtype=INDEX_DTYPE)
+        self._chunks = {}
+
+    def __len__(self):
+        return len(self.index)
+
+    def _chunk(self, chunk):
+        rows = self._chunks.get(chunk)
+        if rows is None:
+            path = os.path.join(self.directory, chunk_file_name(chunk))
+            size = os.path.getsize(path) // RECORD_DTYPE.itemsize
+            rows = np.memmap(path, dtype=RECORD_DTYPE, mode='r', shape=(size,)) \
+                if size else np.zeros(0, dtype=RECORD_DTYPE)
+            self._chunks[chunk] = rows
+        return rows
+
+    def _rows(self, first, last):
+        """Return the rows of index entries first..last (inclusive)."""
+        if first > last:
+            return np.zeros(0, dtype=RECORD_DTYPE)
+        index = self.index
+        pieces = []
+        position = first
+        while position <= last:
+            chunk = int(index['chunk'][position])
+            # Last index entry in the window that lives in the same chunk
+            end = position + int(np.searchsorted(index['chunk'][position:last + 1], chunk, side='right')) - 1
+            start_row = int(index['offset'][position]) // RECORD_DTYPE.itemsize
+            end_row = int(index['offset'][end]) // RECORD_DTYPE.itemsize + int(index['count'][end])
+            pieces.append(self._chunk(chunk)[start_row:end_row])
+            position = end + 1
+        # A window inside one chunk is a view into the mapped file; spanning chunks copies
+        return pieces[0] if len(pieces) == 1 else np.concatenate(pieces)
+
+    def entries(self, first, last):
+        """Return the rows of the steps at positions first..last in the index."""
+        return self._rows(first, last)
+
+    def entry(self, position):
+        """Return the rows of the step at a position in the index."""
+        return self._rows(position, position)
+
+    def step(self, step):
+        """Return the rows recorded for one simulation step."""
+        position = int(np.searchsorted(self.index['step'], step))
+        if position >= len(self.index) or self.index['step'][position] != step:
+            raise KeyError(f"Step {step} was not recorded")
+        return self._rows(position, position)
+
+    def window(self, start=None, end=None):
+        """Return the rows recorded between two simulation times (inclusive)."""
+        times = self.index['time']
+        first = 0 if start is None else int(np.searchsorted(times, start, side='left'))
+        last = len(times) - 1 if end is None else int(np.searchsorted(times, end, side='right')) - 1
+        return self._rows(first, last)
+
+    def vehicle_id(self, code):
+        return self.vehicle_ids[code]
+
+    def lane_id(self, code):
+        return self.lanes[code] if code >= 0 else None
+
+def new_recording_directory(root):
+    """Return a fresh per-run directory under root."""
+    name = time.strftime('run_%Y%m%d_%H%M%S')
+    directory = os.path.join(root, name)
+    suffix = 1
+    while os.path.exists(directory):
+        directory = os.path.join(root, f"{name}_{suffix}")
+        suffix += 1
+    return directory
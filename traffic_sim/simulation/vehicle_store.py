@@ -0,0 +1,221 @@
+import numpy as np
+
+class StringInterner:
+    def __init__(self):
+        """Initialize an empty string-to-code table."""
+        self.codes = {}
+        self.values = []
+
+    def intern(self, value):
+        """Return the integer code of a string, assigning a new one if needed."""
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def lookup(self, code):
+        """Return the string for an integer code."""
+        return self.values[code]
+
+    def __len__(self):
+        return len(self.values)
+
+
+def _read_only(array):
+    """Return a read-only view of an array without copying it."""
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+
+class VehicleView:
+    def __init__(self, store):
+        """Wrap the store's columns in read-only views.
+
+        Columns are indexed by slot and sized to the store's capacity. Free
+        slots hold NaN coordinates and -1 codes; use `slots` to get the
+        occupied ones.
+        """
+        self._store = store
+        self.xy = _read_only(store.xy)
+        self.speed = _read_only(store.speed)
+        self.lane = _read_only(store.lane)
+        self.edge = _read_only(store.edge)
+        self.route = _read_only(store.route)
+        self.type = _read_only(store.type)
+        self.code = _read_only(store.code)
+        self.active = _read_only(store.active)
+        self.ids = store.slot_ids
+        self.vehicle_ids = store.vehicle_ids
+        self.lanes = store.lanes
+        self.edges = store.edges
+        self.routes = store.routes
+        self.types = store.types
+
+    @property
+    def slots(self):
+        """Return the occupied slots in ascending order."""
+        return np.flatnonzero(self.active)
+
+    def __len__(self):
+        return len(self._store)
+
+    def slot_of(self, vehicle_id):
+        """Return the slot of a vehicle, or None if it is not in the network."""
+        return self._store.slots.get(vehicle_id)
+
+    def vehicle(self, slot):
+        """Return the state of the vehicle in a slot as a dict."""
+        x, y = self.xy[slot].tolist()
+        return {
+            'id': self.ids[slot],
+            'position': (x, y),
+            'speed': float(self.speed[slot]),
+            'lane': self.lanes.lookup(self.lane[slot]),
+            'edge': self.edges.lookup(self.edge[slot]),
+            'route': self.routes.lookup(self.route[slot]),
+            'type': self.types.lookup(self.type[slot])
+        }
+
+    def get(self, vehicle_id):
+        """Return the state of a vehicle by id as a dict, or None."""
+        slot = self.slot_of(vehicle_id)
+        if slot is None:
+            return None
+        return self.vehicle(slot)
+
+
+class VehicleStore:
+    def __init__(self, capacity=1024):
+        """Initialize preallocated columns for the given number of vehicles."""
+        self.vehicle_ids = StringInterner()  # stable codes, unlike slots which are reused
+        self.lanes = StringInterner()
+        self.edges = StringInterner()
+        self.routes = StringInterner()
+        self.types = StringInterner()
+        self.slots = {}          # vehicle id -> slot
+        self.slot_ids = []       # slot -> vehicle id (None when free)
+        self.free_slots = []
+        self.capacity = 0
+        self.version = 0
+        self._view = None
+        self._grow(capacity)
+
+    def __len__(self):
+        return len(self.slots)
+
+    def _grow(self, capacity):
+        """Reallocate the columns with a larger capacity, keeping existing rows."""
+        old = self.capacity
+        xy = np.full((capacity, 2), np.nan)
+        speed = np.full(capacity, np.nan)
+        lane = np.full(capacity, -1, dtype=np.int32)
+        edge = np.full(capacity, -1, dtype=np.int32)
+        route = np.full(capacity, -1, dtype=np.int32)
+        vehicle_type = np.full(capacity, -1, dtype=np.int32)
+        code = np.full(capacity, -1, dtype=np.int32)
+        active = np.zeros(capacity, dtype=bool)
+        if old:
+            xy[:old] = self.xy
+            speed[:old] = self.speed
+            lane[:old] = self.lane
+            edge[:old] = self.edge
+            route[:old] = self.route
+            vehicle_type[:old] = self.type
+            code[:old] = self.code
+            active[:old] = self.active
+        self.xy, self.speed, self.active = xy, speed, active
+        self.lane, self.edge, self.route, self.type = lane, edge, route, vehicle_type
+        self.code = code
+
+        self.slot_ids.extend([None] * (capacity - old))
+        # Hand out low slots first so the occupied range stays compact
+        self.free_slots = list(range(capacity - 1, old - 1, -1)) + self.free_slots
+        self.capacity = capacity
+        self._view = None
+
+    def _allocate(self, vehicle_id):
+        """Assign a free slot to a new vehicle."""
+        if not self.free_slots:
+            self._grow(self.capacity * 2)
+        slot = self.free_slots.pop()
+        self.slots[vehicle_id] = slot
+        self.slot_ids[slot] = vehicle_id
+        self.code[slot] = self.vehicle_ids.intern(vehicle_id)
+        self.active[slot] = True
+        return slot
+
+    def _release(self, slot):
+        """Return a slot to the free list."""
+        del self.slots[self.slot_ids[slot]]
+        self.slot_ids[slot] = None
+        self.active[slot] = False
+        self.xy[slot] = np.nan
+        self.speed[slot] = np.nan
+        self.lane[slot] = self.edge[slot] = self.route[slot] = self.type[slot] = -1
+        self.code[slot] = -1
+        self.free_slots.append(slot)
+
+    def update(self, vehicle_ids, positions, speeds, lanes, edges, routes, types):
+        """Replace the stored population with the given per-vehicle columns.
+
+        Vehicles keep their slot for as long as they are present; vehicles
+        missing from vehicle_ids are released and their slots reused.
+        """
+        slots = self.slots
+        allocate = self._allocate
+        slot_list = [slots[vehicle_id] if vehicle_id in slots else allocate(vehicle_id)
+                     for vehicle_id in vehicle_ids]
+
+        present = np.zeros(self.capacity, dtype=bool)
+        present[slot_list] = True
+        for slot in np.flatnonzero(self.active & ~present).tolist():
+            self._release(slot)
+
+        if slot_list:
+            self.xy[slot_list] = positions
+            self.speed[slot_list] = speeds
+            self.lane[slot_list] = [self.lanes.intern(lane) for lane in lanes]
+            self.edge[slot_list] = [self.edges.intern(edge) for edge in edges]
+            self.route[slot_list] = [self.routes.intern(route) for route in routes]
+            self.type[slot_list] = [self.types.intern(vehicle_type) for vehicle_type in types]
+        self.version += 1
+
+    def add(self, vehicle_id):
+        """Allocate a slot for a vehicle entering the network and return it.
+
+        Columns may be reallocated, so fetch them after adding vehicles.
+        """
+        return self._allocate(vehicle_id)
+
+    def remove(self, vehicle_id):
+        """Release the slot of a vehicle leaving the network."""
+        self._release(self.slots[vehicle_id])
+
+    def write(self, slots, positions, speeds, lanes, edges, routes, types):
+        """Write already interned columns for the given slots in bulk.
+
+        lanes, edges, routes and types are codes from this store's
+        interners; slots must come from add.
+        """
+        self.xy[slots] = positions
+        self.speed[slots] = speeds
+        self.lane[slots] = lanes
+        self.edge[slots] = edges
+        self.route[slots] = routes
+        self.type[slots] = types
+        self.version += 1
+
+    def clear(self):
+        """Release every vehicle."""
+        for slot in list(self.slots.values()):
+            self._release(slot)
+        self.version += 1
+
+    def view(self):
+        """Return a read-only view of the columns, reused until the store grows."""
+        if self._view is None:
+            self._view = VehicleView(self)
+        return self._view
@@ -1,7 +1,7 @@
 import cv2
 import numpy as np
-from flask import Response
 import random
+import threading
 
 class VideoStream:
     def __init__(self, camera_id=0, sim_controller=None):
@@ -14,6 +14,18 @@ class VideoStream:
             'bus': (255, 165, 0),      # Orange
             'truck': (0, 0, 255)       # Red
         }
+        # The road layout never changes, so it is drawn once and copied into a reused buffer
+        self.background = self._render_background()
+        self._frame = np.empty_like(self.background)
+        self._render_lock = threading.Lock()
+
+        # Count and time frames per camera when the controller collects perf stats
+        perf = getattr(sim_controller, 'perf', None)
+        if perf is not None:
+            self.create_simulation_frame = perf.timed(
+                self.create_simulation_frame, 'traffic_sim_frame_seconds', camera=camera_id, stage='render')
+            self.encode_frame = perf.timed(
+                self.encode_frame, 'traffic_sim_frame_seconds', camera=camera_id, stage='encode')
 
     def draw_vehicle(self, frame, position, vehicle_type='passenger'):
         x, y = position
@@ -27,7 +39,8 @@ class VideoStream:
         cv2.circle(frame, (x_scaled, y_scaled), 5, color, -1)
         return frame
 
-    def create_simulation_frame(self):
+    def _render_background(self):
+        """Render the static road layout."""
         # Create a blank frame
         frame = np.zeros((self.frame_height, self.frame_width, 3), dtype=np.uint8)
         
@@ -41,10 +54,23 @@ class VideoStream:
         # Draw road markings (white)
         cv2.line(frame, (320, 0), (320, 480), (255, 255, 255), 2)  # Vertical center line
         cv2.line(frame, (0, 240), (640, 240), (255, 255, 255), 2)  # Horizontal center line
+        return frame
+
+    def create_simulation_frame(self, metrics=None, rng=random):
+        """Draw the dynamic overlays on top of the cached background.
+
+        metrics defaults to the controller's current metrics. Passing the
+        metrics of one snapshot and an rng seeded for it draws the same frame
+        every time. The returned array is reused by the next call; copy it
+        to keep it.
+        """
+        frame = self._frame
+        np.copyto(frame, self.background)
+        if metrics is None and self.sim_controller:
+            metrics = self.sim_controller.get_traffic_metrics()
         
         # Draw traffic metrics
-        if self.sim_controller:
-            metrics = self.sim_controller.get_traffic_metrics()
+        if metrics:
             cv2.putText(frame, f"Vehicles: {metrics['total_vehicles']}", (10, 30),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
             cv2.putText(frame, f"Avg Speed: {metrics['average_speed']:.1f}", (10, 60),
@@ -56,19 +82,19 @@ class VideoStream:
             for camera, count in metrics['vehicles_per_camera'].items():
                 for _ in range(count):
                     if 'north' in camera:
-                        x = random.randint(270, 370)
-                        y = random.randint(0, 160)
+                        x = rng.randint(270, 370)
+                        y = rng.randint(0, 160)
                     elif 'south' in camera:
-                        x = random.randint(270, 370)
-                        y = random.randint(320, 480)
+                        x = rng.randint(270, 370)
+                        y = rng.randint(320, 480)
                     elif 'east' in camera:
-                        x = random.randint(400, 640)
-                        y = random.randint(190, 290)
+                        x = rng.randint(400, 640)
+                        y = rng.randint(190, 290)
                     else:  # west
-                        x = random.randint(0, 240)
-                        y = random.randint(190, 290)
+                        x = rng.randint(0, 240)
+                        y = rng.randint(190, 290)
                     
-                    vehicle_type = random.choices(
+                    vehicle_type = rng.choices(
                         ['passenger', 'bus', 'truck'],
                         weights=[0.7, 0.2, 0.1]
                     )[0]
@@ -76,18 +102,10 @@ class VideoStream:
         
         return frame
 
-    def generate_frames(self):
-        while True:
-            frame = self.create_simulation_frame()
-            
-            # Encode the frame in JPEG format
+    def encode_frame(self, metrics=None, rng=random):
+        """Render a frame, as create_simulation_frame does, and return it JPEG-encoded."""
+        # The frame buffer is shared, so render and encode must not interleave
+        with self._render_lock:
+            frame = self.create_simulation_frame(metrics, rng)
             ret, buffer = cv2.imencode('.jpg', frame)
-            frame = buffer.tobytes()
-            
-            # Yield the frame in the required format
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
-
-    def get_video_feed(self):
-        return Response(self.generate_frames(),
-                      mimetype='multipart/x-mixed-replace; boundary=frame')
+        return buffer.tobytes()
@@ -0,0 +1,114 @@
+import collections
+import threading
+
+import numpy as np
+
+class ZoneTracker:
+    def __init__(self, max_events=1000):
+        """Track which vehicles are inside a camera zone across detection passes.
+
+        Occupants are kept as parallel arrays sorted by vehicle code (the
+        store's stable id code, unlike slots which are reused), so each pass
+        only works out who entered and who left instead of rebuilding the
+        set. Count, occupancy and mean dwell are kept as running totals.
+        """
+        self.codes = np.empty(0, dtype=np.int64)
+        self.entry_time = np.empty(0)
+        self.entry_speed = np.empty(0)
+        self.last_speed = np.empty(0)
+        self.entries = 0
+        self.exits = 0
+        self.dwell_total = 0.0
+        self.occupied_time = 0.0
+        self.observed_time = 0.0
+        self.last_time = None
+        self.events = collections.deque(maxlen=max_events)
+        self._events_lock = threading.Lock()
+
+    def update(self, vehicles, slots, current_time):
+        """Apply one detection pass and return its enter and exit events.
+
+        vehicles is the VehicleView the slots index into. Each exit event
+        carries the dwell time and the last speed seen inside the zone.
+        """
+        if self.last_time is not None and current_time > self.last_time:
+            interval = current_time - self.last_time
+            self.observed_time += interval
+            if len(self.codes):
+                self.occupied_time += interval
+        self.last_time = current_time
+
+        slots = np.asarray(slots, dtype=np.intp)
+        codes = vehicles.code[slots].astype(np.int64)
+        order = np.argsort(codes, kind='stable')
+        codes = codes[order]
+        speeds = vehicles.speed[slots[order]].astype(float)
+
+        # Both code arrays are sorted and unique, so only the changes are worked out
+        entered = np.setdiff1d(codes, self.codes, assume_unique=True)
+        left = np.searchsorted(self.codes, np.setdiff1d(self.codes, codes, assume_unique=True))
+
+        events = []
+        for index in left.tolist():
+            dwell = current_time - float(self.entry_time[index])
+            events.append({
+                'event': 'exit',
+                'vehicle_id': vehicles.vehicle_ids.lookup(int(self.codes[index])),
+                'time': current_time,
+                'dwell': dwell,
+                'entry_speed': float(self.entry_speed[index]),
+                'exit_speed': float(self.last_speed[index])
+            })
+            self.dwell_total += dwell
+        self.exits += len(left)
+
+        if len(entered) or len(left):
+            entry_time = np.delete(self.entry_time, left)
+            entry_speed = np.delete(self.entry_speed, left)
+            # Entering vehicles go in code order between the ones that stayed
+            at = np.searchsorted(np.delete(self.codes, left), entered)
+            new = np.searchsorted(codes, entered)
+            self.entry_time = np.insert(entry_time, at, current_time)
+            self.entry_speed = np.insert(entry_speed, at, speeds[new])
+            for index in new.tolist():
+                events.append({
+                    'event': 'enter',
+                    'vehicle_id': vehicles.vehicle_ids.lookup(int(codes[index])),
+                    'time': current_time,
+                    'entry_speed': float(speeds[index])
+                })
+            self.entries += len(entered)
+
+        self.codes = codes
+        self.last_speed = speeds
+        if events:
+            with self._events_lock:
+                self.events.extend(events)
+        return events
+
+    def count(self):
+        """Return the number of vehicles in the zone."""
+        return len(self.codes)
+
+    def occupancy(self):
+        """Return the share of observed time the zone held at least one vehicle."""
+        return self.occupied_time / self.observed_time if self.observed_time else 0.0
+
+    def mean_dwell(self):
+        """Return the mean time in seconds vehicles stayed in the zone, over completed visits."""
+        return self.dwell_total / self.exits if self.exits else 0.0
+
+    def stats(self):
+        """Return the count, occupancy, mean dwell and entry/exit totals of the zone."""
+        return {
+            'count': self.count(),
+            'occupancy': self.occupancy(),
+            'mean_dwell': self.mean_dwell(),
+            'entries': self.entries,
+            'exits': self.exits
+        }
+
+    def recent_events(self):
+        """Return a copy of the most recent enter and exit events, oldest first."""
+        with self._events_lock:
+            return list(self.events)
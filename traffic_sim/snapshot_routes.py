@@ -0,0 +1,119 @@
+from flask import jsonify, Response, request
+from traffic_sim.simulation.video_stream import VideoStream
+from traffic_sim.simulation.frame_broadcaster import FrameBroadcaster
+from traffic_sim.simulation.jpeg_cache import JpegSnapshotCache
+from traffic_sim.simulation.metrics_stream import MetricsStream
+from traffic_sim.simulation.response_cache import ResponseCache
+
+try:
+    from flask_sock import Sock
+except ImportError:  # WebSocket push is optional; SSE works without it
+    Sock = None
+
+class SnapshotRoutes:
+    def __init__(self, app, source, config):
+        """Register the routes served purely from published snapshots on app.
+
+        source is a SimulationController, or a SharedSimulation in an HTTP
+        worker process; both provide latest_snapshot, read_snapshot,
+        wait_for_snapshot and get_traffic_metrics.
+        """
+        self.source = source
+
+        # Initialize video streams for each camera
+        self.video_streams = {
+            'north': VideoStream('cam_north', source),
+            'south': VideoStream('cam_south', source),
+            'east': VideoStream('cam_east', source),
+            'west': VideoStream('cam_west', source)
+        }
+
+        # Share one rendered frame per tick between all viewers of a camera
+        stream_fps = config['cameras'].get('stream_fps', 5)
+        self.frame_broadcasters = {
+            camera: FrameBroadcaster(stream, fps=stream_fps) for camera, stream in self.video_streams.items()
+        }
+
+        # Encode still frames at most once per camera per published snapshot
+        self.jpeg_cache = JpegSnapshotCache(
+            {stream.camera_id: stream for stream in self.video_streams.values()},
+            max_workers=config['cameras'].get('snapshot_encode_workers', 2)
+        )
+
+        # Push metric deltas to dashboards instead of having them poll
+        web_config = config.get('web', {})
+        self.metrics_stream = MetricsStream(source, min_interval=web_config.get('stream_min_interval', 0.5))
+
+        # Serialize /metrics and camera data once per published snapshot
+        response_cache_config = web_config.get('response_cache', {})
+        self.response_cache = ResponseCache(
+            gzip_enabled=response_cache_config.get('gzip', True),
+            gzip_min_bytes=response_cache_config.get('gzip_min_bytes', 1024),
+            max_entries=response_cache_config.get('max_entries', 256)
+        )
+
+        app.add_url_rule('/metrics', 'metrics', self.metrics)
+        app.add_url_rule('/stream/metrics', 'stream_metrics', self.stream_metrics)
+        app.add_url_rule('/video_feed', 'video_feed', self.video_feed)
+        app.add_url_rule('/camera/<camera_id>/snapshot.jpg', 'camera_snapshot', self.camera_snapshot)
+        app.add_url_rule('/camera/<camera_id>/data', 'camera_data', self.camera_data)
+        if Sock is not None:
+            Sock(app).route('/ws/metrics')(self.ws_metrics)
+
+    def metrics(self):
+        """Get current traffic metrics from the latest simulation snapshot."""
+        try:
+            snapshot = self.source.latest_snapshot()
+            return self.response_cache.respond(request, 'metrics', snapshot.version,
+                                               lambda: (snapshot.version, snapshot.metrics))
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    def stream_metrics(self):
+        """Push metric deltas and camera detections as Server-Sent Events."""
+        return Response(self.metrics_stream.server_sent_events(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    def ws_metrics(self, ws):
+        """Push the same updates as /stream/metrics over a WebSocket."""
+        for message in self.metrics_stream.websocket_messages():
+            ws.send(message)
+
+    def video_feed(self):
+        """Video streaming route."""
+        try:
+            camera = request.args.get('camera', 'north')  # Default to north camera
+            if camera in self.frame_broadcasters:
+                return self.frame_broadcasters[camera].get_video_feed()
+            return 'Camera not found', 404
+        except Exception as e:
+            return str(e), 500
+
+    def camera_snapshot(self, camera_id):
+        """Get the current frame of a camera as a JPEG, revalidated by snapshot version."""
+        try:
+            if camera_id not in self.jpeg_cache.video_streams:
+                return 'Camera not found', 404
+            snapshot = self.source.latest_snapshot()
+            etag = self.jpeg_cache.etag(camera_id, snapshot.version)
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+            else:
+                frame = self.jpeg_cache.get(camera_id, snapshot).result(timeout=5)
+                response = Response(frame, mimetype='image/jpeg')
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        except Exception as e:
+            return str(e), 500
+
+    def camera_data(self, camera_id):
+        """Get data for a specific camera from the latest simulation snapshot."""
+        try:
+            return self.response_cache.respond(
+                request, ('camera', camera_id), self.source.latest_snapshot().version,
+                lambda: self.source.read_snapshot(
+                    lambda snapshot: (snapshot.version, snapshot.camera_data(camera_id)))
+            )
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
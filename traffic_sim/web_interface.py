@@ -1,59 +1,107 @@
-from flask import Flask, jsonify, render_template, Response, request
+from flask import Flask, jsonify, render_template, Response, request, g
 from traffic_sim.simulation.sim_controller import SimulationController
-from traffic_sim.simulation.video_stream import VideoStream
+from traffic_sim.simulation.logger import logging_stats
+from traffic_sim.simulation.perf import logging_stats_text
+from traffic_sim.snapshot_routes import SnapshotRoutes
 import os
+import time
 
-app = Flask(__name__)
-
-# Load configuration and initialize the simulation controller
-config_path = os.path.join(os.path.dirname(__file__), 'config/simulation_config.yaml')
-sim_controller = SimulationController(config_path)
-
-# Initialize video streams for each camera
-video_streams = {
-    'north': VideoStream('cam_north', sim_controller),
-    'south': VideoStream('cam_south', sim_controller),
-    'east': VideoStream('cam_east', sim_controller),
-    'west': VideoStream('cam_west', sim_controller)
-}
-
-@app.route('/')
-def index():
-    """Render the main dashboard."""
-    return render_template('dashboard.html')
-
-@app.route('/metrics')
-def metrics():
-    """Get current traffic metrics."""
-    try:
-        traffic_metrics = sim_controller.get_traffic_metrics()
-        return jsonify(traffic_metrics)
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-
-@app.route('/video_feed')
-def video_feed():
-    """Video streaming route."""
-    try:
-        camera = request.args.get('camera', 'north')  # Default to north camera
-        if camera in video_streams:
-            return video_streams[camera].get_video_feed()
-        return 'Camera not found', 404
-    except Exception as e:
-        return str(e), 500
-
-@app.route('/camera/<camera_id>/data')
-def camera_data(camera_id):
-    """Get data for a specific camera."""
-    try:
-        data = sim_controller.get_camera_data(camera_id)
-        return jsonify(data)
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), 'config/simulation_config.yaml')
+
+def create_app(config_path=CONFIG_PATH):
+    """Build the simulation controller and the Flask app serving it.
+
+    The controller is only created here, not on import, so processes that
+    import this module (spawned workers, pre-forked servers) do not each
+    start a simulation. The app keeps it as app.sim_controller.
+    """
+    app = Flask(__name__)
+    sim_controller = SimulationController(config_path)
+    app.sim_controller = sim_controller
+
+    # Metrics, camera data, frames and the metrics stream are read from published snapshots
+    app.snapshot_routes = SnapshotRoutes(app, sim_controller, sim_controller.config)
+
+    # Per-route request latency, only hooked in when perf stats are enabled
+    if sim_controller.perf is not None:
+        @app.before_request
+        def start_request_timer():
+            g.request_started = time.perf_counter()
+
+        @app.after_request
+        def observe_request_latency(response):
+            started = g.pop('request_started', None)
+            if started is not None:
+                # Label by route pattern, not path, so camera ids do not multiply the series
+                route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+                sim_controller.perf.histogram('traffic_sim_http_request_seconds', route=route).observe(
+                    time.perf_counter() - started)
+            return response
+
+    @app.route('/')
+    def index():
+        """Render the main dashboard."""
+        return render_template('dashboard.html')
+
+    @app.route('/metrics/prometheus')
+    def metrics_prometheus():
+        """Expose the timing histograms and logging counters in Prometheus text format."""
+        if sim_controller.perf is None:
+            return 'Performance stats are disabled', 404
+        text = sim_controller.perf.prometheus_text() + logging_stats_text(logging_stats())
+        return Response(text, mimetype='text/plain; version=0.0.4')
+
+    @app.route('/debug/perf')
+    def debug_perf():
+        """Get the step, frame and request timing histograms and the logging counters as JSON."""
+        if sim_controller.perf is None:
+            return jsonify({'error': 'Performance stats are disabled'}), 404
+        return jsonify({'histograms': sim_controller.perf.as_dict(), 'logging': logging_stats()})
+
+    @app.route('/metrics/history')
+    def metrics_history():
+        """Get recorded metrics for a simulation time range in one response."""
+        try:
+            start = request.args.get('from', type=float)
+            end = request.args.get('to', type=float)
+            resolution = request.args.get('resolution', 'auto')
+            return jsonify(sim_controller.get_metrics_history(start, end, resolution))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @app.route('/replay', methods=['GET', 'POST'])
+    def replay():
+        """Get the replay position, or seek and change speed with time/speed parameters."""
+        try:
+            if sim_controller.replay is None:
+                return jsonify({'error': 'Simulation is not running from a recording'}), 404
+            seek_time = request.values.get('time', type=float)
+            speed = request.values.get('speed', type=float)
+            if speed is not None:
+                sim_controller.set_replay_speed(speed)
+            if seek_time is not None:
+                sim_controller.seek_replay(seek_time)
+            return jsonify(sim_controller.replay.status())
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @app.route('/camera/<camera_id>/zone')
+    def camera_zone(camera_id):
+        """Get a camera's zone count, occupancy and dwell times with its recent enter/exit events."""
+        try:
+            camera = sim_controller.cameras.get(camera_id)
+            if camera is None:
+                return jsonify({'error': 'Camera not found'}), 404
+            return jsonify({'camera_id': camera_id, **camera.zone.stats(), 'events': camera.zone.recent_events()})
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    return app
 
 if __name__ == "__main__":
-    # Start the simulation
-    sim_controller.start_simulation()
-    
-    # Run the Flask app
-    app.run(debug=True, host='0.0.0.0', port=8000)
+    from traffic_sim.run import main
+    main()